@@ -0,0 +1,235 @@
+# backend/app/api/v1/admin.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from backend.app.core.config import get_settings
+from backend.app.core.executors import recycle_inference_executor, run_io
+from backend.app.core.profiling import AllocationProfiler, ProfilerBusy, SamplingProfiler
+from backend.app.services.audit_store import DAY_MS, now_ms, query_scoring_logs
+from backend.app.services.fraud_model import (
+    FraudModelService,
+    get_fraud_model_service,
+    get_model_registry,
+)
+from backend.app.services.model_registry import ModelRegistry
+from backend.app.services.shadow import ShadowScoringService, get_shadow_scoring
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+settings = get_settings()
+
+
+def verify_admin_token(x_admin_token: str | None = Header(default=None)) -> None:
+    """
+    Админские эндпоинты работают только с заданным ADMIN_TOKEN
+    и заголовком X-Admin-Token; без токена в настройках они выключены.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled (ADMIN_TOKEN is not set)",
+        )
+    if x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin token",
+        )
+
+
+@router.get("/models")
+async def list_models(
+    _: None = Depends(verify_admin_token),
+    registry: ModelRegistry = Depends(get_model_registry),
+    model_service: FraudModelService = Depends(get_fraud_model_service),
+) -> Dict[str, Any]:
+    """
+    Версии моделей в реестре, активная версия этого процесса и история активаций.
+    """
+    versions = await run_io(registry.list_versions)
+    pointer = await run_io(registry.read_pointer)
+    active = model_service.model_version
+    for v in versions:
+        v["active"] = v["version"] == active
+    return {
+        "active": active,
+        "active_checksum": model_service.model_checksum,
+        "history": pointer.get("history", []),
+        "versions": versions,
+    }
+
+
+async def _switch(
+    model_service: FraudModelService, version: Optional[str]
+) -> Dict[str, Optional[str]]:
+    # загрузка и проверка новой версии идут в io-пуле, скоринг продолжает
+    # работать на текущей модели до атомарной подмены
+    try:
+        if version is None:
+            result = await run_io(model_service.rollback)
+        else:
+            result = await run_io(model_service.activate, version)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model version: {version}",
+        )
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+    recycle_inference_executor()
+    return result
+
+
+@router.post("/models/{version}/activate")
+async def activate_model(
+    version: str,
+    _: None = Depends(verify_admin_token),
+    model_service: FraudModelService = Depends(get_fraud_model_service),
+) -> Dict[str, Optional[str]]:
+    """
+    Прогрев, сверка с golden sample и атомарное переключение на версию.
+    """
+    return await _switch(model_service, version)
+
+
+@router.post("/models/rollback")
+async def rollback_model(
+    _: None = Depends(verify_admin_token),
+    model_service: FraudModelService = Depends(get_fraud_model_service),
+) -> Dict[str, Optional[str]]:
+    """
+    Возврат на предыдущую активную версию.
+    """
+    return await _switch(model_service, None)
+
+
+@router.get("/shadow")
+async def shadow_stats(
+    _: None = Depends(verify_admin_token),
+    shadow: ShadowScoringService = Depends(get_shadow_scoring),
+) -> Dict[str, Any]:
+    return shadow.stats()
+
+
+@router.post("/shadow/{version}")
+async def load_challenger(
+    version: str,
+    _: None = Depends(verify_admin_token),
+    shadow: ShadowScoringService = Depends(get_shadow_scoring),
+) -> Dict[str, Any]:
+    """
+    Загрузить версию из реестра как challenger для теневого скоринга.
+    """
+    try:
+        return await run_io(shadow.load, version)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model version: {version}",
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+
+
+@router.delete("/shadow/{version}")
+async def unload_challenger(
+    version: str,
+    _: None = Depends(verify_admin_token),
+    shadow: ShadowScoringService = Depends(get_shadow_scoring),
+) -> Dict[str, Any]:
+    try:
+        shadow.unload(version)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Challenger is not loaded: {version}",
+        )
+    return shadow.stats()
+
+
+@router.get("/shadow/report")
+async def shadow_report(
+    since: Optional[str] = None,
+    _: None = Depends(verify_admin_token),
+    shadow: ShadowScoringService = Depends(get_shadow_scoring),
+) -> Dict[str, Any]:
+    """
+    Сравнение challenger'ов с champion по shadow_logs (since — ISO-время).
+    """
+    return await run_io(shadow.report, since)
+
+
+@router.get("/audit")
+async def audit_log(
+    client_id: Optional[str] = None,
+    risk_level: Optional[List[str]] = Query(None),
+    days: float = Query(30.0, gt=0),
+    until: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10_000),
+    _: None = Depends(verify_admin_token),
+) -> Dict[str, Any]:
+    """
+    Решения скоринга за последние days суток (до until, мс epoch), от новых к старым:
+    ?client_id=123&risk_level=high — все high-решения клиента за 30 дней.
+    """
+    until = until if until is not None else now_ms() + 1
+    since = until - int(days * DAY_MS)
+    items = await run_io(
+        query_scoring_logs, client_id, risk_level, since, until, limit
+    )
+    return {"since": since, "until": until, "count": len(items), "items": items}
+
+
+@router.post("/profile", response_model=None)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0),
+    mode: Literal["cpu", "alloc"] = "cpu",
+    interval_ms: float = Query(5.0, ge=1.0),
+    idle: bool = False,
+    format: Literal["collapsed", "json"] = "collapsed",
+    top: int = Query(20, ge=1, le=500),
+    _: None = Depends(verify_admin_token),
+) -> Union[PlainTextResponse, Dict[str, Any]]:
+    """
+    Профиль этого воркера за окно в seconds, пока он обслуживает трафик.
+    cpu — сэмплы стеков всех потоков (collapsed для flamegraph или сводка в json),
+    alloc — прирост живой памяти по строкам кода (tracemalloc).
+    Нужен PROFILING_ENABLED=true; вне окна профилирование ничего не стоит.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling is disabled (PROFILING_ENABLED is not set)",
+        )
+    seconds = min(seconds, settings.PROFILING_MAX_SEC)
+    profiler: Union[SamplingProfiler, AllocationProfiler]
+    if mode == "cpu":
+        profiler = SamplingProfiler(interval=interval_ms / 1000, include_idle=idle)
+    else:
+        profiler = AllocationProfiler()
+
+    try:
+        profiler.start()
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    # окно ждём в event loop: воркер продолжает скорить, его и профилируем
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await run_io(profiler.stop)
+
+    if mode == "cpu" and format == "collapsed":
+        return PlainTextResponse(
+            profiler.collapsed(),
+            headers={"X-Profile-Samples": str(profiler.samples)},
+        )
+    return {"mode": mode, "seconds": seconds, **profiler.summary(top)}
@@ -0,0 +1,79 @@
+# backend/app/api/v1/features.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from backend.app.api.v1.scoring import verify_api_token
+from backend.app.schemas.features import (
+    ClientFeaturesResponse,
+    SessionIngestRequest,
+    SessionIngestResponse,
+)
+from backend.app.services.feature_store import (
+    OnlineFeatureStore,
+    get_feature_store,
+    to_epoch,
+)
+from backend.app.services.velocity import VelocityEngine, get_velocity_engine
+
+router = APIRouter(tags=["features"])
+
+
+@router.post("/sessions/ingest", response_model=SessionIngestResponse)
+def ingest_sessions(
+    batch: SessionIngestRequest,
+    _: None = Depends(verify_api_token),
+    store: OnlineFeatureStore = Depends(get_feature_store),
+) -> SessionIngestResponse:
+    """
+    Приём событий логин-сессий: окна 7d/30d клиента обновляются за O(1) на событие.
+    """
+    ingested = store.ingest_many(
+        (e.client_id, to_epoch(e.ts), e.os_version, e.phone_model)
+        for e in batch.events
+    )
+    return SessionIngestResponse(received=len(batch.events), ingested=ingested)
+
+
+@router.get("/features/{client_id}", response_model=ClientFeaturesResponse)
+def client_features(
+    client_id: str,
+    _: None = Depends(verify_api_token),
+    store: OnlineFeatureStore = Depends(get_feature_store),
+) -> ClientFeaturesResponse:
+    """
+    Текущие поведенческие фичи клиента — те, что подставит скоринг.
+    """
+    features = store.features(client_id)
+    if features is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No sessions for client: {client_id}",
+        )
+    return ClientFeaturesResponse(
+        client_id=client_id, features=features, **store.last_device(client_id)
+    )
+
+
+@router.get("/velocity/{client_id}")
+def client_velocity(
+    client_id: str,
+    destination_id: Optional[str] = None,
+    _: None = Depends(verify_api_token),
+    engine: VelocityEngine = Depends(get_velocity_engine),
+) -> Dict[str, Optional[float]]:
+    """
+    Признаки скорости переводов клиента на текущий момент (без новой транзакции).
+    """
+    return engine.peek(client_id, destination_id)
+
+
+@router.get("/feature_store_stats")
+def feature_store_stats(
+    _: None = Depends(verify_api_token),
+    store: OnlineFeatureStore = Depends(get_feature_store),
+    engine: VelocityEngine = Depends(get_velocity_engine),
+) -> Dict[str, Any]:
+    return {**store.stats(), "velocity": engine.stats()}
@@ -1,9 +1,14 @@
 # backend/app/api/v1/scoring.py
 from __future__ import annotations
 
-from typing import List
+import json
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Union
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
 
 from backend.app.core.config import get_settings
 from backend.app.schemas.transactions import (
@@ -13,10 +18,27 @@ from backend.app.schemas.transactions import (
     BatchScoringResponse,
     TransactionExplainRequest,
     TransactionExplainResponse,
+    FeatureExplanationResponse,
 )
-from backend.app.services.fraud_model import fraud_model_service
-from backend.app.services.audit_logger import log_scoring_event
-from backend.app.services.llm_explainer import llm_explainer_service
+from backend.app.core.executors import run_inference, run_io
+from backend.app.core.metrics import BATCH_SIZE, STAGE_ENRICH
+from backend.app.services.fraud_model import (
+    FraudModelService,
+    get_fraud_model_service,
+    score_many,
+    score_one,
+)
+from backend.app.services.attribution import (
+    get_feature_attribution_service,
+    score_and_explain_features,
+    score_with_contributions_many,
+)
+from backend.app.services.audit_logger import alog_scoring_events
+from backend.app.services.batcher import scoring_batcher
+from backend.app.services.feature_store import get_feature_store
+from backend.app.services.llm_explainer import LLMExplainerService, get_llm_explainer_service
+from backend.app.services.shadow import get_shadow_scoring
+from backend.app.services.velocity import get_velocity_engine
 
 router = APIRouter(tags=["scoring"])
 settings = get_settings()
@@ -36,29 +58,76 @@ def verify_api_token(x_api_key: str | None = Header(default=None)) -> None:
             )
 
 
+def _enrich(
+    reqs: List[TransactionScoringRequest], record: bool = True
+) -> List[TransactionScoringRequest]:
+    """
+    Серверные фичи для незаполненных полей: поведенческие из онлайн-стора
+    и скорость переводов; при record транзакции учитываются в счётчиках скорости.
+    """
+    t0 = time.perf_counter()
+    reqs = get_feature_store().enrich(reqs)
+    reqs = get_velocity_engine().enrich(reqs, record=record)
+    STAGE_ENRICH.observe(time.perf_counter() - t0)
+    return reqs
+
+
+async def _aenrich(
+    reqs: List[TransactionScoringRequest], record: bool = True
+) -> List[TransactionScoringRequest]:
+    """
+    _enrich в io-пуле: поиск в сторе, обновление агрегатов и model_copy
+    не занимают event loop, а ожидание блокировки стора, пока соседний
+    батч обновляет агрегаты, не останавливает остальные запросы.
+    В пул инференса не переносится: при INFERENCE_EXECUTOR=process
+    состояние стора осталось бы в дочерних процессах.
+    """
+    return await run_io(_enrich, reqs, record)
+
+
+def _require_attribution() -> None:
+    if not get_feature_attribution_service().available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Feature attribution is not available for the active model format",
+        )
+
+
 @router.post(
     "/score_transaction",
     response_model=TransactionScoringResponse,
+    response_model_exclude_none=True,
 )
-def score_transaction(
+async def score_transaction(
     request: TransactionScoringRequest,
     _: None = Depends(verify_api_token),
 ) -> TransactionScoringResponse:
     """
     Скоринг одной транзакции.
+    Инференс идёт в пуле инференса, event loop не блокируется.
+    При SCORING_BATCHER_ENABLED запрос склеивается с соседними в один батч.
+    Пропущенные поведенческие фичи и скорость переводов считаются сервером по client_id.
     """
-    response = fraud_model_service.score(request)
+    [request] = await _aenrich([request])
+    if settings.SCORING_BATCHER_ENABLED:
+        response = await scoring_batcher.score(request)
+    else:
+        response = await run_inference(score_one, request)
 
     # логирование
-    client_id_str = request.client_id if request.client_id is not None else None
-    amount_val = request.amount if request.amount is not None else None
-
-    log_scoring_event(
-        client_id=client_id_str,
-        amount=amount_val,
-        fraud_probability=response.fraud_probability,
-        risk_level=response.risk_level,
+    await alog_scoring_events(
+        [
+            (
+                request.client_id,
+                request.amount,
+                response.fraud_probability,
+                response.risk_level,
+                response.model_version,
+            )
+        ]
     )
+    # challenger'ы скорят в фоне, ответ их не ждёт
+    get_shadow_scoring().submit([request], [response])
 
     return response
 
@@ -66,8 +135,9 @@ def score_transaction(
 @router.post(
     "/score_batch",
     response_model=BatchScoringResponse,
+    response_model_exclude_none=True,
 )
-def score_batch(
+async def score_batch(
     batch: BatchScoringRequest,
     _: None = Depends(verify_api_token),
 ) -> BatchScoringResponse:
@@ -75,43 +145,265 @@ def score_batch(
     Скоринг списка транзакций.
     Принимает { "items": [ {transaction1}, {transaction2}, ... ] }
     Возвращает { "results": [ {resp1}, {resp2}, ... ] }
+    С include_contributions=true к каждому результату добавляются
+    top-k вкладов фич (TreeSHAP), посчитанные одним вызовом на батч.
     """
-    results: List[TransactionScoringResponse] = []
-
-    for item in batch.items:
-        resp = fraud_model_service.score(item)
-        results.append(resp)
+    if batch.include_contributions:
+        _require_attribution()
 
-        # логируем каждую транзакцию отдельно
-        client_id_str = item.client_id if item.client_id is not None else None
-        amount_val = item.amount if item.amount is not None else None
+    BATCH_SIZE.labels("score_batch").observe(len(batch.items))
+    items = await _aenrich(batch.items)
+    results: List[TransactionScoringResponse]
+    if batch.include_contributions:
+        # скоры и вклады — одна задача на одном бандле модели
+        results = await run_inference(
+            score_with_contributions_many, items, settings.ATTRIBUTION_TOP_K
+        )
+    else:
+        results = await run_inference(score_many, items)
 
-        log_scoring_event(
-            client_id=client_id_str,
-            amount=amount_val,
-            fraud_probability=resp.fraud_probability,
-            risk_level=resp.risk_level,
+    # логируем каждую транзакцию отдельной строкой, но одной пачкой в очередь
+    await alog_scoring_events(
+        (
+            item.client_id,
+            item.amount,
+            resp.fraud_probability,
+            resp.risk_level,
+            resp.model_version,
         )
+        for item, resp in zip(items, results)
+    )
+    get_shadow_scoring().submit(items, results)
 
     return BatchScoringResponse(results=results)
 
+@router.post(
+    "/explain_features",
+    response_model=FeatureExplanationResponse,
+)
+async def explain_features(
+    request: TransactionScoringRequest,
+    top_k: Optional[int] = Query(default=None, ge=1, le=100),
+    _: None = Depends(verify_api_token),
+) -> FeatureExplanationResponse:
+    """
+    Локальное объяснение за миллисекунды: скоринг + top-k вкладов фич (TreeSHAP).
+    """
+    _require_attribution()
+    k = top_k or settings.ATTRIBUTION_TOP_K
+    # объяснение не новая транзакция — в счётчиках скорости её не учитываем
+    [request] = await _aenrich([request], record=False)
+    # скоринг и вклады — одна задача на одном бандле модели
+    response, base_value, contributions = await run_inference(
+        score_and_explain_features, request, k
+    )
+    return FeatureExplanationResponse(
+        fraud_probability=response.fraud_probability,
+        risk_level=response.risk_level,
+        model_version=response.model_version,
+        base_value=base_value,
+        contributions=contributions,
+    )
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class DuplexStreamingResponse(Response):
+    """
+    Потоковый ответ, который отдаётся, пока тело запроса ещё читается.
+
+    StreamingResponse при ASGI spec_version < 2.4 (uvicorn отдаёт 2.3)
+    параллельно слушает receive() в ожидании disconnect и "съедает" чанки
+    тела запроса. Здесь ответ сам отправляет сообщения http.response.*
+    по спецификации ASGI и receive() не трогает: тело читает только
+    генератор, разрыв соединения приходит к нему как ClientDisconnect
+    из request.stream().
+    """
+
+    def __init__(
+        self,
+        content: AsyncIterable[bytes],
+        status_code: int = 200,
+        media_type: Optional[str] = None,
+    ):
+        self.body_iterator = content
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+def _ndjson_error(line_no: int, error: Any) -> bytes:
+    record = {"line": line_no, "error": error}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _parse_ndjson_line(line: bytes, line_no: int) -> Union[TransactionScoringRequest, bytes]:
+    """
+    Строка NDJSON -> запрос; при ошибке — готовая NDJSON-строка с ошибкой.
+    """
+    try:
+        return TransactionScoringRequest.model_validate_json(line)
+    except ValidationError as exc:
+        return _ndjson_error(line_no, json.loads(exc.json(include_url=False)))
+
+
+def _line_too_long(line_no: int, limit: int) -> bytes:
+    return _ndjson_error(
+        line_no, [{"type": "line_too_long", "msg": f"Line exceeds {limit} bytes"}]
+    )
+
+
+async def _score_ndjson_chunk(
+    parsed: List[Union[TransactionScoringRequest, bytes]],
+) -> bytes:
+    """
+    Скорит валидные строки чанка одним батчем и собирает ответ в исходном порядке.
+    """
+    items = await _aenrich([p for p in parsed if isinstance(p, TransactionScoringRequest)])
+    BATCH_SIZE.labels("score_stream").observe(len(items))
+    results = await run_inference(score_many, items) if items else []
+
+    await alog_scoring_events(
+        (
+            item.client_id,
+            item.amount,
+            resp.fraud_probability,
+            resp.risk_level,
+            resp.model_version,
+        )
+        for item, resp in zip(items, results)
+    )
+    get_shadow_scoring().submit(items, results)
+
+    out: List[bytes] = []
+    scored = iter(results)
+    for p in parsed:
+        if isinstance(p, TransactionScoringRequest):
+            out.append(next(scored).model_dump_json(exclude_none=True).encode("utf-8") + b"\n")
+        else:
+            out.append(p)
+    return b"".join(out)
+
+
+@router.post("/score_stream")
+async def score_stream(
+    request: Request,
+    _: None = Depends(verify_api_token),
+) -> DuplexStreamingResponse:
+    """
+    Потоковый скоринг: тело — NDJSON (одна транзакция на строку),
+    ответ — NDJSON с результатами в том же порядке.
+    Тело разбирается и скорится чанками по STREAM_CHUNK_SIZE строк по мере
+    поступления, поэтому память не растёт с размером батча, а первые
+    результаты уходят клиенту ещё до конца загрузки.
+    Невалидная строка не роняет поток: вместо результата {"line": N, "error": ...}.
+    Строка длиннее STREAM_MAX_LINE_BYTES не копится в памяти: её остаток
+    пропускается до перевода строки, вместо результата — ошибка line_too_long.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(NDJSON_MEDIA_TYPE):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Expected {NDJSON_MEDIA_TYPE} body",
+        )
+
+    chunk_size = settings.STREAM_CHUNK_SIZE
+    max_line = settings.STREAM_MAX_LINE_BYTES
+
+    async def results() -> AsyncIterator[bytes]:
+        tail = b""
+        line_no = 0
+        # остаток слишком длинной строки (ошибка уже записана) дочитывается до \n
+        skipping = False
+        parsed: List[Union[TransactionScoringRequest, bytes]] = []
+
+        async for part in request.stream():
+            lines = (tail + part).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                line_no += 1
+                if skipping:
+                    skipping = False
+                elif len(line) > max_line:
+                    parsed.append(_line_too_long(line_no, max_line))
+                elif line.strip():
+                    parsed.append(_parse_ndjson_line(line, line_no))
+                if len(parsed) >= chunk_size:
+                    yield await _score_ndjson_chunk(parsed)
+                    parsed = []
+            if len(tail) > max_line:
+                if not skipping:
+                    parsed.append(_line_too_long(line_no + 1, max_line))
+                    skipping = True
+                tail = b""
+
+        if tail.strip() and not skipping:
+            parsed.append(_parse_ndjson_line(tail, line_no + 1))
+        if parsed:
+            yield await _score_ndjson_chunk(parsed)
+
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.post(
     "/explain_transaction",
     response_model=TransactionExplainResponse,
 )
-def explain_transaction(
+async def explain_transaction(
     request: TransactionExplainRequest,
     _: None = Depends(verify_api_token),
+    explainer: LLMExplainerService = Depends(get_llm_explainer_service),
 ) -> TransactionExplainResponse:
     """
     Возвращает текстовое объяснение уже полученного решения модели.
     ML-часть (fraud_probability, risk_level) мы не пересчитываем — 
     используем то, что пришло от фронта.
+    Вызов LLM асинхронный и ограничен дедлайном; при сбое — шаблонное объяснение.
     """
-    explanation = llm_explainer_service.explain(request)
+    explanation = await explainer.explain(request)
 
     return TransactionExplainResponse(
         fraud_probability=request.fraud_probability,
         risk_level=request.risk_level,
         explanation=explanation,
     )
+
+
+@router.get("/batcher_stats")
+def batcher_stats(
+    _: None = Depends(verify_api_token),
+) -> Dict[str, Any]:
+    """
+    Метрики micro-batcher'а: гистограмма размеров батча и время ожидания в очереди.
+    """
+    return {
+        "enabled": settings.SCORING_BATCHER_ENABLED,
+        **scoring_batcher.stats(),
+    }
+
+
+@router.get("/cache_stats")
+def cache_stats(
+    _: None = Depends(verify_api_token),
+    model_service: FraudModelService = Depends(get_fraud_model_service),
+) -> Dict[str, Any]:
+    """
+    Счётчики кэша результатов скоринга: hit/miss/eviction и текущий размер.
+    """
+    return model_service.cache.stats()
@@ -0,0 +1,290 @@
+# backend/app/cli.py
+"""
+Командная строка backend'а.
+
+    python -m backend.app.cli score --input temp/data.csv --output scored.csv \\
+        [--features temp/data2.csv] [--chunk-size 100000] [--workers 4]
+    python -m backend.app.cli register-model --model ml/models/new.pkl \\
+        [--version xgb_v2] [--golden-from temp/data.csv --features temp/data2.csv]
+    python -m backend.app.cli export-model --model ml/models/model_xgb_baseline.pkl \\
+        --output ml/models/xgb_baseline_v1.trees
+    python -m backend.app.cli velocity-backfill --input temp/data.csv --output velocity.csv
+
+Офлайн-скоринг больших выгрузок: вход читается чанками фиксированного размера,
+каждый чанк скорится векторно тем же FraudModelService и тем же планом фич,
+что и API, результат дописывается в выходной файл — память не растёт
+с размером входа.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from backend.app.services.csv_io import (
+    PASSTHROUGH_COLUMNS,
+    iter_chunks,
+    load_features_index,
+    to_numeric,
+)
+from backend.app.services.feature_plan import frame_to_requests
+from backend.app.services.velocity import velocity_backfill
+
+_features_index: Optional[pd.DataFrame] = None
+
+
+# --- скоринг чанка (в текущем процессе или в воркере) ---
+
+
+def _init_worker(
+    features_path: Optional[str], sep: str, encoding: str, model_path: Optional[str]
+) -> None:
+    global _features_index
+    # модель грузится один раз на процесс, при инициализации воркера
+    from backend.app.services.fraud_model import get_fraud_model_service
+
+    service = get_fraud_model_service()
+    if model_path and model_path != service.model_path:
+        service.reload(model_path)
+
+    if features_path:
+        _features_index = load_features_index(features_path, sep, encoding)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    from backend.app.services.fraud_model import get_fraud_model_service
+
+    fraud_model_service = get_fraud_model_service()
+    if _features_index is not None and {"client_id", "trans_date"} <= set(chunk.columns):
+        chunk = chunk.join(
+            _features_index, on=["client_id", "trans_date"], rsuffix="_features"
+        )
+
+    # строки выгрузки (числа с запятой, категории) разбирает сам план фич
+    probas = fraud_model_service.predict_proba_frame(chunk)
+
+    out = chunk[[c for c in PASSTHROUGH_COLUMNS if c in chunk.columns]].copy()
+    out["fraud_probability"] = probas
+    out["risk_level"] = fraud_model_service.get_risk_levels(probas)
+    out["model_version"] = fraud_model_service.model_version
+    return out
+
+
+def _iter_scored(
+    chunks: Iterator[pd.DataFrame],
+    workers: int,
+    features_path: Optional[str],
+    sep: str,
+    encoding: str,
+    model_path: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    if workers <= 1:
+        _init_worker(features_path, sep, encoding, model_path)
+        for chunk in chunks:
+            yield score_chunk(chunk)
+        return
+
+    # не больше 2 чанков на воркер "в полёте": порядок сохраняется, память ограничена
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(features_path, sep, encoding, model_path),
+    ) as pool:
+        in_flight: Deque[Future] = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(score_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+# --- запись результата ---
+
+
+class _Writer:
+    def __init__(self, path: str):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+            return
+
+        frame.to_csv(
+            self.path, mode="w" if self._first else "a", header=self._first, index=False
+        )
+        self._first = False
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def cmd_score(args: argparse.Namespace) -> int:
+    chunks = iter_chunks(args.input, args.chunk_size, args.sep, args.encoding)
+    writer = _Writer(args.output)
+    total = 0
+    counts: Dict[str, int] = {}
+    try:
+        for scored in _iter_scored(
+            chunks, args.workers, args.features, args.sep, args.encoding, args.model
+        ):
+            writer.write(scored)
+            total += len(scored)
+            for level, n in scored["risk_level"].value_counts().items():
+                counts[level] = counts.get(level, 0) + int(n)
+            print(f"scored {total} rows", file=sys.stderr)
+    finally:
+        writer.close()
+
+    print(f"done: {total} rows -> {args.output} {counts}", file=sys.stderr)
+    return 0
+
+
+def _golden_requests(args: argparse.Namespace) -> List[Any]:
+    """
+    Первые golden_size строк выгрузки -> запросы скоринга для golden sample.
+    """
+    chunk = next(iter_chunks(args.golden_from, args.golden_size, args.sep, args.encoding))
+    if args.features:
+        features = load_features_index(args.features, args.sep, args.encoding)
+        chunk = chunk.join(features, on=["client_id", "trans_date"], rsuffix="_features")
+
+    return frame_to_requests(chunk)
+
+
+def cmd_register_model(args: argparse.Namespace) -> int:
+    from backend.app.services.fraud_model import get_model_registry
+
+    thresholds = None
+    if args.threshold_medium is not None and args.threshold_high is not None:
+        thresholds = {"medium": args.threshold_medium, "high": args.threshold_high}
+    metrics = json.loads(args.metrics) if args.metrics else None
+    golden = _golden_requests(args) if args.golden_from else []
+    meta = get_model_registry().register(
+        args.model,
+        version=args.version,
+        thresholds=thresholds,
+        metrics=metrics,
+        golden_requests=golden,
+    )
+    print(
+        f"registered {meta['version']} ({meta['checksum'][:12]}), "
+        f"golden sample: {len(meta.get('golden_sample', []))} rows",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def cmd_export_model(args: argparse.Namespace) -> int:
+    from backend.app.services.fraud_model import get_model_registry
+
+    meta = get_model_registry().export(args.model, args.output, version=args.version)
+    print(
+        f"exported {meta['source_version']} -> {meta['version']} "
+        f"({args.output}, {meta['checksum'][:12]})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def cmd_velocity_backfill(args: argparse.Namespace) -> int:
+    # историю нужно прогнать целиком и по времени, поэтому держим только
+    # нужные колонки всех чанков
+    columns = ["transaction_id", "client_id", "destination_id", "amount", "transdatetime"]
+    frames = [
+        to_numeric(chunk[[c for c in columns if c in chunk.columns]], ["amount"])
+        for chunk in iter_chunks(args.input, args.chunk_size, args.sep, args.encoding)
+    ]
+    history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    writer = _Writer(args.output)
+    try:
+        writer.write(velocity_backfill(history))
+    finally:
+        writer.close()
+    print(f"done: {len(history)} rows -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    score = sub.add_parser("score", help="офлайн-скоринг CSV/Parquet чанками")
+    score.add_argument("--input", required=True, help="CSV (как data.csv) или .parquet")
+    score.add_argument("--output", required=True, help="выходной .csv или .parquet")
+    score.add_argument(
+        "--features", default=None, help="CSV поведенческих фич (как data2.csv)"
+    )
+    score.add_argument(
+        "--model", default=None, help="путь к модели (по умолчанию активная версия)"
+    )
+    score.add_argument("--chunk-size", type=int, default=100_000)
+    score.add_argument("--workers", type=int, default=1, help="число процессов")
+    score.add_argument("--sep", default=";")
+    score.add_argument("--encoding", default="cp1251")
+    score.set_defaults(func=cmd_score)
+
+    register = sub.add_parser(
+        "register-model", help="записать метаданные версии модели для реестра"
+    )
+    register.add_argument("--model", required=True, help="путь к .pkl в каталоге реестра")
+    register.add_argument("--version", default=None, help="имя версии (по умолчанию имя файла)")
+    register.add_argument("--threshold-medium", type=float, default=None)
+    register.add_argument("--threshold-high", type=float, default=None)
+    register.add_argument("--metrics", default=None, help='JSON, напр. \'{"roc_auc": 0.88}\'')
+    register.add_argument(
+        "--golden-from", default=None, help="CSV выгрузки, из которой берётся golden sample"
+    )
+    register.add_argument("--golden-size", type=int, default=50)
+    register.add_argument("--features", default=None, help="CSV поведенческих фич")
+    register.add_argument("--sep", default=";")
+    register.add_argument("--encoding", default="cp1251")
+    register.set_defaults(func=cmd_register_model)
+
+    export = sub.add_parser(
+        "export-model", help="экспорт модели в .ubj (UBJSON xgboost) или .trees (mmap)"
+    )
+    export.add_argument("--model", required=True, help="исходная модель (.pkl/.ubj)")
+    export.add_argument("--output", required=True, help="путь .ubj или .trees в каталоге реестра")
+    export.add_argument(
+        "--version", default=None, help="имя версии (по умолчанию <версия источника>-<формат>)"
+    )
+    export.set_defaults(func=cmd_export_model)
+
+    backfill = sub.add_parser(
+        "velocity-backfill", help="признаки скорости переводов по истории транзакций"
+    )
+    backfill.add_argument("--input", required=True, help="CSV (как data.csv) или .parquet")
+    backfill.add_argument("--output", required=True, help="выходной .csv или .parquet")
+    backfill.add_argument("--chunk-size", type=int, default=200_000)
+    backfill.add_argument("--sep", default=";")
+    backfill.add_argument("--encoding", default="cp1251")
+    backfill.set_defaults(func=cmd_velocity_backfill)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,69 @@ class Settings(BaseSettings):
     # === ML / модель ===
     MODEL_PATH: str = "ml/models/model_xgb_baseline.pkl"
 
+    # Когда грузить модель: startup (до приёма запросов) | lazy (первый запрос) |
+    # import (при импорте приложения — для gunicorn --preload)
+    MODEL_LOAD: str = "startup"
+
+    # Реестр версий моделей (<name>.pkl + <name>.json, указатель ACTIVE.json).
+    # MODEL_REGISTRY_POLL_SEC > 0 — воркеры сами подхватывают новую активную версию
+    MODEL_REGISTRY_DIR: str = "ml/models"
+    MODEL_REGISTRY_POLL_SEC: float = 0.0
+
+    # Теневой скоринг: версии challenger'ов через запятую, доля трафика в тени
+    # и максимум задач в очереди теневого пула (сверх — пропускаем)
+    SHADOW_MODELS: str = ""
+    SHADOW_FRACTION: float = 0.1
+    SHADOW_MAX_PENDING: int = 100
+
+    # Движок инференса: sklearn | booster | numpy (см. services/inference.py)
+    INFERENCE_BACKEND: str = "booster"
+
+    # Пул для инференса: thread | process, и число воркеров в нём
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_WORKERS: int = 4
+
+    # Отдельный пул для блокирующего I/O (аудит, LLM)
+    IO_WORKERS: int = 16
+
+    # Micro-batching одиночных /score_transaction (по умолчанию выключен):
+    # батч уходит в модель по набору MAX_SIZE запросов или через MAX_WAIT_MS
+    SCORING_BATCHER_ENABLED: bool = False
+    SCORING_BATCH_MAX_SIZE: int = 64
+    SCORING_BATCH_MAX_WAIT_MS: float = 2.0
+
+    # /score_stream: сколько NDJSON-строк скорится одним батчем
+    STREAM_CHUNK_SIZE: int = 1000
+    # и предельная длина строки (байт): длиннее — запись с ошибкой вместо результата
+    STREAM_MAX_LINE_BYTES: int = 65_536
+
+    # Кэш результатов скоринга (LRU + TTL), включается SCORE_CACHE_SIZE > 0:
+    # закэшированный скор живёт до TTL и после смены порогов/метаданных версии
+    SCORE_CACHE_SIZE: int = 0
+    SCORE_CACHE_TTL_SEC: float = 300.0
+    # батчи длиннее идут мимо кэша (выгрузки не вытесняют горячие ключи)
+    SCORE_CACHE_MAX_BATCH: int = 64
+
+    # Онлайн-стор поведенческих фич (сессии 7d/30d по client_id), по умолчанию
+    # выключен: состояние в памяти процесса, при нескольких воркерах события
+    # клиента должны попадать в процесс его скоринга. MAX_CLIENTS — LRU-лимит
+    FEATURE_STORE_ENABLED: bool = False
+    FEATURE_STORE_MAX_CLIENTS: int = 1_000_000
+
+    # Признаки скорости переводов по клиенту/получателю, онлайн по умолчанию
+    # выключены. Счётчики живут в памяти процесса и не делятся между воркерами:
+    # включать с одним воркером (или когда транзакции клиента и получателя
+    # приходят в один процесс), иначе каждый воркер видит только свою часть.
+    # MAX_KEYS — лимит ключей каждого вида (LRU), горизонт флага "новый получатель"
+    VELOCITY_ENABLED: bool = False
+    VELOCITY_MAX_KEYS: int = 1_000_000
+    VELOCITY_NEW_DESTINATION_DAYS: float = 30.0
+    # Сколько последних transaction_id помнить, чтобы ретраи не учитывались дважды
+    VELOCITY_DEDUP_IDS: int = 100_000
+
+    # Локальные объяснения (TreeSHAP): сколько фич отдавать по умолчанию
+    ATTRIBUTION_TOP_K: int = 5
+
     # Пороги риска
     RISK_THRESHOLD_MEDIUM: float = 0.26
     RISK_THRESHOLD_HIGH: float = 0.80
@@ -18,12 +81,56 @@ class Settings(BaseSettings):
     # Простой API-токен (если пустой — проверка выключена)
     API_TOKEN: str | None = None
 
+    # Токен админских эндпоинтов (/admin/...); если пустой — они выключены
+    ADMIN_TOKEN: str | None = None
+
+    # Метрики в формате Prometheus на GET /metrics (без токена, как принято для скрейпа)
+    METRICS_ENABLED: bool = True
+
+    # Профилирование живого воркера (POST /admin/profile, нужен ADMIN_TOKEN):
+    # выключено по умолчанию; максимальная длина окна в секундах
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_SEC: float = 60.0
+
     # Логи (SQLite или файл — зависит от твоей реализации логгера)
     LOG_DB_PATH: str = "logs/scoring_logs.db"
 
+    # Фоновая запись аудита: размер очереди, пачка, окно сброса,
+    # поведение при переполнении очереди: block | drop
+    AUDIT_QUEUE_SIZE: int = 10_000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_BACKPRESSURE: str = "block"
+
+    # Аудит и теневой скоринг хранятся по суткам (scoring_logs_YYYYMMDD,
+    # shadow_logs_YYYYMMDD); при AUDIT_RETENTION_DAYS > 0 таблицы старше
+    # удаляются, по умолчанию история хранится целиком
+    AUDIT_RETENTION_DAYS: int = 0
+
     # LLM (OpenAI)
     OPENAI_MODEL: str = "gpt-4o"
     OPENAI_API_KEY: str | None = None  # возьмётся из .env при наличии
+    # Любой OpenAI-совместимый сервер (например, локальная заглушка в тестах)
+    OPENAI_BASE_URL: str | None = None
+
+    # Ограничения вызова LLM: таймаут HTTP, ретраи, общий дедлайн на объяснение,
+    # число одновременных вызовов и circuit breaker (ошибок подряд / пауза)
+    LLM_TIMEOUT_SEC: float = 8.0
+    LLM_MAX_RETRIES: int = 0
+    LLM_DEADLINE_SEC: float = 10.0
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SEC: float = 30.0
+
+    # Передавать в промпт LLM top-k вкладов фич вместо полного списка признаков
+    LLM_PROMPT_CONTRIBUTIONS: bool = True
+
+    # Кэш LLM-объяснений (SQLite-файл); пустой путь выключает кэш.
+    # Вероятность в ключе округляется до бакета шириной EXPLAIN_CACHE_PROBA_BUCKET
+    EXPLAIN_CACHE_PATH: str | None = "logs/explanations_cache.db"
+    EXPLAIN_CACHE_TTL_SEC: float = 7 * 24 * 3600
+    EXPLAIN_CACHE_MAX_ROWS: int = 50_000
+    EXPLAIN_CACHE_PROBA_BUCKET: float = 0.01
 
     class Config:
         env_file = ".env"
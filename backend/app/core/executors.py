@@ -0,0 +1,108 @@
+# backend/app/core/executors.py
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from backend.app.core.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Два независимых пула, чтобы медленные LLM-запросы не съедали потоки скоринга:
+# - inference: CPU-работа модели (XGBoost отпускает GIL) — потоки или процессы;
+# - io: блокирующий ввод-вывод (аудит при переполненной очереди, LLM).
+_inference_executor: Optional[Executor] = None
+_io_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _warm_inference_worker() -> None:
+    # в дочернем процессе модель грузится один раз при старте воркера
+    from backend.app.services.fraud_model import get_fraud_model_service
+
+    get_fraud_model_service()
+
+
+def get_inference_executor() -> Executor:
+    global _inference_executor
+    if _inference_executor is None:
+        with _lock:
+            if _inference_executor is None:
+                if settings.INFERENCE_EXECUTOR == "process":
+                    _inference_executor = ProcessPoolExecutor(
+                        max_workers=settings.INFERENCE_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_warm_inference_worker,
+                    )
+                elif settings.INFERENCE_EXECUTOR == "thread":
+                    _inference_executor = ThreadPoolExecutor(
+                        max_workers=settings.INFERENCE_WORKERS,
+                        thread_name_prefix="inference",
+                    )
+                else:
+                    raise ValueError(
+                        f"Unknown INFERENCE_EXECUTOR={settings.INFERENCE_EXECUTOR!r}, "
+                        "expected 'thread' or 'process'"
+                    )
+    return _inference_executor
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        with _lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(
+                    max_workers=settings.IO_WORKERS,
+                    thread_name_prefix="io",
+                )
+    return _io_executor
+
+
+async def run_inference(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Запускает CPU-bound функцию модели в пуле инференса.
+    Для INFERENCE_EXECUTOR=process fn должна быть функцией уровня модуля.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), fn, *args)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Запускает блокирующий ввод-вывод в отдельном io-пуле.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_io_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+def recycle_inference_executor() -> None:
+    """
+    После смены модели пул процессов пересоздаётся: новые воркеры
+    поднимаются уже на активной версии, старые дорабатывают начатое.
+    Пулу потоков это не нужно — он видит новую модель сразу.
+    """
+    global _inference_executor
+    with _lock:
+        if isinstance(_inference_executor, ProcessPoolExecutor):
+            _inference_executor.shutdown(wait=False)
+            _inference_executor = None
+
+
+def shutdown_executors() -> None:
+    global _inference_executor, _io_executor
+    with _lock:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=True)
+            _inference_executor = None
+        if _io_executor is not None:
+            _io_executor.shutdown(wait=True)
+            _io_executor = None
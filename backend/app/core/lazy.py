@@ -0,0 +1,44 @@
+# backend/app/core/lazy.py
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazySingleton(Generic[T]):
+    """
+    Сервис, который создаётся при первом обращении, а не при импорте модуля.
+
+    get_x = LazySingleton(build_x) вызывается как функция: get_x() —
+    годится и для Depends(get_x) в FastAPI, и для кода вне запросов
+    (пулы инференса, CLI). Создание защищено блокировкой: одновременные
+    первые запросы не построят сервис дважды.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        functools.update_wrapper(self, factory)
+
+    def __call__(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self.factory()
+                instance = self._instance
+        return instance
+
+    def peek(self) -> Optional[T]:
+        """
+        Уже созданный экземпляр или None (для shutdown: не создавать ради закрытия).
+        """
+        return self._instance
+
+
+def lazy_singleton(factory: Callable[[], T]) -> LazySingleton[T]:
+    return LazySingleton(factory)
@@ -0,0 +1,316 @@
+# backend/app/core/metrics.py
+"""
+Метрики процесса в формате Prometheus (text exposition 0.0.4) без внешних зависимостей.
+
+Горячий путь не берёт блокировок: у каждого потока свой шард счётчиков
+(threading.local), запись — обычный += в списке своего потока. Блокировка
+нужна только при первом обращении потока к метрике и при создании набора
+меток, поэтому метки стоит связывать заранее:
+
+    FEATURES = STAGE_SECONDS.labels("feature_build")
+    ...
+    FEATURES.observe(time.perf_counter() - t0)
+
+Шарды суммируются при чтении (/metrics). Значения — по процессу: при нескольких
+воркерах Prometheus собирает каждый отдельно.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+# секунды: от 100 мкс (одна строка модели) до 10 с (LLM)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+CallbackValue = Union[float, Mapping[LabelValues, float]]
+
+
+class _Shards:
+    """
+    Поток пишет только в свой список; читатель суммирует все списки.
+    Шарды завершившихся потоков остаются — счётчики не должны убывать.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self.width
+            with self._lock:
+                self._all.append(values)
+            self._local.values = values
+            return values
+
+    def total(self) -> List[float]:
+        out = [0] * self.width
+        with self._lock:
+            shards = list(self._all)
+        for values in shards:
+            for i, v in enumerate(values):
+                out[i] += v
+        return out
+
+
+class CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self) -> None:
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.mine()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.total()[0]
+
+
+class HistogramChild:
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds: Sequence[float]):
+        self._bounds = list(bounds)
+        # счётчики по бакетам (последний — +Inf) и сумма
+        self._shards = _Shards(len(self._bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._shards.mine()
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """
+        (накопленные счётчики по бакетам, включая +Inf; сумма).
+        """
+        total = self._shards.total()
+        cumulative, running = [], 0
+        for count in total[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, total[-1]
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: object) -> object:
+        # метки почти всегда строки: ищем по исходному кортежу без преобразований
+        child = self._children.get(values)  # type: ignore[arg-type]
+        if child is None:
+            key = tuple(map(str, values))
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def labels(self, *values: object) -> CounterChild:
+        return super().labels(*values)  # type: ignore[return-value]
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def render(self) -> Iterable[str]:
+        for key, child in self._items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(child.value())}"
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def labels(self, *values: object) -> HistogramChild:
+        return super().labels(*values)  # type: ignore[return-value]
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> Iterable[str]:
+        for key, child in self._items():
+            cumulative, total = child.snapshot()
+            for bound, count in zip((*self.buckets, math.inf), cumulative):
+                le = _labels((*self.labelnames, "le"), (*key, _num(bound)))
+                yield f"{self.name}_bucket{le} {_num(count)}"
+            base = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{base} {_num(total)}"
+            yield f"{self.name}_count{base} {_num(cumulative[-1])}"
+
+
+class Callback(_Family):
+    """
+    Значение считается при чтении /metrics (глубина очереди, размер стора,
+    счётчики, которые сервис уже ведёт сам). fn возвращает число или
+    {значения меток: число}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], CallbackValue],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> Iterable[str]:
+        value = self.fn()
+        items = value.items() if isinstance(value, Mapping) else [((), value)]
+        for key, v in sorted(items):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(v)}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def register(self, family: _Family) -> _Family:
+        # повторная регистрация (create_app в тестах, перезагрузка модуля) заменяет метрику
+        with self._lock:
+            self._families[family.name] = family
+        return family
+
+    def get(self, name: str) -> Optional[_Family]:
+        return self._families.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines: List[str] = []
+        for family in families:
+            try:
+                samples = list(family.render())
+            except Exception as exc:  # колбэк не должен ронять весь /metrics
+                lines.append(f"# {family.name} unavailable: {type(exc).__name__}")
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+registry = MetricsRegistry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+
+def callback(
+    name: str,
+    help: str,
+    fn: Callable[[], CallbackValue],
+    labelnames: Sequence[str] = (),
+    kind: str = "gauge",
+) -> Callback:
+    return registry.register(Callback(name, help, fn, labelnames, kind))  # type: ignore[return-value]
+
+
+# --- метрики скоринга ---
+
+STAGE_SECONDS = histogram(
+    "antifraud_stage_seconds",
+    "Latency of scoring pipeline stages",
+    labelnames=("stage",),
+)
+SCORED_TOTAL = counter(
+    "antifraud_scored_total",
+    "Scored transactions by risk level and model version",
+    labelnames=("risk_level", "model_version"),
+)
+BATCH_SIZE = histogram(
+    "antifraud_batch_size",
+    "Items per batch by source",
+    labelnames=("source",),
+    buckets=SIZE_BUCKETS,
+)
+
+# заранее связанные метки горячего пути
+STAGE_ENRICH = STAGE_SECONDS.labels("enrich")
+STAGE_FEATURE_BUILD = STAGE_SECONDS.labels("feature_build")
+STAGE_INFERENCE = STAGE_SECONDS.labels("inference")
+STAGE_AUDIT_ENQUEUE = STAGE_SECONDS.labels("audit_enqueue")
+STAGE_AUDIT_WRITE = STAGE_SECONDS.labels("audit_write")
+STAGE_LLM_CALL = STAGE_SECONDS.labels("llm_call")
@@ -0,0 +1,186 @@
+# backend/app/core/profiling.py
+"""
+Профилирование живого воркера по запросу (см. /admin/profile).
+
+    cpu   — сэмплирующий профайлер: отдельный поток раз в interval снимает стеки
+            всех потоков (sys._current_frames) и копит их в collapsed-формате
+            "a;b;c N" — его принимают flamegraph.pl, speedscope, inferno;
+    alloc — tracemalloc на время окна: какие строки кода выделили память
+            и сколько её осталось живой к концу окна.
+
+Пока профиль не запущен, ничего не установлено: ни sys.setprofile, ни потока,
+ни трассировки аллокаций — горячий путь скоринга не платит ничего.
+Одновременно в процессе идёт не больше одного профиля.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# листовые кадры потоков, которые просто ждут работы (пулы, очереди, event loop)
+IDLE_FRAMES = frozenset(
+    {
+        ("threading", "Condition.wait"),
+        ("threading", "Event.wait"),
+        ("queue", "Queue.get"),
+        ("selectors", "EpollSelector.select"),
+        ("selectors", "KqueueSelector.select"),
+        ("selectors", "SelectSelector.select"),
+        ("concurrent.futures.thread", "_worker"),
+    }
+)
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> Tuple[str, str]:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or code.co_filename
+    return module, getattr(code, "co_qualname", code.co_name)
+
+
+class SamplingProfiler:
+    """
+    Сэмплы всех потоков процесса, кроме собственного. Стек пишется от корня
+    к листу, кадр — "модуль:Класс.метод".
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not _busy.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is already running")
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self.started_at
+            _busy.release()
+        return self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not stack or (not self.include_idle and stack[0] in IDLE_FRAMES):
+                    continue
+                self.stacks[";".join(f"{m}:{f}" for m, f in reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        Профиль в collapsed-формате, самые частые стеки сверху.
+        """
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        """
+        Доля сэмплов, в которых функция была листом (self) и была в стеке (total).
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            for frame in set(frames):
+                total[frame] += n
+        ticks = max(self.samples, 1)
+        return {
+            "samples": self.samples,
+            "duration_sec": round(self.duration, 3),
+            "top_self": [
+                {"frame": f, "share": round(n / ticks, 4)} for f, n in own.most_common(top)
+            ],
+            "top_total": [
+                {"frame": f, "share": round(n / ticks, 4)} for f, n in total.most_common(top)
+            ],
+        }
+
+
+class AllocationProfiler:
+    """
+    tracemalloc на время окна. Если трассировку уже кто-то включил
+    (PYTHONTRACEMALLOC), она не выключается по окончании.
+    """
+
+    def __init__(self, frames: int = 1):
+        self.frames = frames
+        self._owned = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self.stats: List[tracemalloc.StatisticDiff] = []
+        self.peak = 0
+
+    def start(self) -> None:
+        if not _busy.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is already running")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owned = True
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+
+    def stop(self) -> "AllocationProfiler":
+        if self._before is None:
+            return self
+        try:
+            after = tracemalloc.take_snapshot()
+            _, self.peak = tracemalloc.get_traced_memory()
+        finally:
+            if self._owned:
+                tracemalloc.stop()
+            _busy.release()
+        # сами снимки и служебные кадры в отчёт не попадают
+        noise = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )
+        key = "traceback" if self.frames > 1 else "lineno"
+        self.stats = after.filter_traces(noise).compare_to(
+            self._before.filter_traces(noise), key
+        )
+        self._before = None
+        return self
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        """
+        Строки кода с наибольшим приростом живой памяти за окно.
+        """
+        return {
+            "peak_kb": round(self.peak / 1024, 1),
+            "top": [
+                {
+                    "where": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count_diff": stat.count_diff,
+                }
+                for stat in self.stats[:top]
+            ],
+        }
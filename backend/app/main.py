@@ -1,16 +1,66 @@
 # backend/app/main.py
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from backend.app.core.config import get_settings
+from backend.app.api.v1.admin import router as admin_router
+from backend.app.api.v1.features import router as features_router
 from backend.app.api.v1.scoring import router as scoring_router
-from backend.app.services.audit_logger import init_log_db
+from backend.app.core.executors import run_io, shutdown_executors
+from backend.app.core.metrics import CONTENT_TYPE, registry as metrics_registry
+from backend.app.services.audit_logger import audit_writer, init_log_db
+from backend.app.services.fraud_model import get_fraud_model_service
+from backend.app.services.llm_explainer import get_llm_explainer_service
+from backend.app.services.shadow import get_shadow_scoring
 
 settings = get_settings()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # инициализируем БД логов при старте; перенос старых таблиц в суточные
+    # идёт порциями в io-пуле и не держит цикл событий
+    await run_io(init_log_db)
+    audit_writer.start()
+
+    # модель грузится в io-пуле до приёма запросов (MODEL_LOAD=startup)
+    # или при первом запросе (MODEL_LOAD=lazy)
+    if settings.MODEL_LOAD != "lazy":
+        await run_io(get_fraud_model_service)
+    get_shadow_scoring().start()
+
+    # синхронизация активной версии модели между воркерами
+    watcher = None
+    if settings.MODEL_REGISTRY_POLL_SEC > 0:
+        watcher = asyncio.create_task(
+            get_fraud_model_service().watch_registry(settings.MODEL_REGISTRY_POLL_SEC)
+        )
+
+    yield
+
+    # дописываем очередь аудита и гасим пулы перед остановкой процесса;
+    # сервисы, которые так и не понадобились, не создаём ради закрытия
+    if watcher is not None:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+    shutdown_executors()
+    shadow = get_shadow_scoring.peek()
+    if shadow is not None:
+        shadow.stop()
+    audit_writer.stop()
+    explainer = get_llm_explainer_service.peek()
+    if explainer is not None:
+        await explainer.aclose()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.PROJECT_NAME)
+    app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
     # CORS для фронта
     origins = [
@@ -26,21 +76,35 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # инициализируем БД логов при старте
-    @app.on_event("startup")
-    def startup_event():
-        init_log_db()
-
     app.include_router(
         scoring_router,
         prefix=settings.API_V1_PREFIX,
     )
+    app.include_router(
+        features_router,
+        prefix=settings.API_V1_PREFIX,
+    )
+    app.include_router(
+        admin_router,
+        prefix=settings.API_V1_PREFIX,
+    )
 
     @app.get("/", tags=["health"])
     def health_check():
         return {"status": "ok"}
 
+    if settings.METRICS_ENABLED:
+
+        @app.get("/metrics", tags=["health"], include_in_schema=False)
+        def metrics() -> PlainTextResponse:
+            return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
+
     return app
 
 
+# MODEL_LOAD=import: модель грузится при импорте — для gunicorn --preload,
+# чтобы воркеры получили её от master-процесса через copy-on-write
+if settings.MODEL_LOAD == "import":
+    get_fraud_model_service()
+
 app = create_app()
@@ -0,0 +1,34 @@
+# backend/app/schemas/features.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SessionEvent(BaseModel):
+    """
+    Событие логин-сессии клиента для онлайн-стора фич.
+    """
+    client_id: str = Field(..., min_length=1)
+    ts: datetime = Field(..., description="Время входа (без таймзоны — UTC)")
+    os_version: Optional[str] = None
+    phone_model: Optional[str] = None
+
+
+class SessionIngestRequest(BaseModel):
+    events: List[SessionEvent]
+
+
+class SessionIngestResponse(BaseModel):
+    received: int
+    # сессии, принятые в окна; остальное — повтор в той же минуте или опоздавшие
+    ingested: int
+
+
+class ClientFeaturesResponse(BaseModel):
+    client_id: str
+    os_version_last: Optional[str] = None
+    phone_model_last: Optional[str] = None
+    features: Dict[str, Optional[float]]
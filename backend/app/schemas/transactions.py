@@ -1,6 +1,7 @@
 # backend/app/schemas/transactions.py
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
@@ -13,9 +14,21 @@ class TransactionScoringRequest(BaseModel):
 
     amount: float = Field(..., ge=0, description="Сумма совершенного перевода")
 
+    # Идентификатор транзакции: повтор запроса с тем же id (ретрай клиента,
+    # batch + stream) не учитывается в признаках скорости второй раз
+    transaction_id: Optional[str] = None
+
+    # Получатель и время перевода — для признаков скорости (services/velocity.py);
+    # без transdatetime берётся время запроса
+    destination_id: Optional[str] = None
+    transdatetime: Optional[datetime] = None
+
     # Поведенческие фичи (все опциональные)
     os_ver_cnt_30d: Optional[float] = None
     phone_model_cnt_30d: Optional[float] = None
+    # последние модель телефона и версия ОС (кодируются словарём из манифеста модели)
+    phone_model_last: Optional[str] = None
+    os_version_last: Optional[str] = None
     login_sessions_7d: Optional[float] = None
     login_sessions_30d: Optional[float] = None
     logins_per_day_7d: Optional[float] = None
@@ -30,17 +43,38 @@ class TransactionScoringRequest(BaseModel):
     fano_factor_sessions: Optional[float] = None
     zscore_interval_7d_vs_30d: Optional[float] = None
 
+    # Скорость переводов (по умолчанию считается сервером по client_id)
+    client_txn_cnt_1h: Optional[float] = None
+    client_txn_cnt_24h: Optional[float] = None
+    client_amount_sum_1h: Optional[float] = None
+    client_amount_sum_24h: Optional[float] = None
+    client_new_destination: Optional[float] = None
+    destination_clients_24h: Optional[float] = None
+
+
+class FeatureContribution(BaseModel):
+    """
+    Вклад одной фичи в решение модели (TreeSHAP, в лог-odds).
+    """
+    feature: str
+    value: float
+    contribution: float
+
 
 class TransactionScoringResponse(BaseModel):
     fraud_probability: float
     risk_level: str
     model_version: str = "xgb_baseline_v1"
+    # заполняется только по запросу (include_contributions в /score_batch)
+    contributions: Optional[List[FeatureContribution]] = None
 
 
 # Для batch-скоринга можно возвращать просто List[TransactionScoringResponse],
 # но для удобства оборачиваем:
 class BatchScoringRequest(BaseModel):
     items: List[TransactionScoringRequest]
+    # добавить к каждому результату top-k вкладов фич
+    include_contributions: bool = False
 
 
 class BatchScoringResponse(BaseModel):
@@ -62,3 +96,15 @@ class TransactionExplainResponse(BaseModel):
     fraud_probability: float
     risk_level: str
     explanation: str
+
+
+class FeatureExplanationResponse(BaseModel):
+    """
+    Быстрое локальное объяснение: top-k фич по модулю вклада.
+    base_value + сумма всех вкладов = лог-odds модели.
+    """
+    fraud_probability: float
+    risk_level: str
+    model_version: str = "xgb_baseline_v1"
+    base_value: float
+    contributions: List[FeatureContribution]
@@ -0,0 +1,153 @@
+# backend/app/services/attribution.py
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.schemas.transactions import (
+    FeatureContribution,
+    TransactionScoringRequest,
+    TransactionScoringResponse,
+)
+from backend.app.core.lazy import lazy_singleton
+from backend.app.services.fraud_model import FraudModelService, get_fraud_model_service
+from backend.app.services.inference import best_iteration_range
+from backend.app.services.model_registry import ModelBundle
+
+
+class FeatureAttributionService:
+    """
+    Локальные объяснения решений модели без LLM.
+
+    Вклад каждой фичи считается нативным TreeSHAP XGBoost
+    (Booster.predict(pred_contribs=True)) сразу для всего батча.
+    Вклады в лог-odds: сумма по фичам + base_value = margin модели.
+    Booster берётся из текущего бандла модели и пересобирается
+    только при смене checksum (активация другой версии); деревья —
+    те же, что у скоринга (до best_iteration).
+    """
+
+    def __init__(self, model_service: FraudModelService):
+        self.model_service = model_service
+        # (checksum, booster, iteration_range) одним кортежем:
+        # подмена модели не даст смешать версии
+        self._prepared: Optional[Tuple[str, Any, Tuple[int, int]]] = None
+
+    def available(self) -> bool:
+        # TreeSHAP считает xgboost: для моделей из .trees его нет
+        return self.model_service.bundle.model is not None
+
+    def _booster(self, bundle: ModelBundle) -> Tuple[Any, Tuple[int, int]]:
+        if bundle.model is None:
+            raise RuntimeError(
+                f"Feature attribution needs an xgboost model, {bundle.path} has none"
+            )
+        prepared = self._prepared
+        if prepared is None or prepared[0] != bundle.checksum:
+            booster = bundle.model.get_booster()
+            prepared = (bundle.checksum, booster, best_iteration_range(booster))
+            self._prepared = prepared
+        return prepared[1], prepared[2]
+
+    def contributions(
+        self, X: np.ndarray, bundle: Optional[ModelBundle] = None
+    ) -> np.ndarray:
+        """
+        Матрица вкладов (n_items x (n_features + 1)); последний столбец — base_value.
+        """
+        import xgboost as xgb
+
+        booster, iteration_range = self._booster(bundle or self.model_service.bundle)
+        dmatrix = xgb.DMatrix(X, missing=np.nan)
+        return booster.predict(
+            dmatrix,
+            pred_contribs=True,
+            iteration_range=iteration_range,
+            validate_features=False,
+        )
+
+    def explain_many(
+        self,
+        reqs: Sequence[TransactionScoringRequest],
+        top_k: int,
+        bundle: Optional[ModelBundle] = None,
+    ) -> List[Tuple[float, List[FeatureContribution]]]:
+        """
+        Для каждого запроса: (base_value, top_k фич по |вкладу|).
+        """
+        if not reqs:
+            return []
+        bundle = bundle or self.model_service.bundle
+        X = bundle.plan.build_matrix(reqs)
+        contribs = self.contributions(X, bundle)
+        values, base = contribs[:, :-1], contribs[:, -1]
+
+        k = max(0, min(top_k, values.shape[1]))
+        # топ-k по модулю вклада одним argsort на весь батч
+        order = np.argsort(-np.abs(values), axis=1, kind="stable")[:, :k]
+
+        names = bundle.feature_names
+        result = []
+        for i in range(len(reqs)):
+            top = [
+                FeatureContribution(
+                    feature=names[j],
+                    value=float(X[i, j]),
+                    contribution=float(values[i, j]),
+                )
+                for j in order[i]
+            ]
+            result.append((float(base[i]), top))
+        return result
+
+    def score_and_explain(
+        self, req: TransactionScoringRequest, top_k: int
+    ) -> Tuple[TransactionScoringResponse, float, List[FeatureContribution]]:
+        """
+        Скоринг и вклады фич на одном бандле: при горячей подмене модели
+        вероятность и объяснение не разойдутся по версиям.
+        """
+        bundle = self.model_service.bundle
+        response = self.model_service.score(req, bundle)
+        [(base_value, contributions)] = self.explain_many([req], top_k, bundle)
+        return response, base_value, contributions
+
+    def score_and_explain_many(
+        self, reqs: Sequence[TransactionScoringRequest], top_k: int
+    ) -> List[TransactionScoringResponse]:
+        """
+        Батч-вариант score_and_explain: ответы скоринга с заполненными
+        contributions, вероятности и вклады — от одного бандла.
+        """
+        bundle = self.model_service.bundle
+        responses = self.model_service.score_many(reqs, bundle)
+        for response, (_, contributions) in zip(
+            responses, self.explain_many(reqs, top_k, bundle)
+        ):
+            response.contributions = contributions
+        return responses
+
+
+@lazy_singleton
+def get_feature_attribution_service() -> FeatureAttributionService:
+    return FeatureAttributionService(get_fraud_model_service())
+
+
+# Функция уровня модуля для пула инференса (см. core/executors.py)
+def explain_features_many(
+    reqs: Sequence[TransactionScoringRequest], top_k: int
+) -> List[Tuple[float, List[FeatureContribution]]]:
+    return get_feature_attribution_service().explain_many(reqs, top_k)
+
+
+def score_and_explain_features(
+    req: TransactionScoringRequest, top_k: int
+) -> Tuple[TransactionScoringResponse, float, List[FeatureContribution]]:
+    return get_feature_attribution_service().score_and_explain(req, top_k)
+
+
+def score_with_contributions_many(
+    reqs: Sequence[TransactionScoringRequest], top_k: int
+) -> List[TransactionScoringResponse]:
+    return get_feature_attribution_service().score_and_explain_many(reqs, top_k)
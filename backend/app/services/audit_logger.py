@@ -1,40 +1,302 @@
 # backend/app/services/audit_logger.py
 from __future__ import annotations
 
-import os
+import logging
+import queue
 import sqlite3
-from datetime import datetime
-from typing import Optional
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from backend.app.core.config import get_settings
+from backend.app.core.executors import run_io
+from backend.app.core.metrics import (
+    BATCH_SIZE,
+    SCORED_TOTAL,
+    STAGE_AUDIT_ENQUEUE,
+    STAGE_AUDIT_WRITE,
+    callback,
+)
+from backend.app.services.audit_store import (
+    DAY_MS,
+    AuditRow,
+    apply_retention,
+    create_partition,
+    ensure_schema,
+    init_log_db,
+    insert_sql,
+    now_ms,
+    open_connection,
+    partition_name,
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
+# (client_id, amount, fraud_probability, risk_level, model_version)
+ScoringEvent = Tuple[Optional[str], Optional[float], float, str, Optional[str]]
 
-def _get_connection() -> sqlite3.Connection:
-    db_path = settings.LOG_DB_PATH
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    return conn
+_STOP = object()
 
+BATCH_SIZE_AUDIT = BATCH_SIZE.labels("audit_write")
 
-def init_log_db() -> None:
-    conn = _get_connection()
-    cur = conn.cursor()
-    cur.execute(
+
+class AuditWriter:
+    """
+    Фоновый (write-behind) писатель аудита.
+
+    Обработчики запросов только кладут строки в ограниченную очередь.
+    Один выделенный поток держит постоянное WAL-соединение и пишет
+    пачками через executemany: по batch_size строк или раз в flush_interval_ms.
+    Строки раскладываются по суточным таблицам (services/audit_store.py);
+    с появлением новых суток писатель заодно удаляет таблицы старше
+    retention_days.
+
+    Когда очередь заполнена:
+    - backpressure="block" — вызывающий поток ждёт место в очереди;
+    - backpressure="drop"  — строка отбрасывается, растёт счётчик dropped.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        backpressure: str = "block",
+        retention_days: int = 0,
+    ):
+        if backpressure not in ("block", "drop"):
+            raise ValueError(f"Unknown AUDIT_BACKPRESSURE={backpressure!r}")
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.backpressure = backpressure
+        self.retention_days = retention_days
+
+        # сутки (ts // DAY_MS), для которых таблица уже создана этим писателем
+        self._days: Dict[int, str] = {}
+        self._retention_due = False
+
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._drop_lock = threading.Lock()
+
+        self.dropped = 0
+        self.written = 0
+
+    # --- жизненный цикл ---
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="audit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def flush(self) -> None:
         """
-        CREATE TABLE IF NOT EXISTS scoring_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT NOT NULL,
-            client_id TEXT,
-            amount REAL,
-            fraud_probability REAL,
-            risk_level TEXT
-        )
+        Ждёт, пока всё, что уже в очереди, будет записано в БД.
         """
-    )
-    conn.commit()
-    conn.close()
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Дописывает очередь и останавливает поток (хук на shutdown приложения).
+        """
+        with self._start_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # --- запись ---
+
+    def _ensure_running(self) -> None:
+        # поток мог умереть (или ещё не стартовать): без него "block" повиснет
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self.start()
+
+    def enqueue(self, row: AuditRow) -> None:
+        self._ensure_running()
+
+        if self.backpressure == "block":
+            self._queue.put(row)
+            return
+
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def enqueue_many(self, rows: Iterable[AuditRow]) -> None:
+        for row in rows:
+            self.enqueue(row)
+
+    def offer(self, row: AuditRow) -> bool:
+        """
+        Неблокирующая попытка положить строку в очередь.
+        False — очередь полна (решение, ждать или отбросить, за вызывающим).
+        """
+        self._ensure_running()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            return False
+
+    def _open(self) -> sqlite3.Connection:
+        # таблицы суток создаются заново в каждом соединении (файл мог смениться)
+        self._days = {}
+        conn = open_connection(self.db_path)
+        try:
+            ensure_schema(conn)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except BaseException:
+            conn.close()
+            raise
+        self._apply_retention(conn)
+        return conn
+
+    def _next_batch(self) -> Tuple[List[AuditRow], int, bool]:
+        """
+        (строки пачки, сколько элементов взято из очереди, пришёл ли sentinel).
+        """
+        batch: List[AuditRow] = []
+        item = self._queue.get()
+        taken = 1
+        stop = False
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)  # type: ignore[arg-type]
+            if stop or len(batch) >= self.batch_size:
+                break
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            taken += 1
+
+        if stop:
+            # дочитываем то, что успели положить до/после sentinel
+            while True:
+                try:
+                    tail = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if tail is not _STOP:
+                    batch.append(tail)  # type: ignore[arg-type]
+        return batch, taken, stop
+
+    def _run(self) -> None:
+        # поток писателя не должен умирать ни на какой ошибке: иначе "block" повиснет.
+        # БД открывается перед пачкой; если файл недоступен, пачка отбрасывается,
+        # а открыть его пробуем снова на следующей
+        conn: Optional[sqlite3.Connection] = None
+        stop = False
+        try:
+            while not stop:
+                batch, taken, stop = self._next_batch()
+                try:
+                    if conn is None and batch:
+                        conn = self._open()
+                    if conn is not None:
+                        self._write(conn, batch)
+                except Exception:
+                    logger.exception("Audit batch of %d rows was not written", len(batch))
+                    with self._drop_lock:
+                        self.dropped += len(batch)
+                    # CREATE TABLE откатился вместе с пачкой
+                    self._days = {}
+                    if conn is not None:
+                        try:
+                            conn.rollback()
+                        except sqlite3.Error:
+                            conn.close()
+                            conn = None
+                finally:
+                    for _ in range(taken):
+                        self._queue.task_done()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[AuditRow]) -> None:
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        # пачка почти всегда в одних сутках, на полуночи — в двух
+        by_day: Dict[int, List[AuditRow]] = {}
+        for row in batch:
+            by_day.setdefault(row[0] // DAY_MS, []).append(row)
+        for day, rows in by_day.items():
+            conn.executemany(insert_sql(self._partition(conn, day)), rows)
+        conn.commit()
+        STAGE_AUDIT_WRITE.observe(time.perf_counter() - t0)
+        BATCH_SIZE_AUDIT.observe(len(batch))
+        self.written += len(batch)
+        if self._retention_due:
+            self._retention_due = False
+            self._apply_retention(conn)
+
+    def _partition(self, conn: sqlite3.Connection, day: int) -> str:
+        table = self._days.get(day)
+        if table is None:
+            table = partition_name(day * DAY_MS)
+            create_partition(conn, table)
+            self._days[day] = table
+            if len(self._days) > 1:
+                # наступили новые сутки: после записи пачки чистим историю
+                self._retention_due = True
+                self._days = {d: t for d, t in self._days.items() if d >= day - 1}
+        return table
+
+    def _apply_retention(self, conn: sqlite3.Connection) -> None:
+        # ошибка чистки не должна стоить пачки аудита
+        try:
+            apply_retention(conn, self.retention_days)
+        except sqlite3.Error:
+            logger.exception("Audit retention failed")
+
+
+audit_writer = AuditWriter(
+    db_path=settings.LOG_DB_PATH,
+    queue_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+    backpressure=settings.AUDIT_BACKPRESSURE,
+    retention_days=settings.AUDIT_RETENTION_DAYS,
+)
+
+
+def _count_scored(rows: List[AuditRow]) -> None:
+    # строки пачки обычно от одной версии модели: считаем по (risk_level, версия)
+    counts: Dict[Tuple[str, Optional[str]], int] = {}
+    for row in rows:
+        key = (row[4], row[5])
+        counts[key] = counts.get(key, 0) + 1
+    for (risk_level, model_version), n in counts.items():
+        SCORED_TOTAL.labels(risk_level, model_version or "").inc(n)
 
 
 def log_scoring_event(
@@ -42,19 +304,73 @@ def log_scoring_event(
     amount: Optional[float],
     fraud_probability: float,
     risk_level: str,
+    model_version: Optional[str] = None,
 ) -> None:
     """
-    Логируем событие скоринга в SQLite.
+    Логируем событие скоринга: строка уходит в очередь фонового писателя.
     """
-    conn = _get_connection()
-    cur = conn.cursor()
-    ts = datetime.utcnow().isoformat()
-    cur.execute(
-        """
-        INSERT INTO scoring_logs (ts, client_id, amount, fraud_probability, risk_level)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (ts, client_id, amount, fraud_probability, risk_level),
-    )
-    conn.commit()
-    conn.close()
+    ts = now_ms()
+    row = (ts, client_id, amount, fraud_probability, risk_level, model_version)
+    _count_scored([row])
+    t0 = time.perf_counter()
+    audit_writer.enqueue(row)
+    STAGE_AUDIT_ENQUEUE.observe(time.perf_counter() - t0)
+
+
+def log_scoring_events(events: Iterable[ScoringEvent]) -> None:
+    """
+    Пакетный вариант log_scoring_event для batch-скоринга
+    (client_id, amount, fraud_probability, risk_level, model_version) —
+    одна метка времени на пачку.
+    """
+    ts = now_ms()
+    rows = [(ts, *event) for event in events]
+    _count_scored(rows)
+    t0 = time.perf_counter()
+    audit_writer.enqueue_many(rows)
+    STAGE_AUDIT_ENQUEUE.observe(time.perf_counter() - t0)
+
+
+async def alog_scoring_events(events: Iterable[ScoringEvent]) -> None:
+    """
+    Вариант log_scoring_events для async-обработчиков.
+    Обычно строки кладутся в очередь сразу, не покидая event loop;
+    если очередь полна и политика "block", ожидание уходит в io-пул,
+    чтобы не блокировать event loop.
+    """
+    ts = now_ms()
+    rows = [(ts, *event) for event in events]
+    _count_scored(rows)
+
+    # время постановки включает ожидание места в очереди (backpressure)
+    t0 = time.perf_counter()
+    try:
+        if audit_writer.backpressure == "drop":
+            audit_writer.enqueue_many(rows)
+            return
+
+        for i, row in enumerate(rows):
+            if not audit_writer.offer(row):
+                await run_io(audit_writer.enqueue_many, rows[i:])
+                return
+    finally:
+        STAGE_AUDIT_ENQUEUE.observe(time.perf_counter() - t0)
+
+
+callback(
+    "antifraud_audit_queue_depth",
+    "Audit rows waiting for the background writer",
+    audit_writer.queue_depth,
+)
+callback(
+    "antifraud_audit_written_total",
+    "Audit rows written to SQLite",
+    lambda: audit_writer.written,
+    kind="counter",
+)
+callback(
+    "antifraud_audit_dropped_total",
+    "Audit rows dropped (full queue with AUDIT_BACKPRESSURE=drop or write errors)",
+    lambda: audit_writer.dropped,
+    kind="counter",
+)
@@ -0,0 +1,343 @@
+# backend/app/services/audit_store.py
+"""
+Хранилище аудита скоринга: SQLite, одна таблица на сутки (UTC).
+
+    scoring_logs_20261018(ts INTEGER, client_id, amount, fraud_probability,
+                          risk_level, model_version)
+    индексы (client_id, ts) и (risk_level, ts)
+
+ts — миллисекунды epoch (UTC). Суточная таблица и её индексы маленькие,
+поэтому вставка не замедляется с ростом истории, запрос за период читает
+только таблицы этих суток, а retention — это DROP TABLE, а не DELETE
+по всей истории. Так же по суткам хранятся результаты теневого скоринга
+(shadow_logs_YYYYMMDD, services/shadow.py).
+"""
+from __future__ import annotations
+
+import calendar
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+MAX_TS = 2**63 - 1
+
+# кэш страниц соединения для запросов (КБ)
+READER_CACHE_KB = 32_768
+# строк за транзакцию при переносе старой несекционированной таблицы
+MIGRATE_CHUNK = 10_000
+
+COLUMNS = ("ts", "client_id", "amount", "fraud_probability", "risk_level", "model_version")
+
+# (ts, client_id, amount, fraud_probability, risk_level, model_version)
+AuditRow = Tuple[int, Optional[str], Optional[float], float, str, Optional[str]]
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def iso_to_ms(ts: str) -> int:
+    # время без таймзоны — UTC, как писали прежние версии
+    dt = datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+class PartitionedTable:
+    """
+    Таблица, разбитая по суткам: <prefix>_YYYYMMDD с одинаковой схемой
+    (первая колонка — ts INTEGER) и индексами. legacy — прежняя единая
+    таблица <prefix> с ISO-строкой ts и id, она переносится один раз.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        columns: Sequence[Tuple[str, str]],
+        indexes: Sequence[Tuple[str, Sequence[str]]],
+    ):
+        self.prefix = prefix
+        self.legacy = prefix
+        self.columns = ("ts", *(name for name, _ in columns))
+        self._ddl = ",\n".join(["ts INTEGER NOT NULL", *(f"{n} {t}" for n, t in columns)])
+        self.indexes = [(suffix, tuple(cols)) for suffix, cols in indexes]
+        self._insert = (
+            f"({', '.join(self.columns)}) VALUES ({', '.join('?' * len(self.columns))})"
+        )
+        self._days: Dict[str, Optional[int]] = {}
+
+    def name(self, ts_ms: int) -> str:
+        return f"{self.prefix}_" + time.strftime("%Y%m%d", time.gmtime(ts_ms // 1000))
+
+    def insert_sql(self, table: str) -> str:
+        return f"INSERT INTO {table} {self._insert}"
+
+    def create(self, conn: sqlite3.Connection, table: str) -> None:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({self._ddl})")
+        for suffix, cols in self.indexes:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_{suffix} ON {table} ({', '.join(cols)})"
+            )
+
+    def day(self, table: str) -> Optional[int]:
+        """
+        Начало суток таблицы (мс epoch) или None, если имя не суточное.
+        """
+        if table not in self._days:
+            suffix = table[len(self.prefix) + 1:]
+            day = None
+            if table.startswith(self.prefix + "_") and len(suffix) == 8 and suffix.isdigit():
+                ymd = (int(suffix[:4]), int(suffix[4:6]), int(suffix[6:]), 0, 0, 0)
+                day = calendar.timegm(ymd) * 1000
+            self._days[table] = day
+        return self._days[table]
+
+    def partitions(self, conn: sqlite3.Connection) -> List[Tuple[str, int]]:
+        """
+        [(таблица, начало суток в мс epoch)] по возрастанию даты.
+        """
+        out = []
+        for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (self.prefix + "_%",),
+        ):
+            day = self.day(name)
+            if day is not None:
+                out.append((name, day))
+        return sorted(out, key=lambda p: p[1])
+
+    def migrate_legacy(self, conn: sqlite3.Connection) -> int:
+        """
+        Переносит строки прежней таблицы в суточные порциями: перенос и удаление
+        порции — одна транзакция, поэтому прерванная миграция продолжается
+        со следующего старта без дублей. Возвращает число перенесённых строк.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.legacy,)
+        ).fetchone()
+        if not exists:
+            return 0
+        present = {row[1] for row in conn.execute(f"PRAGMA table_info({self.legacy})")}
+        select = ", ".join(c if c in present else "NULL" for c in self.columns)
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM {self.legacy}").fetchone()
+        logger.info("Migrating %d rows of %s into daily partitions", total, self.legacy)
+
+        moved, known = 0, set()
+        while True:
+            chunk = conn.execute(
+                f"SELECT id, {select} FROM {self.legacy} ORDER BY id LIMIT ?",
+                (MIGRATE_CHUNK,),
+            ).fetchall()
+            if not chunk:
+                break
+            by_table: Dict[str, List[tuple]] = {}
+            for _, ts, *rest in chunk:
+                ts_ms = iso_to_ms(ts)
+                by_table.setdefault(self.name(ts_ms), []).append((ts_ms, *rest))
+            for table, rows in by_table.items():
+                if table not in known:
+                    self.create(conn, table)
+                    known.add(table)
+                conn.executemany(self.insert_sql(table), rows)
+            conn.execute(f"DELETE FROM {self.legacy} WHERE id <= ?", (chunk[-1][0],))
+            conn.commit()
+            moved += len(chunk)
+            logger.info("Migrated %d/%d rows of %s", moved, total, self.legacy)
+        conn.execute(f"DROP TABLE {self.legacy}")
+        conn.commit()
+        return moved
+
+    def drop_older(self, conn: sqlite3.Connection, cutoff: int) -> List[str]:
+        dropped = [name for name, day in self.partitions(conn) if day < cutoff]
+        for name in dropped:
+            conn.execute(f"DROP TABLE {name}")
+        return dropped
+
+
+SCORING_LOGS = PartitionedTable(
+    "scoring_logs",
+    columns=[
+        ("client_id", "TEXT"),
+        ("amount", "REAL"),
+        ("fraud_probability", "REAL"),
+        ("risk_level", "TEXT"),
+        ("model_version", "TEXT"),
+    ],
+    indexes=[("client_ts", ("client_id", "ts")), ("risk_ts", ("risk_level", "ts"))],
+)
+
+SHADOW_LOGS = PartitionedTable(
+    "shadow_logs",
+    columns=[
+        ("client_id", "TEXT"),
+        ("amount", "REAL"),
+        ("champion_version", "TEXT"),
+        ("champion_probability", "REAL"),
+        ("champion_risk_level", "TEXT"),
+        ("model_version", "TEXT NOT NULL"),
+        ("fraud_probability", "REAL"),
+        ("risk_level", "TEXT"),
+    ],
+    indexes=[("version_ts", ("model_version", "ts"))],
+)
+
+TABLES = (SCORING_LOGS, SHADOW_LOGS)
+
+
+# --- аудит скоринга: короткие имена для писателя, бенчмарков и тестов ---
+
+
+def partition_name(ts_ms: int) -> str:
+    return SCORING_LOGS.name(ts_ms)
+
+
+def insert_sql(table: str) -> str:
+    return SCORING_LOGS.insert_sql(table)
+
+
+def create_partition(conn: sqlite3.Connection, table: str) -> None:
+    SCORING_LOGS.create(conn, table)
+
+
+def list_partitions(conn: sqlite3.Connection) -> List[Tuple[str, int]]:
+    return SCORING_LOGS.partitions(conn)
+
+
+# --- схема и обслуживание ---
+
+
+def open_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
+    db_path = db_path or settings.LOG_DB_PATH
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Режимы файла и перенос прежних несекционированных таблиц (если остались).
+    Суточные таблицы создаются при первой записи в сутки.
+    """
+    # освобождённые после retention страницы возвращаются файлу (только для новых БД:
+    # в существующей режим меняется лишь полным VACUUM)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL: писатель не блокирует читателей, commit без fsync всего файла
+    conn.execute("PRAGMA journal_mode=WAL")
+    for table in TABLES:
+        table.migrate_legacy(conn)
+    conn.commit()
+
+
+def init_log_db(db_path: Optional[str] = None) -> None:
+    conn = open_connection(db_path)
+    try:
+        ensure_schema(conn)
+    finally:
+        conn.close()
+
+
+def apply_retention(
+    conn: sqlite3.Connection,
+    retention_days: int,
+    now: Optional[int] = None,
+) -> List[str]:
+    """
+    Удаляет суточные таблицы аудита и теневого скоринга старше retention_days
+    (0 — хранить всё) и отдаёт освободившиеся страницы файлу.
+    Возвращает удалённые таблицы.
+    """
+    if retention_days <= 0:
+        return []
+    today = (now if now is not None else now_ms()) // DAY_MS * DAY_MS
+    cutoff = today - retention_days * DAY_MS
+    dropped = [name for table in TABLES for name in table.drop_older(conn, cutoff)]
+    if dropped:
+        conn.commit()
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        logger.info("Audit retention dropped %d partitions", len(dropped))
+    return dropped
+
+
+# --- запросы ---
+
+
+def query_scoring_logs(
+    client_id: Optional[str] = None,
+    risk_levels: Optional[Sequence[str]] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 1000,
+    db_path: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Решения скоринга за [since, until) (мс epoch), от новых к старым.
+    Читаются только суточные таблицы, пересекающие интервал; внутри —
+    индекс (client_id, ts) или (risk_level, ts).
+    """
+    # без границ интервал открыт: [0, +inf)
+    since = since if since is not None else 0
+    until = until if until is not None else MAX_TS
+
+    where, params = ["ts >= ?", "ts < ?"], [since, until]
+    if client_id is not None:
+        where.append("client_id = ?")
+        params.append(client_id)
+    if risk_levels:
+        where.append(f"risk_level IN ({', '.join('?' * len(risk_levels))})")
+        params.extend(risk_levels)
+    condition = " AND ".join(where)
+    # по клиенту строк за сутки единицы, по уровню риска — тысячи:
+    # без статистики планировщик может выбрать индекс по risk_level
+    index = "_client_ts" if client_id is not None else "_risk_ts" if risk_levels else ""
+
+    conn, partitions = _reader(db_path or settings.LOG_DB_PATH)
+    rows: List[tuple] = []
+    for table, day in reversed(partitions):
+        if day >= until:
+            continue
+        if day + DAY_MS <= since or len(rows) >= limit:
+            break
+        indexed = f" INDEXED BY {table}{index}" if index else ""
+        rows.extend(
+            conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM {table}{indexed} WHERE {condition} "
+                "ORDER BY ts DESC LIMIT ?",
+                (*params, limit - len(rows)),
+            )
+        )
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+_readers = threading.local()
+
+
+def _reader(db_path: str) -> Tuple[sqlite3.Connection, List[Tuple[str, int]]]:
+    """
+    Соединение потока для чтения и список суточных таблиц.
+    Разбор схемы (сотни таблиц) и подготовленные запросы переживают вызовы;
+    список таблиц перечитывается, только когда меняется schema_version.
+    """
+    cache = getattr(_readers, "cache", None)
+    if cache is None:
+        cache = _readers.cache = {}
+    entry = cache.get(db_path)
+    if entry is None:
+        conn = open_connection(db_path)
+        conn.execute(f"PRAGMA cache_size=-{READER_CACHE_KB}")
+        entry = cache[db_path] = [conn, None, []]
+    conn = entry[0]
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    if version != entry[1]:
+        entry[1], entry[2] = version, list_partitions(conn)
+    return conn, entry[2]
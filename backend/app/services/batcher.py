@@ -0,0 +1,141 @@
+# backend/app/services/batcher.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.app.core.config import get_settings
+from backend.app.core.executors import run_inference
+from backend.app.core.metrics import BATCH_SIZE, callback
+from backend.app.schemas.transactions import (
+    TransactionScoringRequest,
+    TransactionScoringResponse,
+)
+from backend.app.services.fraud_model import score_many
+
+settings = get_settings()
+
+BATCH_SIZE_BATCHER = BATCH_SIZE.labels("batcher")
+
+_Pending = Tuple[TransactionScoringRequest, "asyncio.Future[TransactionScoringResponse]", float]
+
+
+class ScoringBatcher:
+    """
+    Динамический micro-batcher перед моделью.
+
+    Одиночные запросы /score_transaction копятся в очереди и уходят в модель
+    одной матрицей (score_many), как только набралось max_batch_size штук
+    или первый запрос прождал max_wait_ms. Каждый вызывающий получает
+    свой результат через future.
+
+    Всё состояние живёт в event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # держим ссылки на задачи, иначе их может собрать GC
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+        # гистограмма размеров батча: верхние границы бакетов 1, 2, 4, ... max
+        bounds = []
+        b = 1
+        while b < self.max_batch_size:
+            bounds.append(b)
+            b *= 2
+        bounds.append(self.max_batch_size)
+        self.batch_size_bounds: List[int] = bounds
+        self.batch_size_counts: List[int] = [0] * len(bounds)
+
+        self.batches = 0
+        self.items = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    async def score(self, req: TransactionScoringRequest) -> TransactionScoringResponse:
+        loop = asyncio.get_running_loop()
+        fut: "asyncio.Future[TransactionScoringResponse]" = loop.create_future()
+        self._pending.append((req, fut, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await fut
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            waited = now - enqueued_at
+            self.wait_sum += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+
+        size = len(batch)
+        self.batches += 1
+        self.items += size
+        self.batch_size_counts[bisect.bisect_left(self.batch_size_bounds, size)] += 1
+        BATCH_SIZE_BATCHER.observe(size)
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        try:
+            results = await run_inference(score_many, [req for req, _, _ in batch])
+        except Exception as exc:  # отдаём ошибку каждому ожидающему
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for (_, fut, _), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "pending": len(self._pending),
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": {
+                str(bound): count
+                for bound, count in zip(self.batch_size_bounds, self.batch_size_counts)
+            },
+            "queue_wait_ms": {
+                "avg": self.wait_sum / self.items * 1000.0 if self.items else 0.0,
+                "max": self.wait_max * 1000.0,
+            },
+        }
+
+
+scoring_batcher = ScoringBatcher(
+    max_batch_size=settings.SCORING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.SCORING_BATCH_MAX_WAIT_MS,
+)
+
+callback(
+    "antifraud_batcher_pending",
+    "Requests waiting in the scoring micro-batcher",
+    scoring_batcher.pending,
+)
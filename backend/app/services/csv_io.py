@@ -0,0 +1,97 @@
+# backend/app/services/csv_io.py
+"""
+Чтение сырых выгрузок (CSV в cp1251 или Parquet) чанками — общее для
+офлайн-скоринга (backend/app/cli.py) и подготовки датасета (ml/pipelines/preprocess.py).
+"""
+from __future__ import annotations
+
+from typing import Iterator, List
+
+import pandas as pd
+
+from backend.app.services.feature_plan import RAW_COLUMN_ALIASES, to_float
+
+# колонки, которые переносятся из входа в выход как идентификаторы
+PASSTHROUGH_COLUMNS = ["transaction_id", "client_id", "transdatetime"]
+
+
+def detect_header_row(path: str, sep: str, encoding: str) -> int:
+    """
+    В сырых выгрузках первой строкой идут русские описания колонок,
+    а английские имена — второй. Берём ту строку, где есть знакомые имена.
+    """
+    known = set(RAW_COLUMN_ALIASES) | set(RAW_COLUMN_ALIASES.values()) | {"amount"}
+    # читаем через pandas: в русских описаниях встречаются переносы строк в кавычках
+    head = pd.read_csv(
+        path, sep=sep, encoding=encoding, header=None, nrows=2, dtype=str,
+        encoding_errors="replace",
+    )
+    for i, row in enumerate(head.itertuples(index=False)):
+        if {str(c).strip() for c in row} & known:
+            return i
+    return 0
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk.rename(columns=RAW_COLUMN_ALIASES)
+    for col in ("transdate", "transdatetime"):
+        if col in chunk:
+            chunk[col] = chunk[col].astype(str).str.strip().str.strip("'")
+    if "transdate" in chunk:
+        chunk["trans_date"] = chunk["transdate"].str.slice(0, 10)
+    if "client_id" in chunk:
+        chunk["client_id"] = chunk["client_id"].astype(str)
+    return chunk
+
+
+def to_numeric(chunk: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Числа в выгрузках бывают с запятой и пробелами — чистим только строковые колонки.
+    """
+    for col in columns:
+        if col in chunk and not pd.api.types.is_numeric_dtype(chunk[col]):
+            chunk[col] = to_float(chunk[col])
+    return chunk
+
+
+def iter_chunks(
+    path: str, chunk_size: int, sep: str = ";", encoding: str = "cp1251"
+) -> Iterator[pd.DataFrame]:
+    """
+    Потоковое чтение CSV (формат сырых выгрузок) или Parquet чанками.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - зависит от окружения
+            raise SystemExit("Parquet input requires pyarrow: pip install pyarrow") from exc
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield normalize_chunk(batch.to_pandas())
+        return
+
+    header = detect_header_row(path, sep, encoding)
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        encoding=encoding,
+        header=header,
+        chunksize=chunk_size,
+        dtype={"cst_dim_id": str, "client_id": str, "docno": str, "transaction_id": str},
+    )
+    for chunk in reader:
+        yield normalize_chunk(chunk)
+
+
+def load_features_index(path: str, sep: str = ";", encoding: str = "cp1251") -> pd.DataFrame:
+    """
+    Поведенческие фичи (data2.csv) по ключу (client_id, trans_date).
+    Таблица признаков по клиенто-дням держится в памяти целиком,
+    а транзакции к ней подклеиваются чанками.
+    """
+    frames = list(iter_chunks(path, chunk_size=200_000, sep=sep, encoding=encoding))
+    features = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    features = features.drop(columns=["transdate"], errors="ignore")
+    return features.drop_duplicates(["client_id", "trans_date"], keep="last").set_index(
+        ["client_id", "trans_date"]
+    )
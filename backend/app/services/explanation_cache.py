@@ -0,0 +1,117 @@
+# backend/app/services/explanation_cache.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class ExplanationCache:
+    """
+    Персистентный кэш LLM-объяснений в локальном SQLite-файле.
+
+    Ключ считает LLMExplainerService (хэш промпта + бакет вероятности + risk_level),
+    здесь только хранение с TTL и ограничением числа строк.
+    Соединение открывается лениво при первом обращении.
+    """
+
+    # чистим хвост не на каждый put, а раз в PRUNE_EVERY вставок
+    PRUNE_EVERY = 100
+
+    def __init__(self, db_path: Optional[str], ttl_sec: float, max_rows: int):
+        self.db_path = db_path
+        self.ttl = ttl_sec
+        self.max_rows = max_rows
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path) and self.max_rows > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS explanations (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    explanation TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_explanations_created_at "
+                "ON explanations (created_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT explanation FROM explanations WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, explanation: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO explanations (key, created_at, explanation) "
+                "VALUES (?, ?, ?)",
+                (key, time.time(), explanation),
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                self._prune(conn)
+            conn.commit()
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM explanations WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        conn.execute(
+            """
+            DELETE FROM explanations WHERE key IN (
+                SELECT key FROM explanations ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_rows,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,277 @@
+# backend/app/services/feature_plan.py
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from backend.app.schemas.transactions import TransactionScoringRequest
+
+logger = logging.getLogger(__name__)
+
+MISSING_SUFFIX = "_was_missing"
+
+# строковые поля, которые модель получает кодами словаря (как LabelEncoder
+# в ноутбуке: пропуск -> "unknown", код — позиция в отсортированном словаре)
+CATEGORICAL_FIELDS = ("phone_model_last", "os_version_last")
+UNKNOWN_CATEGORY = "unknown"
+# значение, которого не было в обучающем словаре
+UNSEEN_CODE = -1.0
+
+# поля запроса, которые не являются входами модели
+NON_FEATURE_FIELDS = ("client_id", "transaction_id", "destination_id", "transdatetime")
+
+# Английские заголовки сырых выгрузок (data.csv / data2.csv) -> имена фич модели
+RAW_COLUMN_ALIASES = {
+    "cst_dim_id": "client_id",
+    "docno": "transaction_id",
+    "direction": "destination_id",
+    "target": "is_fraud",
+    "monthly_os_changes": "os_ver_cnt_30d",
+    "monthly_phone_model_changes": "phone_model_cnt_30d",
+    "last_phone_model_categorical": "phone_model_last",
+    "last_os_categorical": "os_version_last",
+    "logins_last_7_days": "login_sessions_7d",
+    "logins_last_30_days": "login_sessions_30d",
+    "login_frequency_7d": "logins_per_day_7d",
+    "login_frequency_30d": "logins_per_day_30d",
+    "freq_change_7d_vs_mean": "login_freq_change_7d_vs_30d",
+    "logins_7d_over_30d_ratio": "logins_7d_share_of_30d",
+    "avg_login_interval_30d": "avg_session_interval_30d",
+    "std_login_interval_30d": "std_session_interval_30d",
+    "var_login_interval_30d": "var_session_interval_30d",
+    "ewm_login_interval_7d": "ewm_session_interval_7d",
+    "burstiness_login_interval": "burstiness_sessions",
+    "fano_factor_login_interval": "fano_factor_sessions",
+    "zscore_avg_login_interval_7d": "zscore_interval_7d_vs_30d",
+}
+
+
+class FeaturePlan:
+    """
+    Заранее скомпилированное преобразование сырых полей в фичи модели —
+    общее для обучения (ml/pipelines) и скоринга (API, CLI).
+
+    Компилируется один раз: для каждой фичи запоминаем индекс поля-источника
+    и признак "это флаг пропуска"; категориальные поля кодируются словарями,
+    построенными на обучении. Дальше строка/батч/чанк таблицы заполняются
+    индексацией NumPy, без dict/pandas на каждую фичу:
+
+    * числа: пропуск -> 0.0, флаг <feature>_was_missing -> 1.0;
+    * категории: пропуск -> "unknown", код — позиция в словаре, чужое значение -> -1.
+
+    План сериализуется в манифест модели (to_dict/from_dict: фичи + словари).
+    Фичи, для которых в схеме запроса нет поля, получают source_index = -1
+    (всегда "пропуск": значение 0.0, флаг 1.0).
+    """
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        source_fields: Sequence[str],
+        categories: Optional[Mapping[str, Sequence[str]]] = None,
+    ):
+        self.feature_names: List[str] = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.categories: Dict[str, List[str]] = {
+            name: list(values) for name, values in (categories or {}).items()
+        }
+
+        # числовые источники и категориальные (только те, для которых есть словарь)
+        self.source_fields: tuple[str, ...] = tuple(
+            f for f in source_fields if f not in CATEGORICAL_FIELDS
+        )
+        self.categorical_fields: tuple[str, ...] = tuple(
+            f for f in source_fields if f in CATEGORICAL_FIELDS and f in self.categories
+        )
+        self._codes: List[Dict[str, float]] = [
+            {value: float(i) for i, value in enumerate(self.categories[f])}
+            for f in self.categorical_fields
+        ]
+        self._unknown_codes: List[float] = [
+            codes.get(UNKNOWN_CATEGORY, UNSEEN_CODE) for codes in self._codes
+        ]
+
+        # сырой вектор: [числа..., коды категорий..., nan]
+        field_pos = {
+            name: i for i, name in enumerate(self.source_fields + self.categorical_fields)
+        }
+        source_index = np.empty(self.n_features, dtype=np.intp)
+        is_missing_flag = np.zeros(self.n_features, dtype=bool)
+
+        for j, feat in enumerate(self.feature_names):
+            base = feat
+            if feat.endswith(MISSING_SUFFIX):
+                is_missing_flag[j] = True
+                base = feat[: -len(MISSING_SUFFIX)]
+            # -1 указывает на хвостовой nan-слот в сыром векторе
+            source_index[j] = field_pos.get(base, -1)
+
+        self.source_index = source_index
+        self.is_missing_flag = is_missing_flag
+
+    @classmethod
+    def compile(
+        cls,
+        feature_names: Iterable[str],
+        schema: Type[BaseModel] = TransactionScoringRequest,
+        categories: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> "FeaturePlan":
+        feature_names = list(feature_names)
+        bases = {
+            f[: -len(MISSING_SUFFIX)] if f.endswith(MISSING_SUFFIX) else f
+            for f in feature_names
+        }
+        # берём только те поля схемы, которые реально нужны модели
+        source_fields = [name for name in schema.model_fields if name in bases]
+        without_vocab = [
+            f for f in source_fields if f in CATEGORICAL_FIELDS and f not in (categories or {})
+        ]
+        if without_vocab:
+            logger.warning(
+                "No category vocabulary for %s in model manifest: features are served as 0.0",
+                ", ".join(without_vocab),
+            )
+        return cls(feature_names, source_fields, categories)
+
+    @classmethod
+    def fit(
+        cls,
+        frame: Any,
+        columns: Sequence[str],
+        schema: Type[BaseModel] = TransactionScoringRequest,
+    ) -> "FeaturePlan":
+        """
+        План для обучения: словари категорий по обучающему чанку,
+        фичи — columns и флаги пропуска для числовых из них.
+        """
+        categories = {
+            c: sorted(frame[c].fillna(UNKNOWN_CATEGORY).astype(str).unique())
+            for c in columns
+            if c in CATEGORICAL_FIELDS
+        }
+        flags = [c + MISSING_SUFFIX for c in columns if c not in CATEGORICAL_FIELDS]
+        return cls.compile([*columns, *flags], schema, categories)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"features": list(self.feature_names), "categories": self.categories}
+
+    @classmethod
+    def from_dict(cls, payload: Mapping[str, Any]) -> "FeaturePlan":
+        return cls.compile(payload["features"], categories=payload.get("categories"))
+
+    def _apply(self, raw: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # raw: (..., n_sources + 1), последний слот всегда nan
+        vals = raw[..., self.source_index]
+        missing = np.isnan(vals)
+        out[...] = np.where(
+            self.is_missing_flag, missing, np.where(missing, 0.0, vals)
+        )
+        return out
+
+    def _encoded(self, req: BaseModel) -> List[float]:
+        return [
+            codes.get(value, UNSEEN_CODE) if value is not None else unknown
+            for codes, unknown, value in zip(
+                self._codes,
+                self._unknown_codes,
+                (getattr(req, f) for f in self.categorical_fields),
+            )
+        ]
+
+    def _raw_row(self, req: BaseModel) -> List[Any]:
+        return [getattr(req, f) for f in self.source_fields] + self._encoded(req) + [None]
+
+    def fill_row(self, req: BaseModel, out: np.ndarray) -> np.ndarray:
+        """
+        Заполняет заранее выделенный буфер out (shape = (n_features,)).
+        """
+        raw = np.array(self._raw_row(req), dtype=np.float64)
+        return self._apply(raw, out)
+
+    def build_matrix(self, reqs: Sequence[BaseModel]) -> np.ndarray:
+        """
+        Матрица фич для батча (n_items x n_features, float32).
+        """
+        X = np.empty((len(reqs), self.n_features), dtype=np.float32)
+        if not reqs:
+            return X
+        raw = np.array([self._raw_row(r) for r in reqs], dtype=np.float64)
+        return self._apply(raw, X)
+
+    def build_matrix_from_frame(self, frame: Any) -> np.ndarray:
+        """
+        Матрица фич из табличного чанка (pandas.DataFrame), где колонки
+        названы как поля запроса. Числа могут быть строками выгрузки
+        (запятая, пробелы) — разбираются to_float. Отсутствующие колонки
+        считаются пропусками.
+        """
+        import pandas as pd
+
+        n = len(frame)
+        n_numeric = len(self.source_fields)
+        raw = np.full(
+            (n, n_numeric + len(self.categorical_fields) + 1), np.nan, dtype=np.float64
+        )
+        for i, name in enumerate(self.source_fields):
+            if name in frame:
+                raw[:, i] = to_float(frame[name]).to_numpy(dtype=np.float64)
+        for i, name in enumerate(self.categorical_fields):
+            if name in frame:
+                values = frame[name].fillna(UNKNOWN_CATEGORY).astype(str)
+            else:
+                values = pd.Series([UNKNOWN_CATEGORY] * n)
+            raw[:, n_numeric + i] = pd.Index(self.categories[name]).get_indexer(values)
+        X = np.empty((n, self.n_features), dtype=np.float32)
+        return self._apply(raw, X)
+
+
+def to_float(series: Any) -> Any:
+    """
+    Колонка выгрузки -> float64: запятая-разделитель и пробелы убираются,
+    нераспознанное (например, испорченное Excel'ем "01.фев") -> NaN.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+    cleaned = (
+        series.astype("string")
+        .str.replace(",", ".", regex=False)
+        .str.replace(" ", "", regex=False)
+    )
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def frame_to_requests(
+    frame: Any, schema: Type[BaseModel] = TransactionScoringRequest
+) -> List[BaseModel]:
+    """
+    Строки таблицы -> запросы скоринга (только входы модели, пропуски опускаются;
+    строки без обязательных полей пропускаются). Нужно для golden sample
+    и сверок train/serve.
+    """
+    required = [f for f, info in schema.model_fields.items() if info.is_required()]
+    import pandas as pd
+
+    numeric = [
+        f for f in schema.model_fields
+        if f in frame and f not in CATEGORICAL_FIELDS and f not in NON_FEATURE_FIELDS
+    ]
+    categorical = [f for f in CATEGORICAL_FIELDS if f in frame]
+    columns = {f: to_float(frame[f]) for f in numeric}
+    columns.update({f: frame[f] for f in categorical})
+
+    reqs = []
+    for i in range(len(frame)):
+        values = {}
+        for f, col in columns.items():
+            v = col.iloc[i]
+            if pd.isna(v):
+                continue
+            values[f] = float(v) if f in numeric else str(v)
+        if all(f in values for f in required):
+            reqs.append(schema(**values))
+    return reqs
@@ -0,0 +1,394 @@
+# backend/app/services/feature_store.py
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import get_settings
+from backend.app.core.lazy import lazy_singleton
+from backend.app.core.metrics import callback
+from backend.app.schemas.transactions import TransactionScoringRequest
+
+settings = get_settings()
+
+DAY_SEC = 24 * 3600
+SHORT_WINDOW_SEC = 7 * DAY_SEC
+LONG_WINDOW_SEC = 30 * DAY_SEC
+# сессия = уникальный минутный тайм-слот (как в выгрузке data2)
+SESSION_SLOT_SEC = 60
+# коэффициент затухания EWM интервалов (как в выгрузке data2)
+EWM_ALPHA = 0.3
+
+# поведенческие фичи запроса, которые умеет считать стор
+BEHAVIOR_FEATURES = (
+    "os_ver_cnt_30d",
+    "phone_model_cnt_30d",
+    "login_sessions_7d",
+    "login_sessions_30d",
+    "logins_per_day_7d",
+    "logins_per_day_30d",
+    "login_freq_change_7d_vs_30d",
+    "logins_7d_share_of_30d",
+    "avg_session_interval_30d",
+    "std_session_interval_30d",
+    "var_session_interval_30d",
+    "ewm_session_interval_7d",
+    "burstiness_sessions",
+    "fano_factor_sessions",
+    "zscore_interval_7d_vs_30d",
+)
+# последнее устройство клиента (строковые поля запроса)
+DEVICE_FIELDS = ("phone_model_last", "os_version_last")
+
+
+def to_epoch(ts: datetime) -> float:
+    # время без таймзоны считаем UTC, как и в аудите
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class RunningStats:
+    """
+    Среднее и дисперсия по Welford с поддержкой удаления:
+    окно сдвигается за O(1) на событие, без пересчёта по всем интервалам.
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float) -> None:
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.n -= 1
+        self.mean = (old_mean * (self.n + 1) - x) / self.n
+        # накопленная ошибка округления не должна давать отрицательную дисперсию
+        self.m2 = max(0.0, self.m2 - (x - old_mean) * (x - self.mean))
+
+    @property
+    def variance(self) -> Optional[float]:
+        # несмещённая (ddof=1), как pandas .var()
+        return self.m2 / (self.n - 1) if self.n > 1 else None
+
+
+class WindowedEWM:
+    """
+    EWM (adjust=True, как pandas) по интервалам внутри окна.
+    Храним взвешенные суммы S и W; вес самого старого элемента — (1-a)^(n-1),
+    поэтому его выход из окна тоже O(1).
+    """
+
+    __slots__ = ("decay", "n", "s", "w")
+
+    def __init__(self, alpha: float) -> None:
+        self.decay = 1.0 - alpha
+        self.n = 0
+        self.s = 0.0
+        self.w = 0.0
+
+    def add(self, x: float) -> None:
+        self.s = self.s * self.decay + x
+        self.w = self.w * self.decay + 1.0
+        self.n += 1
+
+    def remove_oldest(self, x: float) -> None:
+        if self.n <= 1:
+            self.n, self.s, self.w = 0, 0.0, 0.0
+            return
+        weight = self.decay ** (self.n - 1)
+        self.s -= weight * x
+        self.w -= weight
+        self.n -= 1
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.s / self.w if self.n else None
+
+
+class _Window:
+    """
+    Скользящее окно сессий + агрегаты по интервалам между ними.
+    Как и в батч-выгрузке, считаются только интервалы между сессиями окна:
+    интервал первой сессии окна (до более ранней, уже вышедшей) не учитывается.
+    """
+
+    __slots__ = ("span", "events", "stats", "ewm", "os", "phone")
+
+    def __init__(self, span: float, ewm_alpha: Optional[float] = None) -> None:
+        self.span = span
+        # (ts, интервал до предыдущей сессии, os, phone)
+        self.events: Deque[Tuple[float, Optional[float], Optional[str], Optional[str]]] = deque()
+        self.stats = RunningStats()
+        self.ewm = WindowedEWM(ewm_alpha) if ewm_alpha is not None else None
+        self.os: Counter = Counter()
+        self.phone: Counter = Counter()
+
+    def add(
+        self, ts: float, interval: Optional[float], os: Optional[str], phone: Optional[str]
+    ) -> None:
+        if self.events and interval is not None:
+            self._count(interval)
+        self.events.append((ts, interval, os, phone))
+        if os:
+            self.os[os] += 1
+        if phone:
+            self.phone[phone] += 1
+
+    def expire(self, now: float) -> None:
+        horizon = now - self.span
+        events = self.events
+        while events and events[0][0] < horizon:
+            _, _, os, phone = events.popleft()
+            if os:
+                _decrement(self.os, os)
+            if phone:
+                _decrement(self.phone, phone)
+            if events:
+                # новая первая сессия окна теряет интервал до ушедшей
+                self._uncount_oldest(events[0][1])
+
+    def _count(self, interval: float) -> None:
+        self.stats.add(interval)
+        if self.ewm is not None:
+            self.ewm.add(interval)
+
+    def _uncount_oldest(self, interval: Optional[float]) -> None:
+        if interval is None:
+            return
+        self.stats.remove(interval)
+        if self.ewm is not None:
+            self.ewm.remove_oldest(interval)
+
+
+def _decrement(counter: Counter, key: str) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class ClientSessions:
+    """
+    Состояние одного клиента: окна 7d и 30d и последняя сессия.
+    """
+
+    __slots__ = ("short", "long", "last_ts", "last_os", "last_phone")
+
+    def __init__(self) -> None:
+        self.short = _Window(SHORT_WINDOW_SEC, ewm_alpha=EWM_ALPHA)
+        self.long = _Window(LONG_WINDOW_SEC)
+        self.last_ts: Optional[float] = None
+        self.last_os: Optional[str] = None
+        self.last_phone: Optional[str] = None
+
+    def add(self, ts: float, os: Optional[str], phone: Optional[str]) -> bool:
+        slot_ts = ts - ts % SESSION_SLOT_SEC
+        if self.last_ts is not None and slot_ts <= self.last_ts:
+            # та же минута или запоздавшее событие: окна считаются по порядку времени
+            return False
+        interval = slot_ts - self.last_ts if self.last_ts is not None else None
+        self.short.add(slot_ts, interval, os, phone)
+        self.long.add(slot_ts, interval, os, phone)
+        self.last_ts = slot_ts
+        self.last_os = os or self.last_os
+        self.last_phone = phone or self.last_phone
+        return True
+
+    def expire(self, now: float) -> None:
+        self.short.expire(now)
+        self.long.expire(now)
+
+    def features(self) -> Dict[str, Optional[float]]:
+        n7 = len(self.short.events)
+        n30 = len(self.long.events)
+        f7 = n7 / 7.0
+        f30 = n30 / 30.0
+
+        mean30 = self.long.stats.mean if self.long.stats.n else None
+        var30 = self.long.stats.variance
+        std30 = math.sqrt(var30) if var30 is not None else None
+        mean7 = self.short.stats.mean if self.short.stats.n else None
+
+        return {
+            "os_ver_cnt_30d": float(len(self.long.os)),
+            "phone_model_cnt_30d": float(len(self.long.phone)),
+            "login_sessions_7d": float(n7),
+            "login_sessions_30d": float(n30),
+            "logins_per_day_7d": f7,
+            "logins_per_day_30d": f30,
+            "login_freq_change_7d_vs_30d": (f7 - f30) / f30 if f30 else None,
+            "logins_7d_share_of_30d": n7 / n30 if n30 else None,
+            "avg_session_interval_30d": mean30,
+            "std_session_interval_30d": std30,
+            "var_session_interval_30d": var30,
+            "ewm_session_interval_7d": self.short.ewm.value if self.short.ewm else None,
+            "burstiness_sessions": (
+                (std30 - mean30) / (std30 + mean30)
+                if std30 is not None and mean30 is not None and std30 + mean30
+                else None
+            ),
+            "fano_factor_sessions": var30 / mean30 if var30 is not None and mean30 else None,
+            "zscore_interval_7d_vs_30d": (
+                (mean7 - mean30) / std30
+                if mean7 is not None and mean30 is not None and std30
+                else None
+            ),
+        }
+
+
+class OnlineFeatureStore:
+    """
+    Встроенный онлайн-стор поведенческих фич по client_id.
+
+    Принимает события логин-сессий и держит скользящие агрегаты 7d/30d
+    (счётчики, Welford для интервалов, EWM, Fano/burstiness), обновляемые
+    за O(1) на событие. Скоринг дозаполняет пропущенные в запросе фичи
+    поиском по клиенту — микросекунды вместо суточных батч-выгрузок.
+
+    Состояние живёт в памяти процесса; число клиентов ограничено (LRU).
+    """
+
+    def __init__(self, max_clients: int = 1_000_000):
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[str, ClientSessions]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.ingested = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.lookups = 0
+        self.hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_clients > 0
+
+    def ingest(
+        self,
+        client_id: str,
+        ts: float,
+        os_version: Optional[str] = None,
+        phone_model: Optional[str] = None,
+    ) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is None:
+                client = self._clients[client_id] = ClientSessions()
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._clients.move_to_end(client_id)
+
+            added = client.add(ts, os_version, phone_model)
+            if added:
+                client.expire(ts)
+                self.ingested += 1
+            else:
+                self.skipped += 1
+            return added
+
+    def ingest_many(
+        self, events: Iterable[Tuple[str, float, Optional[str], Optional[str]]]
+    ) -> int:
+        # события клиента должны идти по времени — сортируем пачку
+        return sum(
+            self.ingest(*event) for event in sorted(events, key=lambda e: e[1])
+        )
+
+    def features(self, client_id: str) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Фичи на момент последней сессии клиента: окна сдвигает только ingest.
+        Чтение ничего не вычищает — история, загруженная backfill'ом или
+        replay'ем с прошлыми ts, не стирается часами сервера.
+        """
+        with self._lock:
+            self.lookups += 1
+            client = self._clients.get(client_id)
+            if client is None:
+                return None
+            self.hits += 1
+            return client.features()
+
+    def last_device(self, client_id: str) -> Dict[str, Optional[str]]:
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is None:
+                return {"os_version_last": None, "phone_model_last": None}
+            return {"os_version_last": client.last_os, "phone_model_last": client.last_phone}
+
+    def enrich(
+        self, reqs: Sequence[TransactionScoringRequest]
+    ) -> List[TransactionScoringRequest]:
+        """
+        Дозаполняет пропущенные поведенческие фичи и последнее устройство из стора.
+        Значения, пришедшие в запросе, не трогаем.
+        """
+        if not self.enabled:
+            return list(reqs)
+        out: List[TransactionScoringRequest] = []
+        for req in reqs:
+            missing = [
+                f for f in (*BEHAVIOR_FEATURES, *DEVICE_FIELDS) if getattr(req, f) is None
+            ]
+            if not req.client_id or not missing:
+                out.append(req)
+                continue
+            features = self.features(req.client_id)
+            if features is None:
+                out.append(req)
+                continue
+            features.update(self.last_device(req.client_id))
+            update = {f: features[f] for f in missing if features[f] is not None}
+            out.append(req.model_copy(update=update) if update else req)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = len(self._clients)
+        return {
+            "enabled": self.enabled,
+            "clients": clients,
+            "max_clients": self.max_clients,
+            "ingested": self.ingested,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
+
+
+@lazy_singleton
+def get_feature_store() -> OnlineFeatureStore:
+    # выключенный стор (max_clients=0) ничего не принимает и не подставляет
+    max_clients = settings.FEATURE_STORE_MAX_CLIENTS if settings.FEATURE_STORE_ENABLED else 0
+    return OnlineFeatureStore(max_clients=max_clients)
+
+
+def _store_clients() -> int:
+    # не создаём стор ради метрики
+    store = get_feature_store.peek()
+    return store.stats()["clients"] if store is not None else 0
+
+
+callback(
+    "antifraud_feature_store_clients",
+    "Clients held by the online behavioral feature store",
+    _store_clients,
+)
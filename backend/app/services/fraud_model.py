@@ -1,64 +1,298 @@
 # backend/app/services/fraud_model.py
 from __future__ import annotations
 
-import joblib
-import pandas as pd
-from typing import Dict, Any
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
 
 from backend.app.core.config import get_settings
+from backend.app.core.lazy import lazy_singleton
+from backend.app.core.metrics import STAGE_FEATURE_BUILD, STAGE_INFERENCE
 from backend.app.schemas.transactions import TransactionScoringRequest, TransactionScoringResponse
+from backend.app.services.model_registry import ModelBundle, ModelRegistry
+from backend.app.services.score_cache import ScoreCache
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = np.array(["low", "medium", "high"], dtype=object)
 
 
 class FraudModelService:
-    def __init__(self, model_path: str):
+    def __init__(
+        self,
+        model_path: str,
+        backend: str = "sklearn",
+        cache: Optional[ScoreCache] = None,
+        registry: Optional[ModelRegistry] = None,
+    ):
         self.model_path = model_path
-        self.model = self._load_model()
-        self.feature_names = list(self.model.get_booster().feature_names)
-
-    def _load_model(self):
-        model = joblib.load(self.model_path)
-        return model
-
-    def _build_feature_row(self, req: TransactionScoringRequest) -> pd.DataFrame:
-        payload: Dict[str, Any] = req.dict()
-        row: Dict[str, float] = {}
-
-        for feat in self.feature_names:
-            if feat.endswith("_was_missing"):
-                base = feat.replace("_was_missing", "")
-                raw_val = payload.get(base, None)
-                row[feat] = 1.0 if raw_val is None else 0.0
-            else:
-                raw_val = payload.get(feat, None)
-                if raw_val is None:
-                    row[feat] = 0.0
-                else:
-                    row[feat] = float(raw_val)
-
-        df_row = pd.DataFrame([row], columns=self.feature_names)
-        return df_row
-
-    def predict_proba(self, req: TransactionScoringRequest) -> float:
-        X = self._build_feature_row(req)
-        proba = float(self.model.predict_proba(X)[:, 1][0])
+        self.backend_name = backend
+        self.cache = cache if cache is not None else ScoreCache(max_size=0)
+        self.registry = registry
+        # активации версий идут по одной; скоринг этот lock не берёт
+        self._activate_lock = threading.Lock()
+        self.reload()
+
+    # --- текущая версия: всё читается из одного бандла ---
+
+    @property
+    def model(self) -> Any:
+        return self.bundle.model
+
+    @property
+    def model_checksum(self) -> str:
+        return self.bundle.checksum
+
+    @property
+    def model_version(self) -> str:
+        return self.bundle.version
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.bundle.feature_names
+
+    @property
+    def plan(self):
+        return self.bundle.plan
+
+    def _metadata_for(self, path: str) -> Dict[str, Any]:
+        return self.registry.metadata_for_path(path) if self.registry else {}
+
+    def swap(self, bundle: ModelBundle) -> ModelBundle:
+        """
+        Атомарная подмена модели: одно присваивание ссылки.
+        Запросы, уже взявшие старый бандл, дорабатывают на нём.
+        """
+        previous = getattr(self, "bundle", None)
+        self.bundle = bundle
+        self.model_path = bundle.path
+        # ключи кэша содержат checksum, очистка только освобождает память
+        self.cache.clear()
+        return previous
+
+    def reload(self, model_path: Optional[str] = None) -> None:
+        """
+        (Пере)загрузка модели по пути: план фич, движок инференса и пороги
+        собираются в новый бандл, который затем подменяет текущий.
+        """
+        if model_path is not None:
+            self.model_path = model_path
+        bundle = ModelBundle.load(
+            self.model_path, self.backend_name, self._metadata_for(self.model_path)
+        )
+        self.swap(bundle)
+
+    def activate(self, version: str, persist: bool = True) -> Dict[str, Optional[str]]:
+        """
+        Загружает версию из реестра, прогревает и сверяет с golden sample,
+        затем атомарно переключает скоринг. Скоринг в это время не блокируется.
+        persist=False — только локальное переключение (другой воркер уже записал указатель).
+        """
+        if self.registry is None:
+            raise RuntimeError("Model registry is not configured")
+        with self._activate_lock:
+            meta = self.registry.get(version)
+            bundle = ModelBundle.load(meta["path"], self.backend_name, meta)
+            bundle.validate()
+
+            previous = self.swap(bundle)
+            previous_version = previous.version if previous is not None else None
+            if persist:
+                pointer = self.registry.read_pointer()
+                history = list(pointer.get("history", []))
+                if previous_version and previous_version != version:
+                    history.append(previous_version)
+                self.registry.write_pointer(version, history)
+            logger.info("Model %s activated (was %s)", version, previous_version)
+            return {"active": version, "previous": previous_version}
+
+    def rollback(self) -> Dict[str, Optional[str]]:
+        """
+        Возврат на предыдущую активную версию из истории ACTIVE.json.
+        """
+        if self.registry is None:
+            raise RuntimeError("Model registry is not configured")
+        with self._activate_lock:
+            pointer = self.registry.read_pointer()
+            history = list(pointer.get("history", []))
+            if not history:
+                raise LookupError("No previous model version to roll back to")
+            target = history.pop()
+            meta = self.registry.get(target)
+            bundle = ModelBundle.load(meta["path"], self.backend_name, meta)
+            bundle.validate()
+
+            previous = self.swap(bundle)
+            self.registry.write_pointer(target, history)
+            logger.info("Model rolled back to %s (was %s)", target, previous.version)
+            return {"active": target, "previous": previous.version}
+
+    async def watch_registry(self, interval_sec: float) -> None:
+        """
+        Фоновая синхронизация с ACTIVE.json: версию, активированную через
+        другой воркер, этот процесс подхватывает сам, без рестарта.
+        """
+        from backend.app.core.executors import recycle_inference_executor, run_io
+
+        while True:
+            await asyncio.sleep(interval_sec)
+            active = self.registry.read_pointer().get("active") if self.registry else None
+            if not active or active == self.model_version:
+                continue
+            try:
+                await run_io(self.activate, active, persist=False)
+                recycle_inference_executor()
+            except Exception:
+                logger.exception("Failed to switch to model %s", active)
+
+    def predict_proba(
+        self, req: TransactionScoringRequest, bundle: Optional[ModelBundle] = None
+    ) -> float:
+        b = bundle or self.bundle
+        t0 = time.perf_counter()
+        X = b.row_buffer()
+        b.plan.fill_row(req, X[0])
+        t1 = time.perf_counter()
+        STAGE_FEATURE_BUILD.observe(t1 - t0)
+        if not self.cache.enabled:
+            proba = float(b.backend.predict(X)[0])
+            STAGE_INFERENCE.observe(time.perf_counter() - t1)
+            return proba
+
+        key = self.cache.make_key(b.checksum, X[0])
+        proba = self.cache.get(key)
+        if proba is None:
+            t1 = time.perf_counter()
+            proba = float(b.backend.predict(X)[0])
+            STAGE_INFERENCE.observe(time.perf_counter() - t1)
+            self.cache.put(key, proba)
         return proba
 
-    def get_risk_level(self, proba: float) -> str:
-        if proba >= settings.RISK_THRESHOLD_HIGH:
+    def predict_proba_many(
+        self,
+        reqs: Sequence[TransactionScoringRequest],
+        bundle: Optional[ModelBundle] = None,
+    ) -> np.ndarray:
+        b = bundle or self.bundle
+        if not reqs:
+            return np.empty(0, dtype=np.float64)
+        t0 = time.perf_counter()
+        X = b.plan.build_matrix(reqs)
+        t1 = time.perf_counter()
+        STAGE_FEATURE_BUILD.observe(t1 - t0)
+        if not self.cache.batchable(len(reqs)):
+            probas = b.backend.predict(X)
+            STAGE_INFERENCE.observe(time.perf_counter() - t1)
+            return probas
+
+        # в модель уходят только строки, которых нет в кэше;
+        # поиск и запись — по одному захвату блокировки на батч
+        keys = self.cache.make_keys(b.checksum, X)
+        cached = self.cache.get_many(keys)
+        missed = [i for i, proba in enumerate(cached) if proba is None]
+        probas = np.array([0.0 if p is None else p for p in cached], dtype=np.float64)
+
+        if missed:
+            t1 = time.perf_counter()
+            fresh = b.backend.predict(X[missed])
+            STAGE_INFERENCE.observe(time.perf_counter() - t1)
+            probas[missed] = fresh
+            self.cache.put_many([keys[i] for i in missed], fresh.tolist())
+        return probas
+
+    def predict_proba_frame(self, frame) -> np.ndarray:
+        """
+        Вероятности для табличного чанка (офлайн-скоринг, см. backend/app/cli.py).
+        """
+        b = self.bundle
+        return b.backend.predict(b.plan.build_matrix_from_frame(frame))
+
+    def get_risk_level(self, proba: float, bundle: Optional[ModelBundle] = None) -> str:
+        # пороги берутся из метаданных версии, по умолчанию — из настроек
+        b = bundle or self.bundle
+        if proba >= b.threshold_high:
             return "high"
-        if proba >= settings.RISK_THRESHOLD_MEDIUM:
+        if proba >= b.threshold_medium:
             return "medium"
         return "low"
 
-    def score(self, req: TransactionScoringRequest) -> TransactionScoringResponse:
-        proba = self.predict_proba(req)
-        risk = self.get_risk_level(proba)
+    def get_risk_levels(
+        self, probas: np.ndarray, bundle: Optional[ModelBundle] = None
+    ) -> np.ndarray:
+        """
+        Векторный аналог get_risk_level: один searchsorted по порогам на весь батч.
+        """
+        b = bundle or self.bundle
+        return RISK_LEVELS[np.searchsorted(b.thresholds, probas, side="right")]
+
+    def score(
+        self, req: TransactionScoringRequest, bundle: Optional[ModelBundle] = None
+    ) -> TransactionScoringResponse:
+        b = bundle or self.bundle
+        proba = self.predict_proba(req, b)
+        risk = self.get_risk_level(proba, b)
         return TransactionScoringResponse(
             fraud_probability=proba,
             risk_level=risk,
+            model_version=b.version,
         )
 
+    def score_many(
+        self,
+        reqs: Sequence[TransactionScoringRequest],
+        bundle: Optional[ModelBundle] = None,
+    ) -> List[TransactionScoringResponse]:
+        """
+        Батч-скоринг: одна матрица фич и один вызов predict_proba на весь список.
+        """
+        b = bundle or self.bundle
+        probas = self.predict_proba_many(reqs, b)
+        risks = self.get_risk_levels(probas, b)
+        return [
+            TransactionScoringResponse(
+                fraud_probability=float(p), risk_level=r, model_version=b.version
+            )
+            for p, r in zip(probas.tolist(), risks.tolist())
+        ]
+
+
+@lazy_singleton
+def get_model_registry() -> ModelRegistry:
+    return ModelRegistry(settings.MODEL_REGISTRY_DIR)
+
+
+@lazy_singleton
+def get_fraud_model_service() -> FraudModelService:
+    """
+    Сервис модели создаётся при первом обращении (или на старте приложения,
+    см. MODEL_LOAD), а не при импорте модуля.
+    """
+    registry = get_model_registry()
+    return FraudModelService(
+        model_path=registry.startup_path(settings.MODEL_PATH),
+        backend=settings.INFERENCE_BACKEND,
+        cache=ScoreCache(
+            max_size=settings.SCORE_CACHE_SIZE,
+            ttl_sec=settings.SCORE_CACHE_TTL_SEC,
+            max_batch=settings.SCORE_CACHE_MAX_BATCH,
+        ),
+        registry=registry,
+    )
+
+
+# Функции уровня модуля для пула инференса (core/executors.py):
+# в режиме INFERENCE_EXECUTOR=process они пиклятся по имени,
+# а дочерний процесс использует собственный сервис модели.
+def score_one(req: TransactionScoringRequest) -> TransactionScoringResponse:
+    return get_fraud_model_service().score(req)
+
 
-fraud_model_service = FraudModelService(model_path=settings.MODEL_PATH)
+def score_many(
+    reqs: Sequence[TransactionScoringRequest],
+) -> List[TransactionScoringResponse]:
+    return get_fraud_model_service().score_many(reqs)
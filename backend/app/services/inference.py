@@ -0,0 +1,333 @@
+# backend/app/services/inference.py
+from __future__ import annotations
+
+import abc
+import json
+import math
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Плоский бинарный формат деревьев (.trees) для NumpyTreeBackend:
+#   MAGIC | uint64 длина заголовка | JSON-заголовок | массивы, выровненные по 64 байта.
+# Массивы читаются через np.memmap: воркеры, загрузившие один файл,
+# делят страницы page cache, а не держат по копии модели.
+TREES_MAGIC = b"FAFTREE1"
+TREES_ALIGN = 64
+_TREES_ARRAYS = {
+    "feature": "<i8",
+    "threshold": "<f4",
+    "left": "<i8",
+    "right": "<i8",
+    "default_left": "|b1",
+    "value": "<f4",
+    "roots": "<i8",
+}
+
+
+class InferenceBackend(abc.ABC):
+    """
+    Базовый интерфейс движка инференса.
+    predict() принимает матрицу фич (n_items x n_features, float32)
+    и возвращает вероятность фрода (класс 1) как float64-вектор.
+    Движок без predict() не создаётся (TypeError при создании, а не при скоринге).
+    """
+
+    name: str = "base"
+
+    @abc.abstractmethod
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        ...
+
+
+def best_iteration_range(booster: Any) -> Tuple[int, int]:
+    """
+    iteration_range для predict: деревья до best_iteration (ранняя остановка)
+    включительно, (0, 0) — все деревья.
+    """
+    best = booster.attr("best_iteration")
+    return (0, int(best) + 1) if best is not None else (0, 0)
+
+
+class SklearnBackend(InferenceBackend):
+    """
+    Исходный путь: sklearn-обёртка XGBClassifier.predict_proba.
+    Используется как эталон для сверки остальных движков.
+    """
+
+    name = "sklearn"
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(X)[:, 1].astype(np.float64)
+
+
+class BoosterBackend(InferenceBackend):
+    """
+    Нативный Booster.inplace_predict без валидации и копирования sklearn-обёртки.
+    """
+
+    name = "booster"
+
+    def __init__(self, booster: Any):
+        self.booster = booster
+        self.iteration_range = best_iteration_range(booster)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        proba = self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            validate_features=False,
+        )
+        return np.asarray(proba, dtype=np.float64)
+
+
+class NumpyTreeBackend(InferenceBackend):
+    """
+    Чистый NumPy-вычислитель деревьев.
+
+    JSON-дамп модели XGBoost компилируется в плоские массивы
+    (feature / threshold / left / right / default_left / value) по всем деревьям.
+    У листьев left = right = сам узел, поэтому за max_depth шагов
+    все строки гарантированно оказываются в листьях — без ветвлений в Python.
+    Для работы нужен только numpy: xgboost/sklearn не импортируются.
+    """
+
+    name = "numpy"
+
+    # сколько строк обходим за раз, чтобы не раздувать (n x n_trees) массивы
+    ROW_BLOCK = 4096
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        base_margin: float,
+        feature_names: Optional[List[str]] = None,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+        # служебные поля из заголовка .trees (источник экспорта и т.п.)
+        self.extra: Dict[str, Any] = {}
+
+    @classmethod
+    def from_model_json(cls, model: Dict[str, Any]) -> "NumpyTreeBackend":
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"Unsupported objective for numpy backend: {objective}")
+
+        gbtree = learner["gradient_booster"]
+        if gbtree["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster for numpy backend: {gbtree['name']}")
+        trees = gbtree["model"]["trees"]
+
+        best = learner.get("attributes", {}).get("best_iteration")
+        if best is not None:
+            indptr = gbtree["model"]["iteration_indptr"]
+            trees = trees[: indptr[int(best) + 1]]
+
+        feature, threshold, left, right, default_left, value = [], [], [], [], [], []
+        roots = []
+        max_depth = 0
+        offset = 0
+
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported by numpy backend")
+
+            n_nodes = len(tree["left_children"])
+            lc = np.asarray(tree["left_children"], dtype=np.int64)
+            rc = np.asarray(tree["right_children"], dtype=np.int64)
+            is_leaf = lc == -1
+            own = np.arange(n_nodes, dtype=np.int64)
+
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.append(np.where(is_leaf, 0.0, tree["split_conditions"]))
+            left.append(np.where(is_leaf, own, lc) + offset)
+            right.append(np.where(is_leaf, own, rc) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            # у листа split_conditions хранит значение листа
+            value.append(np.where(is_leaf, tree["split_conditions"], 0.0))
+            roots.append(offset)
+
+            max_depth = max(max_depth, _tree_depth(lc, rc))
+            offset += n_nodes
+
+        base_score = _parse_base_score(learner["learner_model_param"]["base_score"])
+        base_margin = math.log(base_score / (1.0 - base_score))
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            base_margin=base_margin,
+            feature_names=learner.get("feature_names") or None,
+        )
+
+    @classmethod
+    def from_booster(cls, booster: Any) -> "NumpyTreeBackend":
+        return cls.from_model_json(json.loads(booster.save_raw("json")))
+
+    @classmethod
+    def from_json_file(cls, path: str) -> "NumpyTreeBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_model_json(json.load(f))
+
+    def save(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Пишет деревья в плоский файл .trees (см. TREES_MAGIC).
+        Формат не зависит от версий xgboost/sklearn: только numpy-массивы.
+        """
+        arrays = {
+            name: np.ascontiguousarray(getattr(self, name), dtype=dtype)
+            for name, dtype in _TREES_ARRAYS.items()
+        }
+
+        # смещения массивов — от начала секции данных, она идёт сразу после заголовка
+        specs: Dict[str, Any] = {}
+        offset = 0
+        for name, arr in arrays.items():
+            offset += -offset % TREES_ALIGN
+            specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes
+
+        header = json.dumps(
+            {
+                "format": 1,
+                "max_depth": self.max_depth,
+                "base_margin": self.base_margin,
+                "feature_names": self.feature_names,
+                "extra": extra or {},
+                "arrays": specs,
+            }
+        ).encode("utf-8")
+        data_start = _trees_data_start(len(header))
+
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(TREES_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, arr in arrays.items():
+                f.write(b"\0" * (data_start + specs[name]["offset"] - f.tell()))
+                f.write(arr.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_file(cls, path: str) -> "NumpyTreeBackend":
+        """
+        Загрузка .trees без копирования: массивы — np.memmap на файл.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(TREES_MAGIC)) != TREES_MAGIC:
+                raise ValueError(f"{path}: not a tree file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        data_start = _trees_data_start(header_len)
+
+        arrays = {
+            name: np.memmap(
+                path,
+                dtype=np.dtype(spec["dtype"]),
+                mode="r",
+                offset=data_start + spec["offset"],
+                shape=tuple(spec["shape"]),
+            )
+            for name, spec in header["arrays"].items()
+        }
+        backend = cls(
+            max_depth=int(header["max_depth"]),
+            base_margin=float(header["base_margin"]),
+            feature_names=header.get("feature_names"),
+            **arrays,
+        )
+        backend.extra = header.get("extra", {})
+        return backend
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        margin = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.ROW_BLOCK):
+            block = X[start : start + self.ROW_BLOCK]
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+
+            for _ in range(self.max_depth):
+                x = block[rows, self.feature[node]]
+                go_left = np.where(
+                    np.isnan(x), self.default_left[node], x < self.threshold[node]
+                )
+                node = np.where(go_left, self.left[node], self.right[node])
+
+            margin[start : start + len(block)] = self.value[node].sum(
+                axis=1, dtype=np.float64
+            )
+        return margin + self.base_margin
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+
+def _trees_data_start(header_len: int) -> int:
+    start = len(TREES_MAGIC) + 8 + header_len
+    return start + (-start % TREES_ALIGN)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    level = [0]
+    while level:
+        nxt = [c for n in level for c in (left[n], right[n]) if c != -1]
+        if nxt:
+            depth += 1
+        level = nxt
+    return depth
+
+
+def _parse_base_score(raw: str) -> float:
+    # в xgboost>=3 base_score хранится как "[5E-1]"
+    return float(str(raw).strip("[]").split(",")[0])
+
+
+BACKENDS = ("sklearn", "booster", "numpy")
+
+
+def build_backend(name: str, model: Any) -> InferenceBackend:
+    """
+    Собирает движок инференса по имени из настроек (INFERENCE_BACKEND).
+    model — загруженный XGBClassifier.
+    """
+    if name == "sklearn":
+        return SklearnBackend(model)
+    if name == "booster":
+        return BoosterBackend(model.get_booster())
+    if name == "numpy":
+        return NumpyTreeBackend.from_booster(model.get_booster())
+    raise ValueError(
+        f"Unknown INFERENCE_BACKEND={name!r}, expected one of: {', '.join(BACKENDS)}"
+    )
@@ -1,33 +1,142 @@
 # backend/app/services/llm_explainer.py
 from __future__ import annotations
 
+import asyncio
 from textwrap import dedent
+import hashlib
+import logging
+import math
 import os
-
-from openai import OpenAI
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from backend.app.core.config import get_settings
+from backend.app.core.executors import run_inference, run_io
 from backend.app.schemas.transactions import TransactionExplainRequest
+from backend.app.core.lazy import lazy_singleton
+from backend.app.core.metrics import STAGE_LLM_CALL
+from backend.app.services.attribution import (
+    explain_features_many,
+    get_feature_attribution_service,
+)
+from backend.app.services.explanation_cache import ExplanationCache
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# поля запроса, которые не являются поведенческими признаками
+CONTEXT_FIELDS = ("client_id", "transaction_id", "amount", "destination_id", "transdatetime")
+# идентификаторы: в фичи модели не входят, в ключ кэша тоже
+ID_FIELDS = {"client_id", "transaction_id", "destination_id"}
+
+
+class CircuitBreaker:
+    """
+    Простой circuit breaker для внешнего LLM.
+
+    closed    — вызовы идут как обычно;
+    open      — после failure_threshold ошибок подряд вызовы не делаются
+                reset_timeout_sec секунд (сразу отдаём fallback);
+    half-open — по истечении паузы пропускаем один пробный вызов:
+                успех закрывает breaker, ошибка снова открывает.
+    Используется только из event loop, поэтому без блокировок.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout_sec
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """
+        Вызов завершился без результата (отмена запроса): пробный слот
+        освобождается, состояние не меняется.
+        """
+        self._probe_in_flight = False
 
 
 class LLMExplainerService:
     def __init__(self) -> None:
         # Берём ключ либо из настроек, либо из переменной окружения
         api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+        base_url = settings.OPENAI_BASE_URL
 
-        if not api_key:
+        if not api_key and not base_url:
             # Ключ не задан — НЕ падаем, а просто помечаем, что LLM выключен
-            self.client: OpenAI | None = None
+            self.client: Any = None
         else:
-            self.client = OpenAI(api_key=api_key)
+            # base_url — любой OpenAI-совместимый сервер (в т.ч. локальная заглушка);
+            # таймаут и ретраи ограничены, общий дедлайн держит explain();
+            # SDK импортируется только когда LLM реально включён
+            from openai import AsyncOpenAI
+
+            self.client = AsyncOpenAI(
+                api_key=api_key or "not-needed",
+                base_url=base_url or None,
+                timeout=settings.LLM_TIMEOUT_SEC,
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
 
         self.model = settings.OPENAI_MODEL
+        self.deadline = settings.LLM_DEADLINE_SEC
+        self.max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_BREAKER_FAILURES,
+            reset_timeout_sec=settings.LLM_BREAKER_RESET_SEC,
+        )
+
+        self.cache = ExplanationCache(
+            db_path=settings.EXPLAIN_CACHE_PATH,
+            ttl_sec=settings.EXPLAIN_CACHE_TTL_SEC,
+            max_rows=settings.EXPLAIN_CACHE_MAX_ROWS,
+        )
+        self.proba_bucket = settings.EXPLAIN_CACHE_PROBA_BUCKET
+
+        # одинаковые запросы "в полёте" ждут один вызов LLM
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+        self.fallbacks = 0
 
     def is_enabled(self) -> bool:
         return self.client is not None
 
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+        self.cache.close()
+
     def _build_features_summary(self, req: TransactionExplainRequest) -> str:
         t = req.transaction
 
@@ -49,7 +158,131 @@ class LLMExplainerService:
 
         return "\n".join(lines)
 
-    def explain(self, req: TransactionExplainRequest) -> str:
+    async def _build_contributions_summary(self, req: TransactionExplainRequest) -> str:
+        """
+        Top-k вкладов фич (TreeSHAP) — чтобы LLM опиралась на то,
+        что реально двигало скор, а не угадывала по сырым значениям.
+        """
+        [(_, contributions)] = await run_inference(
+            explain_features_many, [req.transaction], settings.ATTRIBUTION_TOP_K
+        )
+        lines = ["Наибольший вклад в решение модели (лог-odds, + повышает риск):"]
+        for c in contributions:
+            lines.append(f"{c.feature} = {c.value:g}: {c.contribution:+.3f}")
+        return "\n".join(lines)
+
+    def _contributions_version(self) -> Optional[str]:
+        """
+        Версия модели, чьи вклады фич уйдут в промпт; None — вклады не нужны.
+        """
+        if not settings.LLM_PROMPT_CONTRIBUTIONS:
+            return None
+        attribution = get_feature_attribution_service()
+        if not attribution.available():
+            return None
+        return attribution.model_service.model_version
+
+    def _cache_key(
+        self,
+        req: TransactionExplainRequest,
+        features_text: str,
+        model_version: Optional[str] = None,
+    ) -> str:
+        """
+        Ключ кэша: сводка фич + бакет вероятности + уровень риска.
+        Повторные клики "объяснить" и почти одинаковые алерты дают один ключ.
+        С вкладами в промпте (model_version) — ещё версия модели и все
+        признаки транзакции: вклады зависят и от них, а считаются только при промахе.
+        """
+        bucket = (
+            math.floor(req.fraud_probability / self.proba_bucket)
+            if self.proba_bucket > 0
+            else req.fraud_probability
+        )
+        raw = f"{self.model}\n{req.risk_level}\n{bucket}\n{features_text}"
+        if model_version is not None:
+            transaction = req.transaction.model_dump_json(exclude=ID_FIELDS)
+            raw += f"\n{model_version}\n{transaction}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _single_flight(
+        self,
+        key: str,
+        req: TransactionExplainRequest,
+        features_text: str,
+        with_contributions: bool = False,
+    ) -> str:
+        """
+        Сводит одновременные одинаковые запросы к одному вызову LLM.
+        Вызов идёт отдельной задачей: отмена любого из ждущих запросов
+        (клиент ушёл) не отменяет его для остальных.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._explain_and_cache(key, req, features_text, with_contributions)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _explain_and_cache(
+        self,
+        key: str,
+        req: TransactionExplainRequest,
+        features_text: str,
+        with_contributions: bool = False,
+    ) -> str:
+        if with_contributions:
+            # TreeSHAP — только при промахе кэша, один раз на одинаковые запросы
+            features_text += "\n\n" + await self._build_contributions_summary(req)
+        explanation, from_llm = await self._explain_with_deadline(req, features_text)
+        if from_llm:
+            try:
+                await run_io(self.cache.put, key, explanation)
+            except sqlite3.Error:
+                # объяснение уже получено — проблемы кэша не должны ронять запрос
+                logger.exception("Failed to store explanation in cache")
+        return explanation
+
+    async def _explain_with_deadline(
+        self, req: TransactionExplainRequest, features_text: str
+    ) -> Tuple[str, bool]:
+        """
+        Вызов LLM с жёстким дедлайном (включая ожидание семафора).
+        При таймауте, ошибке или открытом breaker'е — локальный шаблон.
+        Возвращает (текст, получен_ли_он_от_LLM).
+        """
+        if not self.breaker.allow():
+            self.fallbacks += 1
+            return self._fallback_explanation(req), False
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def call() -> str:
+            async with self._semaphore:  # type: ignore[union-attr]
+                return await self._call_llm(req, features_text)
+
+        settled = False
+        try:
+            explanation = await asyncio.wait_for(call(), timeout=self.deadline)
+            self.breaker.record_success()
+            settled = True
+            return explanation, True
+        except Exception as exc:
+            # таймаут, ошибка API или сбой клиента — всё равно отвечаем шаблоном
+            self.breaker.record_failure()
+            settled = True
+            self.fallbacks += 1
+            logger.warning("LLM explanation failed (%s), using fallback", type(exc).__name__)
+            return self._fallback_explanation(req), False
+        finally:
+            # отмена (CancelledError) не успех и не ошибка, но пробный слот занимать не должна
+            if not settled:
+                self.breaker.release()
+
+    async def explain(self, req: TransactionExplainRequest) -> str:
         # Если ключ не настроен — возвращаем заглушку, но не падаем
         if not self.is_enabled():
             return (
@@ -58,7 +291,84 @@ class LLMExplainerService:
             )
 
         features_text = self._build_features_summary(req)
+        model_version = self._contributions_version()
+        key = self._cache_key(req, features_text, model_version)
+
+        cached = await run_io(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        return await self._single_flight(
+            key, req, features_text, with_contributions=model_version is not None
+        )
+
+    def _fallback_explanation(self, req: TransactionExplainRequest) -> str:
+        """
+        Детерминированное объяснение без LLM: берём самые заметные
+        отклонения поведения клиента от его же 30-дневной нормы.
+        """
+        t = req.transaction
+        # (сила отклонения, текст) — сортируем по силе, берём топ-3
+        signals: List[Tuple[float, str]] = []
 
+        z = t.zscore_interval_7d_vs_30d
+        if z is not None and abs(z) >= 2:
+            direction = "короче" if z < 0 else "длиннее"
+            signals.append(
+                (abs(z) / 2, f"интервалы между сессиями за 7 дней заметно {direction} "
+                             f"30-дневной нормы (z = {z:.2f})")
+            )
+
+        change = t.login_freq_change_7d_vs_30d
+        if change is not None and change >= 1:
+            signals.append(
+                (change, f"частота логинов за неделю выше месячной на {change * 100:.0f}%")
+            )
+        elif change is not None and change <= -0.5:
+            signals.append(
+                (abs(change), f"частота логинов за неделю упала на {abs(change) * 100:.0f}%")
+            )
+
+        share = t.logins_7d_share_of_30d
+        if share is not None and share >= 0.5:
+            signals.append(
+                (share * 2, f"{share * 100:.0f}% логинов за месяц пришлось на последнюю неделю")
+            )
+
+        burst = t.burstiness_sessions
+        if burst is not None and burst >= 0.5:
+            signals.append((burst * 2, f"логины идут всплесками (burstiness = {burst:.2f})"))
+
+        for value, what in (
+            (t.os_ver_cnt_30d, "версий ОС"),
+            (t.phone_model_cnt_30d, "моделей телефона"),
+        ):
+            if value is not None and value >= 2:
+                signals.append((value / 2, f"за 30 дней использовалось {value:.0f} разных {what}"))
+
+        missing = sum(
+            1 for name, value in t.model_dump().items()
+            if name not in CONTEXT_FIELDS and value is None
+        )
+
+        parts = [
+            f"Автоматическое объяснение (LLM сейчас недоступна): модель оценила "
+            f"вероятность мошенничества в {req.fraud_probability:.1%}, уровень риска — "
+            f"{req.risk_level}."
+        ]
+        if signals:
+            top = [text for _, text in sorted(signals, key=lambda s: s[0], reverse=True)[:3]]
+            parts.append("Основные отклонения от обычного поведения: " + "; ".join(top) + ".")
+        else:
+            parts.append("Заметных отклонений от обычного поведения клиента не видно.")
+        if missing >= 5:
+            parts.append(
+                f"Часть поведенческих признаков не заполнена ({missing}), "
+                "поэтому оценка опирается в основном на сумму перевода."
+            )
+        return " ".join(parts)
+
+    async def _call_llm(self, req: TransactionExplainRequest, features_text: str) -> str:
         prompt = dedent(
             f"""
             Ты — аналитик антифрод-системы банка.
@@ -80,25 +390,32 @@ class LLMExplainerService:
             """
         ).strip()
 
-        completion = self.client.chat.completions.create(  # type: ignore[union-attr]
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Ты помогаешь сотруднику службы безопасности банка и "
-                        "объясняешь решения антифрод-модели простым языком."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
-        )
+        # время вызова пишется и для ошибок/таймаутов — они и дают хвост p99
+        t0 = time.perf_counter()
+        try:
+            completion = await self.client.chat.completions.create(  # type: ignore[union-attr]
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "Ты помогаешь сотруднику службы безопасности банка и "
+                            "объясняешь решения антифрод-модели простым языком."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    },
+                ],
+            )
+        finally:
+            STAGE_LLM_CALL.observe(time.perf_counter() - t0)
 
         explanation = completion.choices[0].message.content or ""
         return explanation
 
 
-llm_explainer_service = LLMExplainerService()
+@lazy_singleton
+def get_llm_explainer_service() -> LLMExplainerService:
+    return LLMExplainerService()
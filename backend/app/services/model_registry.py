@@ -0,0 +1,390 @@
+# backend/app/services/model_registry.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.app.core.config import get_settings
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.feature_plan import FeaturePlan
+from backend.app.services.inference import (
+    InferenceBackend,
+    NumpyTreeBackend,
+    build_backend,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# форматы артефактов модели, загрузчик выбирается по расширению:
+# .pkl   — joblib-пикл XGBClassifier (привязан к версиям xgboost/sklearn);
+# .ubj   — нативный UBJSON XGBoost (переносим между версиями xgboost);
+# .trees — плоские массивы деревьев для numpy-движка, грузятся через mmap
+MODEL_SUFFIXES = (".pkl", ".ubj", ".trees")
+METADATA_SUFFIX = ".json"
+# указатель на активную версию + история активаций (для rollback)
+ACTIVE_POINTER = "ACTIVE.json"
+HISTORY_LIMIT = 20
+
+# допуск сверки с golden sample, если в метаданных не задан свой
+GOLDEN_ATOL = 1e-5
+
+
+def file_checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json_atomic(path: str, payload: Dict[str, Any]) -> None:
+    # пишем во временный файл и подменяем: читатели не видят полузаписанный JSON
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class ModelBundle:
+    """
+    Загруженная версия модели со всем, что нужно для скоринга:
+    движок инференса, план фич, пороги риска, версия и checksum.
+
+    Бандл не меняется после создания. FraudModelService держит ссылку
+    на текущий бандл и подменяет её целиком — запрос, уже взявший
+    бандл, дорабатывает на нём, даже если в этот момент активировали новую версию.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        checksum: str,
+        backend: InferenceBackend,
+        feature_names: Sequence[str],
+        model: Any = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        metadata = metadata or {}
+        # model — XGBClassifier, если артефакт его содержит (.pkl/.ubj);
+        # для .trees его нет, доступен только numpy-движок
+        self.model = model
+        self.path = path
+        self.checksum = checksum
+        self.metadata = metadata
+        self.version: str = metadata.get("version") or _version_from_path(path)
+
+        self.feature_names: List[str] = list(feature_names)
+        self.backend = backend
+        # словари категорий пишет обучение (ml/pipelines/train_pipeline.py)
+        self.plan = FeaturePlan.compile(
+            self.feature_names, categories=self.metadata.get("categories")
+        )
+
+        thresholds = metadata.get("thresholds") or {}
+        self.threshold_medium = float(
+            thresholds.get("medium", settings.RISK_THRESHOLD_MEDIUM)
+        )
+        self.threshold_high = float(thresholds.get("high", settings.RISK_THRESHOLD_HIGH))
+        self.thresholds = np.array([self.threshold_medium, self.threshold_high])
+
+        self._local = threading.local()
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        backend_name: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> "ModelBundle":
+        checksum = file_checksum(path)
+        if path.endswith(".trees"):
+            if backend_name != "numpy":
+                logger.info("%s: .trees is served by the numpy backend", path)
+            backend = NumpyTreeBackend.from_file(path)
+            return cls(path, checksum, backend, backend.feature_names or [], None, metadata)
+
+        model = load_xgb_model(path)
+        return cls(
+            path,
+            checksum,
+            build_backend(backend_name, model),
+            model.get_booster().feature_names,
+            model,
+            metadata,
+        )
+
+    def row_buffer(self) -> np.ndarray:
+        """
+        Предвыделенный буфер (1 x n_features) на поток:
+        эндпоинты работают в threadpool, общий буфер делить нельзя.
+        """
+        buf = getattr(self._local, "row", None)
+        if buf is None:
+            buf = np.zeros((1, self.plan.n_features), dtype=np.float32)
+            self._local.row = buf
+        return buf
+
+    def validate(self) -> None:
+        """
+        Проверка перед активацией: целостность файла, список фич
+        и сверка с golden sample из метаданных. Заодно прогревает движок.
+        Бросает ValueError, если версия не годится.
+        """
+        meta = self.metadata
+        if meta.get("checksum") and meta["checksum"] != self.checksum:
+            raise ValueError(
+                f"Model {self.version}: checksum mismatch "
+                f"({self.checksum[:12]} != {meta['checksum'][:12]})"
+            )
+        if meta.get("features") and list(meta["features"]) != self.feature_names:
+            raise ValueError(f"Model {self.version}: feature list differs from metadata")
+
+        golden = meta.get("golden_sample") or []
+        reqs = [TransactionScoringRequest(**item["request"]) for item in golden]
+        if not reqs:
+            # без golden sample хотя бы прогоняем пустую транзакцию
+            reqs = [TransactionScoringRequest(amount=0.0)]
+
+        probas = self.backend.predict(self.plan.build_matrix(reqs))
+        if not np.all(np.isfinite(probas)) or np.any((probas < 0) | (probas > 1)):
+            raise ValueError(f"Model {self.version}: predictions out of [0, 1]")
+
+        if golden:
+            expected = np.array([item["fraud_probability"] for item in golden])
+            atol = float(meta.get("golden_atol", GOLDEN_ATOL))
+            diff = np.abs(probas - expected)
+            if np.any(diff > atol):
+                raise ValueError(
+                    f"Model {self.version}: golden sample mismatch "
+                    f"(max diff {diff.max():.2e} > {atol:.0e})"
+                )
+
+
+def load_xgb_model(path: str) -> Any:
+    """
+    XGBClassifier из .pkl (joblib) или нативного .ubj.
+    """
+    if path.endswith(".ubj"):
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(path)
+        return model
+
+    import joblib
+
+    return joblib.load(path)
+
+
+def _version_from_path(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ModelRegistry:
+    """
+    Реестр версий моделей в каталоге (по умолчанию ml/models/).
+
+    Версия — файл модели <name>.pkl|.ubj|.trees и рядом метаданные <name>.json:
+    version, features, thresholds, metrics, checksum, golden_sample.
+    Файл модели без манифеста (копия, недописанный артефакт) версией не считается:
+    манифест пишут register/export.
+    Активная версия и история активаций хранятся в ACTIVE.json —
+    так её видят все воркеры и новый процесс поднимается сразу на ней.
+    """
+
+    def __init__(self, models_dir: str):
+        self.models_dir = models_dir
+
+    # --- версии ---
+
+    def _scan(self) -> Dict[str, Dict[str, Any]]:
+        versions: Dict[str, Dict[str, Any]] = {}
+        if not os.path.isdir(self.models_dir):
+            return versions
+        for name in sorted(os.listdir(self.models_dir)):
+            if not name.endswith(MODEL_SUFFIXES):
+                continue
+            path = os.path.join(self.models_dir, name)
+            if not os.path.exists(os.path.splitext(path)[0] + METADATA_SUFFIX):
+                continue
+            meta = self.metadata_for_path(path)
+            meta.setdefault("version", _version_from_path(path))
+            meta["path"] = path
+            versions[meta["version"]] = meta
+        return versions
+
+    def metadata_for_path(self, path: str) -> Dict[str, Any]:
+        meta_path = os.path.splitext(path)[0] + METADATA_SUFFIX
+        if not os.path.exists(meta_path):
+            return {}
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """
+        Краткое описание версий (без golden sample и списка фич).
+        """
+        skip = {"golden_sample", "features"}
+        return [
+            {k: v for k, v in meta.items() if k not in skip}
+            for meta in self._scan().values()
+        ]
+
+    def get(self, version: str) -> Dict[str, Any]:
+        versions = self._scan()
+        if version not in versions:
+            raise KeyError(version)
+        return versions[version]
+
+    def register(
+        self,
+        model_path: str,
+        version: Optional[str] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        metrics: Optional[Dict[str, float]] = None,
+        golden_requests: Sequence[TransactionScoringRequest] = (),
+        backend_name: str = "booster",
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Пишет файл метаданных рядом с моделью. Golden sample считается
+        самой моделью: дальше любая загрузка этой версии должна его воспроизвести.
+        extra — дополнительные поля манифеста (например, параметры обучения).
+        """
+        meta: Dict[str, Any] = self.metadata_for_path(model_path)
+        if extra:
+            meta.update(extra)
+        if version:
+            meta["version"] = version
+        bundle = ModelBundle.load(model_path, backend_name, meta)
+        meta.update(
+            version=bundle.version,
+            checksum=bundle.checksum,
+            features=bundle.feature_names,
+            created_at=meta.get("created_at") or time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+        if thresholds is not None:
+            meta["thresholds"] = thresholds
+        if metrics is not None:
+            meta["metrics"] = metrics
+        if golden_requests:
+            probas = bundle.backend.predict(bundle.plan.build_matrix(golden_requests))
+            meta["golden_sample"] = [
+                {
+                    "request": req.model_dump(mode="json", exclude_none=True),
+                    "fraud_probability": float(p),
+                }
+                for req, p in zip(golden_requests, probas.tolist())
+            ]
+        _write_json_atomic(os.path.splitext(model_path)[0] + METADATA_SUFFIX, meta)
+        return meta
+
+    def update_metadata(self, version: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Дописывает поля в манифест версии без перезагрузки модели
+        (например, пороги после калибровки). Работающий сервис увидит их
+        после повторной активации версии.
+        """
+        path = self.get(version)["path"]
+        meta = self.metadata_for_path(path)
+        meta.setdefault("version", version)
+        meta.update(fields)
+        _write_json_atomic(os.path.splitext(path)[0] + METADATA_SUFFIX, meta)
+        return meta
+
+    def export(
+        self,
+        source_path: str,
+        output_path: str,
+        version: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Экспорт модели в переносимый формат (.ubj или .trees) как новая версия.
+        Метаданные (пороги, метрики, golden sample) переносятся от источника,
+        после записи экспорт сверяется с golden sample — расхождение с
+        исходной моделью не даст зарегистрировать версию.
+        """
+        meta_path = os.path.splitext(output_path)[0] + METADATA_SUFFIX
+        if meta_path == os.path.splitext(source_path)[0] + METADATA_SUFFIX:
+            raise ValueError("Export must use a different file name than the source model")
+        if not output_path.endswith((".ubj", ".trees")):
+            raise ValueError(f"Unsupported export format: {output_path}")
+        stem, suffix = os.path.splitext(output_path)
+        for other in MODEL_SUFFIXES:
+            if other != suffix and os.path.exists(stem + other):
+                raise ValueError(f"{stem + other} already uses {meta_path}")
+
+        source_meta = self.metadata_for_path(source_path)
+        source_version = source_meta.get("version") or _version_from_path(source_path)
+        version = version or f"{source_version}-{suffix.lstrip('.')}"
+        existing = self._scan().get(version)
+        if existing is not None and existing["path"] != output_path:
+            raise ValueError(f"Version {version} already exists: {existing['path']}")
+
+        model = load_xgb_model(source_path)
+
+        if output_path.endswith(".ubj"):
+            model.save_model(output_path)
+        else:
+            NumpyTreeBackend.from_booster(model.get_booster()).save(
+                output_path,
+                extra={"source_version": source_version},
+            )
+
+        meta = {
+            k: v
+            for k, v in source_meta.items()
+            if k not in ("version", "checksum", "features", "created_at")
+        }
+        meta["version"] = version
+        meta["source_version"] = source_version
+        _write_json_atomic(meta_path, meta)
+
+        backend_name = "numpy" if output_path.endswith(".trees") else "booster"
+        meta = self.register(output_path, backend_name=backend_name)
+        ModelBundle.load(output_path, backend_name, meta).validate()
+        return meta
+
+    # --- активная версия ---
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.models_dir, ACTIVE_POINTER)
+
+    def read_pointer(self) -> Dict[str, Any]:
+        try:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_pointer(self, active: str, history: List[str]) -> None:
+        _write_json_atomic(
+            self.pointer_path,
+            {
+                "active": active,
+                "history": history[-HISTORY_LIMIT:],
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+        )
+
+    def startup_path(self, default_path: str) -> str:
+        """
+        Путь модели для старта процесса: активная версия из ACTIVE.json,
+        если указатель есть и версия на месте, иначе MODEL_PATH.
+        """
+        active = self.read_pointer().get("active")
+        if active:
+            try:
+                return self.get(active)["path"]
+            except KeyError:
+                logger.warning("Active model %r not found, using %s", active, default_path)
+        return default_path
@@ -0,0 +1,121 @@
+# backend/app/services/score_cache.py
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ScoreCache:
+    """
+    In-process LRU/TTL-кэш вероятностей модели.
+
+    Ключ — хэш версии модели + канонизированного вектора фич (float32 после
+    раскрытия _was_missing), поэтому одинаковые по смыслу запросы
+    (ретраи, score -> explain, сверки) попадают в один ключ, а смена модели
+    автоматически даёт новые ключи. При перезагрузке модели кэш ещё и чистится.
+    Батчи больше max_batch строк идут мимо кэша: ключ на строку съел бы выигрыш
+    векторного predict, а разовая выгрузка вытеснила бы горячие ключи.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl_sec: float = 300.0, max_batch: int = 64):
+        self.max_size = max_size
+        self.ttl = ttl_sec
+        self.max_batch = max_batch
+        self._data: "OrderedDict[bytes, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(model_version: str, row: np.ndarray) -> bytes:
+        # + 0.0 сводит -0.0 к 0.0, чтобы байтовое представление было каноничным
+        canonical = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0.0)
+        h = hashlib.blake2b(model_version.encode("utf-8"), digest_size=16)
+        h.update(canonical.tobytes())
+        return h.digest()
+
+    @staticmethod
+    def make_keys(model_version: str, X: np.ndarray) -> List[bytes]:
+        """
+        make_key для каждой строки матрицы: канонизация — одна операция на матрицу.
+        """
+        canonical = np.ascontiguousarray(X, dtype=np.float32) + np.float32(0.0)
+        prefix = hashlib.blake2b(model_version.encode("utf-8"), digest_size=16)
+        keys = []
+        for row in canonical:
+            h = prefix.copy()
+            h.update(row.tobytes())
+            keys.append(h.digest())
+        return keys
+
+    def batchable(self, n: int) -> bool:
+        return self.enabled and n <= self.max_batch
+
+    def get(self, key: bytes) -> Optional[float]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[float]]:
+        now = time.monotonic()
+        out: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    self.misses += 1
+                    out.append(None)
+                    continue
+                expires_at, proba = entry
+                if expires_at < now:
+                    del self._data[key]
+                    self.evictions += 1
+                    self.misses += 1
+                    out.append(None)
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                out.append(proba)
+        return out
+
+    def put(self, key: bytes, proba: float) -> None:
+        self.put_many([key], [proba])
+
+    def put_many(self, keys: Sequence[bytes], probas: Sequence[float]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, proba in zip(keys, probas):
+                self._data[key] = (expires_at, proba)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_sec": self.ttl,
+            "max_batch": self.max_batch,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
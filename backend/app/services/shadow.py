@@ -0,0 +1,337 @@
+# backend/app/services/shadow.py
+from __future__ import annotations
+
+import logging
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from backend.app.core.config import get_settings
+from backend.app.core.lazy import lazy_singleton
+from backend.app.schemas.transactions import (
+    TransactionScoringRequest,
+    TransactionScoringResponse,
+)
+from backend.app.services.audit_store import (
+    DAY_MS,
+    SHADOW_LOGS,
+    ensure_schema,
+    iso_to_ms,
+    now_ms,
+    open_connection,
+)
+from backend.app.services.fraud_model import RISK_LEVELS, get_model_registry
+from backend.app.services.model_registry import ModelBundle, ModelRegistry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# границы бакетов гистограммы скоров в отчёте
+REPORT_BUCKETS = 10
+
+
+class ShadowScoringService:
+    """
+    Теневой скоринг challenger-моделями (champion/challenger).
+
+    Обработчик после ответа champion только кладёт задачу в отдельный
+    однопоточный пул — ответ клиенту не ждёт challenger'ов.
+    В тень уходит не больше fraction транзакций; если пул не успевает
+    и задач в очереди больше max_pending, новые задачи пропускаются
+    (счётчик skipped), а не копятся в памяти.
+    Результаты пишутся рядом с аудитом в суточные таблицы shadow_logs_YYYYMMDD
+    (services/audit_store.py, та же retention), ключ — версия модели.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        backend_name: str,
+        db_path: str,
+        versions: Sequence[str] = (),
+        fraction: float = 0.1,
+        max_pending: int = 100,
+    ):
+        self.registry = registry
+        self.backend_name = backend_name
+        self.db_path = db_path
+        self.versions = [v for v in versions if v]
+        self.fraction = min(max(fraction, 0.0), 1.0)
+        self.max_pending = max_pending
+
+        # версия -> загруженный бандл; список подменяется целиком
+        self.challengers: Dict[str, ModelBundle] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._tables: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.submitted = 0
+        self.skipped = 0
+        self.scored = 0
+        self.errors = 0
+
+    # --- жизненный цикл ---
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="shadow"
+                    )
+        return self._executor
+
+    def start(self) -> None:
+        """
+        Загрузка challenger'ов из SHADOW_MODELS — в фоне, старт API не ждёт.
+        """
+        for version in self.versions:
+            self._pool().submit(self._load_logged, version)
+
+    def _load_logged(self, version: str) -> None:
+        try:
+            self.load(version)
+        except Exception:
+            logger.exception("Challenger %s was not loaded", version)
+
+    def load(self, version: str) -> Dict[str, Any]:
+        meta = self.registry.get(version)
+        bundle = ModelBundle.load(meta["path"], self.backend_name, meta)
+        bundle.validate()
+        challengers = dict(self.challengers)
+        challengers[bundle.version] = bundle
+        self.challengers = challengers
+        logger.info("Challenger %s loaded", bundle.version)
+        return {"version": bundle.version, "checksum": bundle.checksum}
+
+    def unload(self, version: str) -> None:
+        challengers = dict(self.challengers)
+        if challengers.pop(version, None) is None:
+            raise KeyError(version)
+        self.challengers = challengers
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- путь запроса ---
+
+    def submit(
+        self,
+        reqs: Sequence[TransactionScoringRequest],
+        responses: Sequence[TransactionScoringResponse],
+    ) -> None:
+        """
+        Вызывается из обработчика после скоринга champion'ом. Ничего не ждёт.
+        """
+        if not self.challengers or self.fraction <= 0 or not reqs:
+            return
+        if self.fraction < 1.0:
+            picked = [i for i in range(len(reqs)) if random.random() < self.fraction]
+            if not picked:
+                return
+            reqs = [reqs[i] for i in picked]
+            responses = [responses[i] for i in picked]
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.skipped += len(reqs)
+                return
+            self._pending += 1
+            self.submitted += len(reqs)
+        self._pool().submit(self._run, list(reqs), list(responses))
+
+    # --- фоновая часть ---
+
+    def _connection(self) -> sqlite3.Connection:
+        # соединение живёт в единственном потоке пула
+        if self._conn is None:
+            conn = open_connection(self.db_path)
+            ensure_schema(conn)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+            self._tables = set()
+        return self._conn
+
+    def _run(
+        self,
+        reqs: List[TransactionScoringRequest],
+        responses: List[TransactionScoringResponse],
+    ) -> None:
+        try:
+            ts = now_ms()
+            rows: List[tuple] = []
+            for version, bundle in self.challengers.items():
+                if version == responses[0].model_version:
+                    continue
+                probas = bundle.backend.predict(bundle.plan.build_matrix(reqs))
+                risks = RISK_LEVELS[
+                    np.searchsorted(bundle.thresholds, probas, side="right")
+                ]
+                for req, resp, p, r in zip(reqs, responses, probas.tolist(), risks):
+                    rows.append(
+                        (
+                            ts, req.client_id, req.amount,
+                            resp.model_version, resp.fraud_probability, resp.risk_level,
+                            version, p, r,
+                        )
+                    )
+            if rows:
+                conn = self._connection()
+                table = SHADOW_LOGS.name(ts)
+                if table not in self._tables:
+                    SHADOW_LOGS.create(conn, table)
+                    self._tables.add(table)
+                conn.executemany(SHADOW_LOGS.insert_sql(table), rows)
+                conn.commit()
+                self.scored += len(rows)
+        except Exception:
+            self.errors += 1
+            logger.exception("Shadow scoring of %d items failed", len(reqs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    # --- отчёт ---
+
+    def report(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Сравнение challenger'ов с champion: средние скоры, расхождение,
+        доля совпадений уровня риска, матрица risk_level и гистограммы скоров.
+        Суммы считаются по каждой суточной таблице и складываются.
+        """
+        since_ms = iso_to_ms(since) if since else 0
+        totals: Dict[str, Dict[str, Any]] = {}
+
+        def entry(version: str, champion: str) -> Dict[str, Any]:
+            key = f"{version}|{champion}"
+            if key not in totals:
+                totals[key] = {
+                    "model_version": version,
+                    "champion_version": champion,
+                    "count": 0,
+                    "sums": [0.0, 0.0, 0.0, 0.0],
+                    "max_abs_diff": None,
+                    "risk_level_matrix": {},
+                    "histogram": {
+                        "champion": [0] * REPORT_BUCKETS,
+                        "challenger": [0] * REPORT_BUCKETS,
+                    },
+                }
+            return totals[key]
+
+        conn = open_connection(self.db_path)
+        try:
+            for table, day in SHADOW_LOGS.partitions(conn):
+                if day + DAY_MS <= since_ms:
+                    continue
+                params = (since_ms,)
+
+                for row in conn.execute(
+                    f"""
+                    SELECT model_version, champion_version, COUNT(*),
+                           TOTAL(champion_probability), TOTAL(fraud_probability),
+                           TOTAL(ABS(fraud_probability - champion_probability)),
+                           TOTAL(risk_level = champion_risk_level),
+                           MAX(ABS(fraud_probability - champion_probability))
+                    FROM {table} WHERE ts >= ?
+                    GROUP BY model_version, champion_version
+                    """,
+                    params,
+                ):
+                    version, champion, n, *sums, max_diff = row
+                    item = entry(version, champion)
+                    item["count"] += n
+                    item["sums"] = [a + b for a, b in zip(item["sums"], sums)]
+                    if max_diff is not None:
+                        item["max_abs_diff"] = max(item["max_abs_diff"] or 0.0, max_diff)
+
+                for version, champion, ch_risk, risk, n in conn.execute(
+                    f"""
+                    SELECT model_version, champion_version, champion_risk_level, risk_level,
+                           COUNT(*)
+                    FROM {table} WHERE ts >= ?
+                    GROUP BY 1, 2, 3, 4
+                    """,
+                    params,
+                ):
+                    matrix = entry(version, champion)["risk_level_matrix"]
+                    row_counts = matrix.setdefault(ch_risk, {})
+                    row_counts[risk] = row_counts.get(risk, 0) + n
+
+                histograms = (
+                    ("champion_probability", "champion"),
+                    ("fraud_probability", "challenger"),
+                )
+                for column, key in histograms:
+                    for version, champion, bucket, n in conn.execute(
+                        f"""
+                        SELECT model_version, champion_version,
+                               MIN(CAST({column} * {REPORT_BUCKETS} AS INTEGER), {REPORT_BUCKETS - 1}),
+                               COUNT(*)
+                        FROM {table} WHERE ts >= ?
+                        GROUP BY 1, 2, 3
+                        """,
+                        params,
+                    ):
+                        entry(version, champion)["histogram"][key][bucket] += n
+        finally:
+            conn.close()
+
+        models = []
+        for item in totals.values():
+            n = item["count"] or 1
+            mean_ch, mean_p, mad, agree = (s / n for s in item.pop("sums"))
+            models.append(
+                {
+                    "model_version": item["model_version"],
+                    "champion_version": item["champion_version"],
+                    "count": item["count"],
+                    "champion_mean_probability": mean_ch,
+                    "mean_probability": mean_p,
+                    "mean_abs_diff": mad,
+                    "max_abs_diff": item["max_abs_diff"],
+                    "risk_level_agreement": agree,
+                    "risk_level_matrix": item["risk_level_matrix"],
+                    "histogram": item["histogram"],
+                }
+            )
+        return {
+            "challengers": sorted(self.challengers),
+            "fraction": self.fraction,
+            "models": models,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "challengers": sorted(self.challengers),
+            "fraction": self.fraction,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "scored": self.scored,
+            "errors": self.errors,
+        }
+
+
+@lazy_singleton
+def get_shadow_scoring() -> ShadowScoringService:
+    return ShadowScoringService(
+        registry=get_model_registry(),
+        backend_name=settings.INFERENCE_BACKEND,
+        db_path=settings.LOG_DB_PATH,
+        versions=[v.strip() for v in settings.SHADOW_MODELS.split(",")],
+        fraction=settings.SHADOW_FRACTION,
+        max_pending=settings.SHADOW_MAX_PENDING,
+    )
@@ -0,0 +1,409 @@
+# backend/app/services/velocity.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import get_settings
+from backend.app.core.lazy import lazy_singleton
+from backend.app.core.metrics import callback
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.feature_store import to_epoch
+
+settings = get_settings()
+
+HOUR_SEC = 3600
+DAY_SEC = 24 * HOUR_SEC
+# окна скорости: (длина, ширина бакета) — 60 минутных и 24 часовых бакета
+WINDOW_1H = (HOUR_SEC, 60)
+WINDOW_24H = (DAY_SEC, HOUR_SEC)
+# сколько получателей помнить на клиента для флага "новый получатель"
+MAX_DESTINATIONS_PER_CLIENT = 512
+# насколько transdatetime может опережать часы сервера; дальше — обрезаем
+MAX_FUTURE_SKEW_SEC = 300
+
+VELOCITY_FEATURES = (
+    "client_txn_cnt_1h",
+    "client_txn_cnt_24h",
+    "client_amount_sum_1h",
+    "client_amount_sum_24h",
+    "client_new_destination",
+    "destination_clients_24h",
+)
+
+
+class BucketWindow:
+    """
+    Счётчик и сумма за скользящее окно из фиксированных бакетов.
+
+    Окно — бакеты с индексом в (cur - n, cur], где индекс = ts // width.
+    Хранится не больше n бакетов от самого нового, значение — сумма бакетов
+    окна на момент запроса: результат не зависит от того, когда и сколько
+    раз окно опрашивали (важно для совпадения онлайна и офлайн-бэкфилла).
+    Опоздавшее событие попадает в свой бакет, а старше окна — отбрасывается.
+    """
+
+    __slots__ = ("width", "n", "buckets")
+
+    def __init__(self, span: int, width: int) -> None:
+        self.width = width
+        self.n = span // width
+        # [индекс бакета, число, сумма] по возрастанию индекса
+        self.buckets: Deque[List[Any]] = deque()
+
+    def add(self, ts: float, amount: float) -> None:
+        idx = int(ts // self.width)
+        buckets = self.buckets
+        if not buckets or idx > buckets[-1][0]:
+            buckets.append([idx, 1, amount])
+            while buckets[0][0] <= idx - self.n:
+                buckets.popleft()
+            return
+        if idx <= buckets[-1][0] - self.n:
+            return
+        for pos in range(len(buckets) - 1, -1, -1):
+            bucket = buckets[pos]
+            if bucket[0] == idx:
+                bucket[1] += 1
+                bucket[2] += amount
+                return
+            if bucket[0] < idx:
+                buckets.insert(pos + 1, [idx, 1, amount])
+                return
+        buckets.appendleft([idx, 1, amount])
+
+    def totals(self, ts: float) -> Tuple[int, float]:
+        cur = int(ts // self.width)
+        count, total = 0, 0.0
+        for idx, c, s in self.buckets:
+            if cur - self.n < idx <= cur:
+                count += c
+                total += s
+        return count, total
+
+
+class _ClientVelocity:
+    __slots__ = ("hour", "day", "destinations", "last_ts")
+
+    def __init__(self) -> None:
+        self.hour = BucketWindow(*WINDOW_1H)
+        self.day = BucketWindow(*WINDOW_24H)
+        # получатель -> время последнего перевода, в порядке последнего перевода
+        self.destinations: "OrderedDict[str, float]" = OrderedDict()
+        self.last_ts = 0.0
+
+
+class _DestinationVelocity:
+    __slots__ = ("clients", "last_ts")
+
+    def __init__(self) -> None:
+        # клиент -> индекс часового бакета последнего перевода, в порядке обновления
+        self.clients: "OrderedDict[str, int]" = OrderedDict()
+        self.last_ts = 0.0
+
+    def distinct_clients(self, ts: float) -> int:
+        cur = int(ts // WINDOW_24H[1])
+        horizon = cur - WINDOW_24H[0] // WINDOW_24H[1]
+        clients = self.clients
+        while clients and next(iter(clients.values())) <= horizon:
+            clients.popitem(last=False)
+        return len(clients)
+
+
+def _touch(keys: "OrderedDict[str, Any]", key: str, factory) -> Any:
+    state = keys.get(key)
+    if state is None:
+        state = keys[key] = factory()
+    else:
+        keys.move_to_end(key)
+    return state
+
+
+def _evict(keys: "OrderedDict[str, Any]", now: float, idle_sec: float, max_keys: int) -> int:
+    # ключи упорядочены по последней активности: простаивающие — в начале
+    evicted = 0
+    while keys:
+        state = next(iter(keys.values()))
+        if len(keys) <= max_keys and state.last_ts >= now - idle_sec:
+            break
+        keys.popitem(last=False)
+        evicted += 1
+    return evicted
+
+
+class VelocityEngine:
+    """
+    Потоковые признаки скорости переводов по клиенту и получателю.
+
+    На каждую транзакцию observe() сначала отдаёт значения по истории
+    ДО неё (число и сумма переводов клиента за 1ч/24ч, новый ли получатель
+    для клиента, сколько разных клиентов платили получателю за 24ч),
+    затем учитывает её. Память ограничена: окна — фиксированное число бакетов,
+    ключи без активности дольше своего горизонта вытесняются, общее
+    число ключей ограничено max_keys (LRU).
+
+    Офлайн-бэкфилл (cli velocity-backfill) прогоняет историю через тот же класс
+    в порядке времени — значения для обучения совпадают с онлайном.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 1_000_000,
+        new_destination_days: float = 30.0,
+        dedup_ids: int = 100_000,
+    ):
+        self.max_keys = max_keys
+        self.destination_horizon = new_destination_days * DAY_SEC
+        self.dedup_ids = dedup_ids
+        self._clients: "OrderedDict[str, _ClientVelocity]" = OrderedDict()
+        self._destinations: "OrderedDict[str, _DestinationVelocity]" = OrderedDict()
+        # transaction_id -> признаки первого учёта (ретраи получают те же значения)
+        self._seen: "OrderedDict[str, Tuple[Optional[float], ...]]" = OrderedDict()
+        # самое позднее учтённое время: по нему, а не по ts запроса, вытесняются ключи
+        self._clock = 0.0
+        self._lock = threading.Lock()
+
+        self.observed = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_keys > 0
+
+    def _features(
+        self,
+        client: Optional[_ClientVelocity],
+        destination: Optional[_DestinationVelocity],
+        destination_id: Optional[str],
+        ts: float,
+    ) -> Dict[str, Optional[float]]:
+        features: Dict[str, Optional[float]] = dict.fromkeys(VELOCITY_FEATURES)
+        if client is not None:
+            cnt_1h, sum_1h = client.hour.totals(ts)
+            cnt_24h, sum_24h = client.day.totals(ts)
+            features.update(
+                client_txn_cnt_1h=float(cnt_1h),
+                client_txn_cnt_24h=float(cnt_24h),
+                client_amount_sum_1h=sum_1h,
+                client_amount_sum_24h=sum_24h,
+            )
+        else:
+            features.update(
+                client_txn_cnt_1h=0.0,
+                client_txn_cnt_24h=0.0,
+                client_amount_sum_1h=0.0,
+                client_amount_sum_24h=0.0,
+            )
+        if destination_id is not None:
+            seen = client.destinations.get(destination_id) if client is not None else None
+            new = seen is None or seen < ts - self.destination_horizon
+            features["client_new_destination"] = 1.0 if new else 0.0
+            features["destination_clients_24h"] = float(
+                destination.distinct_clients(ts) if destination is not None else 0
+            )
+        return features
+
+    def peek(
+        self, client_id: str, destination_id: Optional[str] = None, ts: Optional[float] = None
+    ) -> Dict[str, Optional[float]]:
+        """
+        Значения признаков на момент ts без учёта новой транзакции.
+        """
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            return self._features(
+                self._clients.get(client_id),
+                self._destinations.get(destination_id) if destination_id else None,
+                destination_id,
+                ts,
+            )
+
+    def observe(
+        self,
+        client_id: str,
+        destination_id: Optional[str],
+        amount: float,
+        ts: float,
+        transaction_id: Optional[str] = None,
+    ) -> Dict[str, Optional[float]]:
+        """
+        Признаки транзакции по истории до неё + учёт самой транзакции.
+        Повтор transaction_id не учитывается второй раз и получает те же значения;
+        ts дальше MAX_FUTURE_SKEW_SEC от текущего времени обрезается.
+        """
+        ts = min(ts, time.time() + MAX_FUTURE_SKEW_SEC)
+        with self._lock:
+            if transaction_id is not None and self.dedup_ids > 0:
+                seen = self._seen.get(transaction_id)
+                if seen is not None:
+                    return dict(zip(VELOCITY_FEATURES, seen))
+
+            client = _touch(self._clients, client_id, _ClientVelocity)
+            destination = (
+                _touch(self._destinations, destination_id, _DestinationVelocity)
+                if destination_id
+                else None
+            )
+            features = self._features(client, destination, destination_id, ts)
+
+            client.hour.add(ts, amount)
+            client.day.add(ts, amount)
+            client.last_ts = max(client.last_ts, ts)
+            if destination is not None:
+                if ts >= client.destinations.get(destination_id, ts):
+                    client.destinations[destination_id] = ts
+                    client.destinations.move_to_end(destination_id)
+                if len(client.destinations) > MAX_DESTINATIONS_PER_CLIENT:
+                    client.destinations.popitem(last=False)
+                bucket = int(ts // WINDOW_24H[1])
+                if bucket >= destination.clients.get(client_id, bucket):
+                    destination.clients[client_id] = bucket
+                    destination.clients.move_to_end(client_id)
+                destination.last_ts = max(destination.last_ts, ts)
+
+            if transaction_id is not None and self.dedup_ids > 0:
+                self._seen[transaction_id] = tuple(features[f] for f in VELOCITY_FEATURES)
+                if len(self._seen) > self.dedup_ids:
+                    self._seen.popitem(last=False)
+
+            self.observed += 1
+            self._clock = max(self._clock, ts)
+            # клиент хранит историю получателей, получатель — только окно 24ч
+            self.evictions += _evict(
+                self._clients, self._clock, self.destination_horizon, self.max_keys
+            )
+            self.evictions += _evict(self._destinations, self._clock, DAY_SEC, self.max_keys)
+            return features
+
+    def observe_many(
+        self, events: Iterable[Tuple[Any, ...]]
+    ) -> List[Dict[str, Optional[float]]]:
+        return [self.observe(*event) for event in events]
+
+    def enrich(
+        self,
+        reqs: Sequence[TransactionScoringRequest],
+        now: Optional[float] = None,
+        record: bool = True,
+    ) -> List[TransactionScoringRequest]:
+        """
+        Подставляет признаки скорости (только незаполненные) и, при record,
+        учитывает сами транзакции. Без client_id запрос не меняется.
+        """
+        if not self.enabled:
+            return list(reqs)
+        now = time.time() if now is None else now
+        out: List[TransactionScoringRequest] = []
+        for req in reqs:
+            if not req.client_id:
+                out.append(req)
+                continue
+            ts = to_epoch(req.transdatetime) if req.transdatetime is not None else now
+            if record:
+                features = self.observe(
+                    req.client_id, req.destination_id, req.amount, ts, req.transaction_id
+                )
+            else:
+                features = self.peek(req.client_id, req.destination_id, ts)
+            update = {
+                f: v for f, v in features.items()
+                if v is not None and getattr(req, f) is None
+            }
+            out.append(req.model_copy(update=update) if update else req)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients, destinations = len(self._clients), len(self._destinations)
+        return {
+            "enabled": self.enabled,
+            "clients": clients,
+            "destinations": destinations,
+            "max_keys": self.max_keys,
+            "observed": self.observed,
+            "evictions": self.evictions,
+        }
+
+
+def transaction_ts(value: Any) -> float:
+    """
+    transdatetime выгрузки ('2025-01-05 16:32:02.000', UTC) -> epoch.
+    """
+    if isinstance(value, datetime):
+        return to_epoch(value)
+    return to_epoch(datetime.fromisoformat(str(value).strip().strip("'")))
+
+
+def build_velocity_engine() -> VelocityEngine:
+    return VelocityEngine(
+        max_keys=settings.VELOCITY_MAX_KEYS,
+        new_destination_days=settings.VELOCITY_NEW_DESTINATION_DAYS,
+        dedup_ids=settings.VELOCITY_DEDUP_IDS,
+    )
+
+
+def velocity_backfill(frame):
+    """
+    Признаки скорости для исторических транзакций: прогон через тот же
+    VelocityEngine, что и в API, в порядке времени — значения совпадают с онлайном.
+    Офлайн-путь (CLI, preprocess): pandas импортируется только здесь.
+    """
+    import pandas as pd
+
+    from backend.app.services.csv_io import PASSTHROUGH_COLUMNS
+
+    frame = frame.assign(_ts=[transaction_ts(v) for v in frame["transdatetime"]])
+    frame = frame.sort_values("_ts", kind="stable").reset_index(drop=True)
+    missing = [None] * len(frame)
+    destinations = frame["destination_id"] if "destination_id" in frame else missing
+    # повторы transaction_id в выгрузке учитываются один раз — как ретраи в API
+    transaction_ids = frame["transaction_id"] if "transaction_id" in frame else missing
+    engine = build_velocity_engine()
+    rows = [
+        # без client_id API тоже не считает скорость
+        engine.observe(
+            str(client_id),
+            None if pd.isna(dest) else str(dest),
+            float(amount),
+            ts,
+            None if pd.isna(txn) else str(txn),
+        )
+        if not pd.isna(client_id)
+        else dict.fromkeys(VELOCITY_FEATURES)
+        for client_id, dest, amount, ts, txn in zip(
+            frame["client_id"],
+            destinations,
+            frame["amount"].fillna(0.0),
+            frame["_ts"],
+            transaction_ids,
+        )
+    ]
+    out = frame[[c for c in PASSTHROUGH_COLUMNS if c in frame.columns]].copy()
+    features = pd.DataFrame.from_records(rows, columns=list(VELOCITY_FEATURES))
+    return pd.concat([out, features], axis=1)
+
+
+@lazy_singleton
+def get_velocity_engine() -> VelocityEngine:
+    # онлайн-счётчики — только при VELOCITY_ENABLED; velocity_backfill
+    # строит свой движок и от флага не зависит
+    if not settings.VELOCITY_ENABLED:
+        return VelocityEngine(max_keys=0)
+    return build_velocity_engine()
+
+
+def _velocity_keys() -> Dict[Tuple[str, ...], float]:
+    engine = get_velocity_engine.peek()
+    stats = engine.stats() if engine is not None else {"clients": 0, "destinations": 0}
+    return {("client",): stats["clients"], ("destination",): stats["destinations"]}
+
+
+callback(
+    "antifraud_velocity_keys",
+    "Keys held by the velocity engine",
+    _velocity_keys,
+    labelnames=("kind",),
+)
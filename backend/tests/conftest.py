@@ -0,0 +1,16 @@
+# backend/tests/conftest.py
+from __future__ import annotations
+
+import pytest
+
+from backend.app.core.config import get_settings
+
+
+@pytest.fixture(scope="session")
+def xgb_model():
+    """
+    Исходная sklearn-модель XGBClassifier из MODEL_PATH.
+    """
+    joblib = pytest.importorskip("joblib")
+    pytest.importorskip("xgboost")
+    return joblib.load(get_settings().MODEL_PATH)
@@ -0,0 +1,251 @@
+# backend/tests/test_api.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# тяжёлые зависимости, которые не должны грузиться при импорте приложения
+HEAVY_MODULES = ("pandas", "xgboost", "sklearn", "joblib", "openai", "scipy")
+
+# бюджет на `import backend.app.main` (мс); переопределяется IMPORT_TIME_BUDGET_MS
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    # отдельный процесс: sys.modules текущей сессии pytest уже "грязный"
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _loaded_after_import(module: str) -> set:
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    return set(_run_python("-c", code).stdout.split())
+
+
+def _import_time_ms(module: str) -> float:
+    """
+    Кумулятивное время импорта модуля по `python -X importtime` (мс).
+    """
+    result = _run_python("-X", "importtime", "-c", f"import {module}")
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000.0
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_app_import_does_not_load_heavy_dependencies():
+    assert _loaded_after_import("backend.app.main") == set()
+
+
+def test_schemas_import_is_lightweight():
+    assert _loaded_after_import("backend.app.schemas.transactions") == set()
+
+
+def test_app_import_time_budget():
+    pytest.importorskip("fastapi")
+    # первый прогон прогревает .pyc, меряем второй
+    _import_time_ms("backend.app.main")
+    elapsed = _import_time_ms("backend.app.main")
+    assert elapsed < IMPORT_TIME_BUDGET_MS, (
+        f"import backend.app.main took {elapsed:.0f} ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+    )
+
+
+# --- эндпоинты скоринга ---
+
+
+@pytest.fixture()
+def isolated_app(tmp_path, monkeypatch):
+    """
+    Без lifespan: аудит пишется во временный файл, онлайн-сторы
+    (фичи, скорость, тень) создаются заново и после теста возвращаются прежние.
+    """
+    from backend.app.core.config import get_settings
+    from backend.app.services.audit_logger import audit_writer
+    from backend.app.services.feature_store import get_feature_store
+    from backend.app.services.shadow import get_shadow_scoring
+    from backend.app.services.velocity import get_velocity_engine
+
+    db_path = str(tmp_path / "logs" / "scoring_logs.db")
+    audit_writer.stop()
+    monkeypatch.setattr(get_settings(), "LOG_DB_PATH", db_path)
+    monkeypatch.setattr(audit_writer, "db_path", db_path)
+    for singleton in (get_feature_store, get_velocity_engine, get_shadow_scoring):
+        monkeypatch.setattr(singleton, "_instance", None)
+    yield db_path
+    audit_writer.stop()
+
+
+def _post(path: str, parts, content_type: str):
+    """
+    POST в ASGI-приложение напрямую: тело приходит частями parts
+    (строки режутся между частями), receive после тела не отвечает —
+    как соединение, которое ещё открыто. Возвращает (status, тело ответа).
+    """
+    from backend.app.main import app
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": p, "more_body": True} for p in parts]
+        messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"content-type", content_type.encode())],
+            "client": ("test", 1),
+            "server": ("test", 80),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=30)
+        return sent
+
+    sent = asyncio.run(scenario())
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def _stream(parts, content_type: str = "application/x-ndjson"):
+    """
+    /api/v1/score_stream: (status, строки ответа как dict).
+    """
+    status, body = _post("/api/v1/score_stream", parts, content_type)
+    return status, [json.loads(line) for line in body.splitlines()]
+
+
+def _post_json(path: str, payload):
+    status, body = _post(path, [json.dumps(payload).encode()], "application/json")
+    return status, json.loads(body)
+
+
+def _tx(i: int) -> bytes:
+    return b'{"client_id": "s%d", "amount": %d.0}\n' % (i, 100 * (i + 1))
+
+
+def test_score_stream_scores_lines_split_across_chunks(isolated_app, monkeypatch):
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+    from backend.app.core.metrics import BATCH_SIZE
+
+    monkeypatch.setattr(get_settings(), "STREAM_CHUNK_SIZE", 2)
+    chunks_before = BATCH_SIZE.labels("score_stream").snapshot()[0][-1]
+    body = b"".join(_tx(i) for i in range(5))
+    # части по 7 байт: ни одна строка не приходит целиком
+    status, rows = _stream([body[i:i + 7] for i in range(0, len(body), 7)])
+
+    assert status == 200
+    assert len(rows) == 5 and all("fraud_probability" in r for r in rows)
+    # 5 строк по 2 на батч -> 3 батча
+    assert BATCH_SIZE.labels("score_stream").snapshot()[0][-1] - chunks_before == 3
+
+    from backend.app.services.audit_logger import audit_writer
+    from backend.app.services.audit_store import query_scoring_logs
+
+    audit_writer.flush()
+    assert len(query_scoring_logs(db_path=isolated_app)) == 5
+
+
+def test_score_stream_reports_bad_lines_in_place(isolated_app, monkeypatch):
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "STREAM_MAX_LINE_BYTES", 100)
+    too_long = b'{"client_id": "' + b"x" * 200 + b'"}\n'
+    status, rows = _stream(
+        [_tx(0) + b"{not json\n" + too_long[:80], too_long[80:] + _tx(1)]
+    )
+
+    assert status == 200
+    assert "fraud_probability" in rows[0]
+    assert rows[1]["line"] == 2 and rows[1]["error"]
+    assert rows[2] == {
+        "line": 3,
+        "error": [{"type": "line_too_long", "msg": "Line exceeds 100 bytes"}],
+    }
+    assert "fraud_probability" in rows[3] and len(rows) == 4
+
+
+def test_score_stream_empty_body_and_wrong_content_type(isolated_app):
+    assert _stream([]) == (200, [])
+    status, _ = _stream([_tx(0)], content_type="application/json")
+    assert status == 415
+
+
+# разные суммы и поведение клиента — попадают в разные уровни риска
+BATCH_ITEMS = [
+    {"client_id": "b1", "amount": 500.0},
+    {"client_id": "b2", "amount": 250_000.0, "os_ver_cnt_30d": 4, "phone_model_cnt_30d": 3},
+    {"client_id": "b3", "amount": 12_000.0, "login_sessions_7d": 40, "logins_per_day_7d": 5.7},
+    {"client_id": "b4", "amount": 90_000.0, "burstiness_sessions": 0.9, "client_txn_cnt_1h": 6},
+]
+
+
+def test_score_batch_matches_single_scoring(isolated_app, monkeypatch):
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+
+    # счётчики скорости иначе изменят фичи между батчем и одиночными запросами
+    monkeypatch.setattr(get_settings(), "VELOCITY_ENABLED", False)
+    status, batch = _post_json("/api/v1/score_batch", {"items": BATCH_ITEMS})
+    assert status == 200
+
+    singles = []
+    for item in BATCH_ITEMS:
+        status, single = _post_json("/api/v1/score_transaction", item)
+        assert status == 200
+        singles.append(single)
+
+    for got, want in zip(batch["results"], singles):
+        assert got["fraud_probability"] == pytest.approx(want["fraud_probability"], abs=1e-7)
+        assert (got["risk_level"], got["model_version"]) == (
+            want["risk_level"],
+            want["model_version"],
+        )
+
+
+def test_score_batch_with_contributions(isolated_app):
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+    from backend.app.services.fraud_model import get_fraud_model_service
+
+    status, batch = _post_json(
+        "/api/v1/score_batch", {"items": BATCH_ITEMS, "include_contributions": True}
+    )
+    assert status == 200
+    version = get_fraud_model_service().model_version
+    for result in batch["results"]:
+        assert result["model_version"] == version
+        assert len(result["contributions"]) == get_settings().ATTRIBUTION_TOP_K
@@ -0,0 +1,83 @@
+# backend/tests/test_attribution.py
+from __future__ import annotations
+
+import copy
+import math
+
+import numpy as np
+import pytest
+
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.attribution import FeatureAttributionService
+from backend.app.services.fraud_model import FraudModelService
+from backend.app.services.model_registry import ModelBundle
+
+
+def test_contributions_use_scoring_trees(xgb_model, tmp_path):
+    joblib = pytest.importorskip("joblib")
+    xgb = pytest.importorskip("xgboost")
+    # модель после ранней остановки: скоринг берёт только первые деревья
+    model = copy.deepcopy(xgb_model)
+    model.get_booster().set_attr(best_iteration="3")
+    path = tmp_path / "model_early_stopped.pkl"
+    joblib.dump(model, path)
+
+    service = FraudModelService(str(path), backend="booster")
+    attribution = FeatureAttributionService(service)
+    req = TransactionScoringRequest(client_id="1", amount=25_000.0)
+
+    n_features = len(service.feature_names)
+    response, base_value, contributions = attribution.score_and_explain(req, n_features)
+
+    margin = base_value + sum(c.contribution for c in contributions)
+    assert 1.0 / (1.0 + math.exp(-margin)) == pytest.approx(
+        response.fraud_probability, abs=1e-5
+    )
+    assert response.model_version == service.model_version
+
+    X = service.bundle.plan.build_matrix([req])
+    full = service.bundle.model.get_booster().predict(
+        xgb.DMatrix(X, missing=np.nan), output_margin=True, validate_features=False
+    )
+    # без iteration_range вклады сложились бы в margin всех деревьев
+    assert not math.isclose(margin, float(full[0]), abs_tol=1e-5)
+
+
+
+def test_batch_contributions_come_from_the_scoring_bundle(xgb_model, tmp_path, monkeypatch):
+    joblib = pytest.importorskip("joblib")
+    from backend.app.core.config import get_settings
+
+    # другая версия с другими деревьями: на неё модель переключается посреди батча
+    other = copy.deepcopy(xgb_model)
+    other.get_booster().set_attr(best_iteration="2")
+    path = tmp_path / "model_other.pkl"
+    joblib.dump(other, path)
+    other_bundle = ModelBundle.load(str(path), "booster", {"version": "other"})
+
+    service = FraudModelService(get_settings().MODEL_PATH, backend="booster")
+    scoring_bundle = service.bundle
+    score_many = service.score_many
+
+    def score_then_swap(reqs, bundle=None):
+        responses = score_many(reqs, bundle)
+        service.swap(other_bundle)
+        return responses
+
+    monkeypatch.setattr(service, "score_many", score_then_swap)
+    reqs = [
+        TransactionScoringRequest(client_id=str(i), amount=5_000.0 * (i + 1)) for i in range(3)
+    ]
+    attribution = FeatureAttributionService(service)
+    n_features = len(scoring_bundle.feature_names)
+    responses = attribution.score_and_explain_many(reqs, n_features)
+
+    assert service.model_version == "other"
+    expected = attribution.explain_many(reqs, n_features, scoring_bundle)
+    for response, (base_value, contributions) in zip(responses, expected):
+        assert response.model_version == scoring_bundle.version
+        assert response.contributions == contributions
+        margin = base_value + sum(c.contribution for c in contributions)
+        assert 1.0 / (1.0 + math.exp(-margin)) == pytest.approx(
+            response.fraud_probability, abs=1e-5
+        )
@@ -0,0 +1,70 @@
+# backend/tests/test_audit_logger.py
+from __future__ import annotations
+
+import threading
+
+from backend.app.services.audit_logger import AuditWriter
+from backend.app.services.audit_store import now_ms, query_scoring_logs
+
+
+def _row(client_id: str = "a"):
+    return (now_ms(), client_id, 1.0, 0.5, "medium", "v1")
+
+
+def test_bad_row_does_not_kill_writer(tmp_path):
+    db = str(tmp_path / "audit.db")
+    writer = AuditWriter(db, batch_size=1, flush_interval_ms=1)
+    writer.enqueue(("not-a-timestamp", "a", 1.0, 0.5, "medium", "v1"))  # TypeError в _write
+    writer.flush()
+    writer.enqueue(_row("b"))
+    writer.flush()
+
+    assert writer._thread is not None and writer._thread.is_alive()
+    assert (writer.written, writer.dropped) == (1, 1)
+    assert [r["client_id"] for r in query_scoring_logs(db_path=db)] == ["b"]
+    writer.stop()
+
+
+def test_dead_writer_is_restarted_on_enqueue(tmp_path):
+    db = str(tmp_path / "audit.db")
+    writer = AuditWriter(db, flush_interval_ms=1)
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    writer._thread = dead
+
+    writer.enqueue(_row())
+    writer.flush()
+    assert writer.written == 1
+    writer.stop()
+
+
+def test_unwritable_db_drops_rows_instead_of_blocking(tmp_path):
+    # путь к БД — каталог: SQLite его не откроет
+    writer = AuditWriter(str(tmp_path), queue_size=2, batch_size=1, flush_interval_ms=1)
+    done = threading.Event()
+
+    def produce():
+        writer.enqueue_many(_row() for _ in range(20))
+        done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    assert done.wait(5), "enqueue hung behind a dead audit writer"
+    writer.flush()
+    assert writer.written == 0 and writer.dropped == 20
+    assert writer._thread is not None and writer._thread.is_alive()
+    writer.stop()
+
+
+def test_writer_recreates_partition_after_switching_db(tmp_path):
+    writer = AuditWriter(str(tmp_path / "a.db"), flush_interval_ms=1)
+    writer.enqueue(_row("a"))
+    writer.flush()
+    writer.stop()
+
+    writer.db_path = str(tmp_path / "b.db")
+    writer.enqueue(_row("b"))
+    writer.flush()
+    writer.stop()
+    assert writer.dropped == 0
+    assert [r["client_id"] for r in query_scoring_logs(db_path=writer.db_path)] == ["b"]
@@ -0,0 +1,185 @@
+# backend/tests/test_audit_store.py
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from backend.app.services.audit_logger import AuditWriter
+from backend.app.services.audit_store import (
+    DAY_MS,
+    apply_retention,
+    init_log_db,
+    list_partitions,
+    open_connection,
+    query_scoring_logs,
+)
+
+# 2026-10-18 00:00:00 UTC
+DAY = 1_792_281_600_000
+
+
+def _write(db_path: str, rows) -> AuditWriter:
+    writer = AuditWriter(db_path, batch_size=1000, flush_interval_ms=5)
+    writer.enqueue_many(rows)
+    writer.flush()
+    writer.stop()
+    return writer
+
+
+def test_rows_go_to_daily_partitions_and_query_uses_time_range(tmp_path):
+    db = str(tmp_path / "logs" / "audit.db")
+    rows = [
+        (DAY - 1, "a", 10.0, 0.95, "high", "v1"),  # предыдущие сутки
+        (DAY + 1000, "a", 20.0, 0.10, "low", "v1"),
+        (DAY + 2000, "a", 30.0, 0.90, "high", "v1"),
+        (DAY + 3000, "b", 40.0, 0.99, "high", "v1"),
+        (DAY + DAY_MS + 5, "a", 50.0, 0.97, "high", "v2"),
+    ]
+    assert _write(db, rows).written == 5
+
+    conn = open_connection(db)
+    assert [name for name, _ in list_partitions(conn)] == [
+        "scoring_logs_20261017",
+        "scoring_logs_20261018",
+        "scoring_logs_20261019",
+    ]
+    conn.close()
+
+    found = query_scoring_logs(client_id="a", risk_levels=["high"], db_path=db)
+    assert [r["amount"] for r in found] == [50.0, 30.0, 10.0]
+    assert found[0] == {
+        "ts": DAY + DAY_MS + 5,
+        "client_id": "a",
+        "amount": 50.0,
+        "fraud_probability": 0.97,
+        "risk_level": "high",
+        "model_version": "v2",
+    }
+
+    window = query_scoring_logs(
+        risk_levels=["high"], since=DAY, until=DAY + DAY_MS, db_path=db
+    )
+    assert [r["client_id"] for r in window] == ["b", "a"]
+    assert len(query_scoring_logs(client_id="a", limit=2, db_path=db)) == 2
+
+
+def test_retention_drops_old_partitions(tmp_path):
+    db = str(tmp_path / "audit.db")
+    _write(db, [(DAY - d * DAY_MS, "a", 1.0, 0.5, "medium", "v1") for d in range(10)])
+
+    conn = open_connection(db)
+    # храним сегодня и 3 предыдущих дня
+    dropped = apply_retention(conn, retention_days=3, now=DAY + 5)
+    assert dropped == [f"scoring_logs_202610{d:02d}" for d in range(9, 15)]
+    assert [day for _, day in list_partitions(conn)] == [
+        DAY - d * DAY_MS for d in (3, 2, 1, 0)
+    ]
+    assert apply_retention(conn, retention_days=0, now=DAY) == []
+    conn.close()
+
+
+def test_legacy_table_is_migrated(tmp_path):
+    db = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db)
+    conn.execute(
+        """
+        CREATE TABLE scoring_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL, client_id TEXT, amount REAL,
+            fraud_probability REAL, risk_level TEXT
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO scoring_logs (ts, client_id, amount, fraud_probability, risk_level)"
+        " VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2026-10-17T23:59:59.500000", "a", 1.0, 0.9, "high"),
+            ("2026-10-18T00:00:01", "a", 2.0, 0.1, "low"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    init_log_db(db)
+    found = query_scoring_logs(client_id="a", db_path=db)
+    assert [(r["ts"], r["model_version"]) for r in found] == [
+        (DAY + 1000, None),
+        (DAY - 500, None),
+    ]
+    conn = open_connection(db)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+    conn.close()
+    assert "scoring_logs" not in tables
+
+
+def test_interrupted_migration_resumes_without_duplicates(tmp_path, monkeypatch):
+    from backend.app.services import audit_store
+
+    db = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE scoring_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL,"
+        " client_id TEXT, amount REAL, fraud_probability REAL, risk_level TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO scoring_logs (ts, client_id, amount, fraud_probability, risk_level)"
+        " VALUES (?, 'a', ?, 0.5, 'medium')",
+        [("2026-10-18T00:00:01", 1.0), ("broken", 2.0), ("2026-10-18T00:00:03", 3.0)],
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(audit_store, "MIGRATE_CHUNK", 1)
+    try:
+        init_log_db(db)
+    except ValueError:
+        pass
+    conn = open_connection(db)
+    conn.execute("UPDATE scoring_logs SET ts = '2026-10-18T00:00:02' WHERE ts = 'broken'")
+    conn.commit()
+    conn.close()
+
+    init_log_db(db)
+    found = query_scoring_logs(client_id="a", db_path=db)
+    assert [r["amount"] for r in found] == [3.0, 2.0, 1.0]
+
+
+def test_shadow_report_merges_daily_partitions(tmp_path):
+    from backend.app.services.audit_store import SHADOW_LOGS
+    from backend.app.services.shadow import ShadowScoringService
+
+    db = str(tmp_path / "audit.db")
+    conn = open_connection(db)
+    for ts, p, risk in [
+        (DAY - 1000, 0.9, "high"),
+        (DAY + 1000, 0.2, "low"),
+        (DAY + DAY_MS + 1000, 0.6, "low"),
+    ]:
+        table = SHADOW_LOGS.name(ts)
+        SHADOW_LOGS.create(conn, table)
+        conn.execute(
+            SHADOW_LOGS.insert_sql(table),
+            (ts, "a", 1.0, "v1", 0.5, "low", "v2", p, risk),
+        )
+    conn.commit()
+    conn.close()
+
+    shadow = ShadowScoringService(registry=None, backend_name="numpy", db_path=db)
+    [model] = shadow.report()["models"]
+    assert model["count"] == 3
+    assert model["mean_probability"] == pytest.approx(1.7 / 3)
+    assert model["max_abs_diff"] == pytest.approx(0.4)
+    assert model["risk_level_agreement"] == pytest.approx(2 / 3)
+    assert model["risk_level_matrix"] == {"low": {"high": 1, "low": 2}}
+    assert sum(model["histogram"]["challenger"]) == 3
+
+    [recent] = shadow.report(since="2026-10-18T00:00:00")["models"]
+    assert recent["count"] == 2
+
+    conn = open_connection(db)
+    # вместе с аудитом retention удаляет и суточные таблицы теневого скоринга
+    dropped = apply_retention(conn, retention_days=1, now=DAY + 2 * DAY_MS)
+    assert dropped == ["shadow_logs_20261017", "shadow_logs_20261018"]
+    conn.close()
@@ -0,0 +1,73 @@
+# backend/tests/test_batcher.py
+from __future__ import annotations
+
+import asyncio
+
+from backend.app.schemas.transactions import (
+    TransactionScoringRequest,
+    TransactionScoringResponse,
+)
+from backend.app.services import batcher as batcher_module
+from backend.app.services.batcher import ScoringBatcher
+
+
+def _requests(n: int):
+    return [TransactionScoringRequest(client_id=str(i), amount=float(i)) for i in range(n)]
+
+
+def _recording_scorer(monkeypatch):
+    batches = []
+
+    def score_many(reqs):
+        batches.append(len(reqs))
+        return [
+            TransactionScoringResponse(
+                fraud_probability=r.amount / 100, risk_level="low", model_version="t"
+            )
+            for r in reqs
+        ]
+
+    monkeypatch.setattr(batcher_module, "score_many", score_many)
+    return batches
+
+
+def test_flush_by_size(monkeypatch):
+    batches = _recording_scorer(monkeypatch)
+    batcher = ScoringBatcher(max_batch_size=3, max_wait_ms=60_000)
+
+    async def scenario():
+        calls = [batcher.score(r) for r in _requests(3)]
+        return await asyncio.wait_for(asyncio.gather(*calls), timeout=5)
+
+    results = asyncio.run(scenario())
+    assert batches == [3]
+    # каждый получает свой результат
+    assert [r.fraud_probability for r in results] == [0.0, 0.01, 0.02]
+
+
+def test_flush_by_wait_time(monkeypatch):
+    batches = _recording_scorer(monkeypatch)
+    batcher = ScoringBatcher(max_batch_size=100, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.score(r) for r in _requests(2)))
+
+    assert len(asyncio.run(scenario())) == 2
+    assert batches == [2]
+    assert batcher.stats()["queue_wait_ms"]["max"] >= 15
+
+
+def test_error_reaches_every_caller(monkeypatch):
+    def broken(reqs):
+        raise ValueError("model failed")
+
+    monkeypatch.setattr(batcher_module, "score_many", broken)
+    batcher = ScoringBatcher(max_batch_size=2, max_wait_ms=60_000)
+
+    async def scenario():
+        calls = [batcher.score(r) for r in _requests(2)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(e) for e in errors] == ["model failed", "model failed"]
+    assert all(isinstance(e, ValueError) for e in errors)
@@ -0,0 +1,95 @@
+# backend/tests/test_cli.py
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xgboost")
+
+from backend.app.cli import main  # noqa: E402
+from backend.app.schemas.transactions import TransactionScoringRequest  # noqa: E402
+from backend.app.services.csv_io import detect_header_row  # noqa: E402
+from backend.app.services.fraud_model import get_fraud_model_service  # noqa: E402
+
+# сырые выгрузки: ';', cp1251, над английскими именами — строка русских описаний
+DATA_CSV = """\
+ИД клиента;Дата;Дата и время;Сумма;Номер документа;Получатель
+cst_dim_id;transdate;transdatetime;amount;docno;direction
+1;'2025-01-05 00:00:00.000';'2025-01-05 16:32:02.000';1 500,50;101;a
+2;'2025-01-05 00:00:00.000';'2025-01-05 17:00:00.000';250000;102;b
+1;'2025-01-06 00:00:00.000';'2025-01-06 09:15:00.000';12000;103;a
+3;'2025-01-06 00:00:00.000';'2025-01-06 23:59:59.000';90000,5;104;c
+2;'2025-01-07 00:00:00.000';'2025-01-07 03:00:00.000';700;105;d
+"""
+
+DATA2_CSV = """\
+Дата;ИД клиента;Смены ОС за месяц;Логины за 7 дней;Частота логинов за 7 дней
+transdate;cst_dim_id;monthly_os_changes;logins_last_7_days;login_frequency_7d
+'2025-01-05 00:00:00.000';1;4;40;5,7
+'2025-01-07 00:00:00.000';2;0;2;0,3
+"""
+
+
+@pytest.fixture()
+def exports(tmp_path):
+    data = tmp_path / "data.csv"
+    data2 = tmp_path / "data2.csv"
+    data.write_text(DATA_CSV, encoding="cp1251")
+    data2.write_text(DATA2_CSV, encoding="cp1251")
+    return data, data2
+
+
+def _score(data, out, *args: str) -> pd.DataFrame:
+    assert main(["score", "--input", str(data), "--output", str(out), *args]) == 0
+    return pd.read_csv(out, dtype={"client_id": str, "transaction_id": str})
+
+
+def test_detects_header_after_russian_descriptions(exports, tmp_path):
+    data, data2 = exports
+    assert detect_header_row(str(data), ";", "cp1251") == 1
+    assert detect_header_row(str(data2), ";", "cp1251") == 1
+
+    plain = tmp_path / "plain.csv"
+    plain.write_text("cst_dim_id;amount\n1;10\n", encoding="cp1251")
+    assert detect_header_row(str(plain), ";", "cp1251") == 0
+
+
+def test_chunk_boundaries_do_not_change_output(exports, tmp_path):
+    data, _ = exports
+    whole = _score(data, tmp_path / "whole.csv", "--chunk-size", "100")
+    # 5 строк чанками по 2: граница чанка проходит между строками одного клиента
+    chunked = _score(data, tmp_path / "chunked.csv", "--chunk-size", "2")
+
+    assert list(whole["transaction_id"]) == ["101", "102", "103", "104", "105"]
+    pd.testing.assert_frame_equal(whole, chunked)
+
+
+def test_behavior_features_are_joined_by_client_and_day(exports, tmp_path):
+    data, data2 = exports
+    scored = _score(data, tmp_path / "out.csv", "--features", str(data2))
+
+    service = get_fraud_model_service()
+    expected = [
+        # клиент 1 за 2025-01-05 и клиент 2 за 2025-01-07 — с фичами из data2
+        TransactionScoringRequest(
+            amount=1500.5, os_ver_cnt_30d=4, login_sessions_7d=40, logins_per_day_7d=5.7
+        ),
+        TransactionScoringRequest(amount=250000),
+        # у клиента 1 за 2025-01-06 строки в data2 нет
+        TransactionScoringRequest(amount=12000),
+        TransactionScoringRequest(amount=90000.5),
+        TransactionScoringRequest(
+            amount=700, os_ver_cnt_30d=0, login_sessions_7d=2, logins_per_day_7d=0.3
+        ),
+    ]
+    assert scored["fraud_probability"].tolist() == pytest.approx(
+        [service.predict_proba(r) for r in expected], abs=1e-6
+    )
+
+
+def test_workers_do_not_change_output(exports, tmp_path):
+    data, data2 = exports
+    args = ("--features", str(data2), "--chunk-size", "2")
+    single = _score(data, tmp_path / "single.csv", "--workers", "1", *args)
+    pooled = _score(data, tmp_path / "pooled.csv", "--workers", "2", *args)
+    pd.testing.assert_frame_equal(single, pooled)
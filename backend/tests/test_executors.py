@@ -0,0 +1,78 @@
+# backend/tests/test_executors.py
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from backend.app.core import executors
+from backend.app.core.config import get_settings
+from backend.app.core.executors import run_inference
+from backend.app.services import audit_logger
+from backend.app.services.audit_logger import AuditWriter, alog_scoring_events
+
+
+def test_process_executor_scores_in_child_process(monkeypatch):
+    pytest.importorskip("xgboost")
+    from backend.app.schemas.transactions import TransactionScoringRequest
+    from backend.app.services.fraud_model import score_many
+
+    monkeypatch.setattr(get_settings(), "INFERENCE_EXECUTOR", "process")
+    monkeypatch.setattr(get_settings(), "INFERENCE_WORKERS", 1)
+    monkeypatch.setattr(executors, "_inference_executor", None)
+    reqs = [TransactionScoringRequest(client_id=str(i), amount=1000.0 * i) for i in range(3)]
+
+    async def scenario():
+        return await run_inference(os.getpid), await run_inference(score_many, reqs)
+
+    try:
+        pid, results = asyncio.run(scenario())
+        assert isinstance(executors._inference_executor, ProcessPoolExecutor)
+    finally:
+        executors.recycle_inference_executor()
+
+    # запросы и ответы пиклятся, модель грузит дочерний процесс
+    assert pid != os.getpid()
+    assert results == score_many(reqs)
+
+
+def test_full_audit_queue_does_not_block_event_loop(tmp_path, monkeypatch):
+    gate = threading.Event()
+    writer = AuditWriter(
+        str(tmp_path / "logs.db"), queue_size=1, batch_size=1, backpressure="block"
+    )
+    # писатель "завис" на записи, пока gate не открыт
+    monkeypatch.setattr(writer, "_write", lambda conn, batch: gate.wait(5))
+    monkeypatch.setattr(audit_logger, "audit_writer", writer)
+
+    row = (0, "c", 1.0, 0.1, "low", "v")
+    writer.enqueue(row)
+    deadline = time.monotonic() + 5
+    while writer.queue_depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.enqueue(row)  # поток занят первой строкой, очередь заполнена
+
+    async def scenario():
+        logging = asyncio.ensure_future(
+            alog_scoring_events([("c", 1.0, 0.1, "low", "v")] * 3)
+        )
+        t0 = time.monotonic()
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - t0
+        blocked = not logging.done()
+        gate.set()
+        await asyncio.wait_for(logging, timeout=5)
+        return elapsed, blocked
+
+    try:
+        elapsed, blocked = asyncio.run(scenario())
+    finally:
+        gate.set()
+        writer.stop()
+    # ожидание места в очереди ушло в io-пул, event loop продолжал работать
+    assert blocked and elapsed < 1.0
@@ -0,0 +1,75 @@
+# backend/tests/test_explanation_cache.py
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from backend.app.services.explanation_cache import ExplanationCache
+
+
+def _rows(db_path) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = ExplanationCache(str(tmp_path / "cache.db"), ttl_sec=60, max_rows=10)
+    assert cache.get("k") is None
+    cache.put("k", "объяснение")
+    assert cache.get("k") == "объяснение"
+    assert cache.get("k") == "объяснение"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_ratio"] == 2 / 3
+    cache.close()
+
+
+def test_entry_expires_after_ttl(tmp_path):
+    cache = ExplanationCache(str(tmp_path / "cache.db"), ttl_sec=0.05, max_rows=10)
+    cache.put("k", "объяснение")
+    assert cache.get("k") == "объяснение"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    cache.close()
+
+
+def test_survives_reopen(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ExplanationCache(db_path, ttl_sec=60, max_rows=10)
+    cache.put("k", "объяснение")
+    cache.close()
+
+    reopened = ExplanationCache(db_path, ttl_sec=60, max_rows=10)
+    assert reopened.get("k") == "объяснение"
+    reopened.close()
+
+
+def test_rows_are_pruned_every_prune_every_puts(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ExplanationCache(db_path, ttl_sec=60, max_rows=10)
+    for i in range(ExplanationCache.PRUNE_EVERY - 1):
+        cache.put(f"k{i}", "объяснение")
+    # до PRUNE_EVERY-й вставки лимит не применяется
+    assert _rows(db_path) == ExplanationCache.PRUNE_EVERY - 1
+
+    cache.put("last", "объяснение")
+    assert _rows(db_path) == 10
+    # остаются самые свежие
+    assert cache.get("last") == "объяснение"
+    assert cache.get("k0") is None
+    cache.close()
+
+
+def test_disabled_without_path_or_rows(tmp_path):
+    for cache in (
+        ExplanationCache(None, ttl_sec=60, max_rows=10),
+        ExplanationCache(str(tmp_path / "cache.db"), ttl_sec=60, max_rows=0),
+    ):
+        cache.put("k", "объяснение")
+        assert cache.get("k") is None
+        assert not cache.stats()["enabled"]
+    assert not (tmp_path / "cache.db").exists()
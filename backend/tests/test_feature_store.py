@@ -0,0 +1,83 @@
+# backend/tests/test_feature_store.py
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.services.feature_store import EWM_ALPHA, RunningStats, WindowedEWM
+
+
+def test_sliding_welford_and_ewm_match_pandas_rolling():
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(7)
+    # интервалы между сессиями: от секунд до суток, с выбросами
+    values = rng.lognormal(mean=6.0, sigma=2.0, size=500)
+    window = 25
+
+    stats, ewm = RunningStats(), WindowedEWM(EWM_ALPHA)
+    means, variances, ewms = [], [], []
+    for i, x in enumerate(values):
+        stats.add(x)
+        ewm.add(x)
+        if i >= window:
+            stats.remove(values[i - window])
+            ewm.remove_oldest(values[i - window])
+        means.append(stats.mean)
+        variances.append(stats.variance)
+        ewms.append(ewm.value)
+
+    series = pd.Series(values)
+    rolling = series.rolling(window, min_periods=1)
+    np.testing.assert_allclose(means, rolling.mean(), rtol=1e-9)
+    np.testing.assert_allclose(
+        np.array(variances[1:], dtype=float), rolling.var().iloc[1:], rtol=1e-6
+    )
+    expected_ewm = [
+        series.iloc[max(0, i - window + 1) : i + 1].ewm(alpha=EWM_ALPHA).mean().iloc[-1]
+        for i in range(len(values))
+    ]
+    np.testing.assert_allclose(ewms, expected_ewm, rtol=1e-9)
+
+
+def test_removing_everything_resets_state():
+    stats, ewm = RunningStats(), WindowedEWM(EWM_ALPHA)
+    for x in (3.0, 5.0):
+        stats.add(x)
+        ewm.add(x)
+    for x in (3.0, 5.0):
+        stats.remove(x)
+        ewm.remove_oldest(x)
+    assert (stats.n, stats.variance, ewm.value) == (0, None, None)
+
+
+def test_reads_keep_historical_windows():
+    from backend.app.services.feature_store import DAY_SEC, OnlineFeatureStore
+
+    store = OnlineFeatureStore(max_clients=10)
+    # replay прошлогодней истории: 10 сессий раз в сутки
+    start = 1_704_067_200.0  # 2024-01-01
+    for day in range(10):
+        store.ingest("42", start + day * DAY_SEC)
+
+    features = store.features("42")
+    # окна на момент последней сессии, а не часов сервера (граница 7d включительно)
+    assert features["login_sessions_7d"] == 8.0
+    assert features["login_sessions_30d"] == 10.0
+    assert features["avg_session_interval_30d"] == DAY_SEC
+    assert store.features("42") == features
+
+
+def test_store_is_opt_in(monkeypatch):
+    from backend.app.core.config import get_settings
+    from backend.app.services.feature_store import get_feature_store
+
+    monkeypatch.setattr(get_feature_store, "_instance", None)
+    monkeypatch.setattr(get_settings(), "FEATURE_STORE_ENABLED", False)
+    store = get_feature_store()
+    assert not store.enabled
+    assert not store.ingest("42", 1_704_067_200.0)
+    assert store.features("42") is None
+
+    monkeypatch.setattr(get_feature_store, "_instance", None)
+    monkeypatch.setattr(get_settings(), "FEATURE_STORE_ENABLED", True)
+    assert get_feature_store().enabled
@@ -0,0 +1,88 @@
+# backend/tests/test_fraud_model.py
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from backend.app.services.inference import (
+    BACKENDS,
+    BoosterBackend,
+    InferenceBackend,
+    NumpyTreeBackend,
+    build_backend,
+)
+
+
+@pytest.fixture(scope="module")
+def split_matrix(xgb_model) -> np.ndarray:
+    """
+    Синтетическая матрица фич вокруг реальных порогов сплитов модели,
+    чтобы обход деревьев проходил по обеим веткам каждого узла.
+    Часть значений — nan, чтобы проверить default_left.
+    """
+    dump = json.loads(xgb_model.get_booster().save_raw("json"))
+    trees = dump["learner"]["gradient_booster"]["model"]["trees"]
+    n_features = int(dump["learner"]["learner_model_param"]["num_feature"])
+
+    splits = [[] for _ in range(n_features)]
+    for tree in trees:
+        for feat, cond, left in zip(
+            tree["split_indices"], tree["split_conditions"], tree["left_children"]
+        ):
+            if left != -1:
+                splits[feat].append(cond)
+
+    rng = np.random.default_rng(42)
+    n_rows = 5000
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    for j, conds in enumerate(splits):
+        if conds:
+            X[:, j] = rng.choice(conds, n_rows) * rng.choice([0.999, 1.0, 1.001], n_rows)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("backend_name", BACKENDS)
+def test_backend_matches_sklearn(xgb_model, split_matrix, backend_name):
+    expected = xgb_model.predict_proba(split_matrix)[:, 1]
+    backend = build_backend(backend_name, xgb_model)
+
+    np.testing.assert_allclose(backend.predict(split_matrix), expected, rtol=0, atol=1e-6)
+    # одиночная строка идёт тем же путём, что и /score_transaction
+    np.testing.assert_allclose(
+        backend.predict(split_matrix[:1]), expected[:1], rtol=0, atol=1e-6
+    )
+
+
+def test_unknown_backend_rejected(xgb_model):
+    with pytest.raises(ValueError):
+        build_backend("treelite", xgb_model)
+
+
+def test_backend_without_predict_fails_at_creation():
+    class Incomplete(InferenceBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_trees_file_round_trip_matches_booster(xgb_model, split_matrix, tmp_path):
+    booster = xgb_model.get_booster()
+    path = str(tmp_path / "model.trees")
+    NumpyTreeBackend.from_booster(booster).save(path, extra={"source_version": "v1"})
+
+    loaded = NumpyTreeBackend.from_file(path)
+    # массивы открыты через mmap, а не прочитаны в память
+    assert isinstance(loaded.value, np.memmap) and isinstance(loaded.feature, np.memmap)
+    assert loaded.extra == {"source_version": "v1"}
+    assert loaded.feature_names == booster.feature_names
+
+    np.testing.assert_allclose(
+        loaded.predict(split_matrix),
+        BoosterBackend(booster).predict(split_matrix),
+        rtol=0,
+        atol=1e-6,
+    )
@@ -0,0 +1,118 @@
+# backend/tests/test_llm_explainer.py
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from backend.app.schemas.transactions import TransactionExplainRequest
+from backend.app.services.explanation_cache import ExplanationCache
+from backend.app.services.llm_explainer import LLMExplainerService
+
+
+def _service(call_llm) -> LLMExplainerService:
+    service = LLMExplainerService()
+    service.cache = ExplanationCache(db_path=None, ttl_sec=0, max_rows=0)
+    service._call_llm = call_llm  # type: ignore[method-assign]
+    return service
+
+
+def _request() -> TransactionExplainRequest:
+    return TransactionExplainRequest(
+        transaction={"client_id": "1", "amount": 100.0},
+        fraud_probability=0.9,
+        risk_level="high",
+    )
+
+
+def _half_open(service: LLMExplainerService) -> None:
+    breaker = service.breaker
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    async def hang(req, features_text):
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        service = _service(hang)
+        _half_open(service)
+        probe = asyncio.ensure_future(service._explain_with_deadline(_request(), ""))
+        await asyncio.sleep(0.01)
+        assert not service.breaker.allow()  # пробный вызов в полёте
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        return service.breaker.allow()
+
+    assert asyncio.run(scenario())
+
+
+def test_unexpected_error_falls_back_and_counts_as_failure():
+    async def broken(req, features_text):
+        raise RuntimeError("bad payload")
+
+    service = _service(broken)
+    _half_open(service)
+    text, from_llm = asyncio.run(service._explain_with_deadline(_request(), ""))
+
+    assert not from_llm and text.startswith("Автоматическое объяснение")
+    assert service.breaker.state == "open"
+    assert service.fallbacks == 1
+
+
+def test_single_flight_survives_cancelled_leader():
+    calls = []
+
+    async def slow(req, features_text):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "объяснение"
+
+    async def scenario():
+        service = _service(slow)
+        leader = asyncio.ensure_future(service._single_flight("k", _request(), ""))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(service._single_flight("k", _request(), ""))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result, service._inflight
+
+    result, inflight = asyncio.run(scenario())
+    assert result == "объяснение"
+    assert len(calls) == 1 and not inflight
+
+
+def test_contributions_are_computed_only_on_cache_miss(tmp_path, monkeypatch):
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "LLM_PROMPT_CONTRIBUTIONS", True)
+    prompts = []
+
+    async def echo(req, features_text):
+        prompts.append(features_text)
+        return "объяснение"
+
+    service = _service(echo)
+    service.client = object()  # LLM "включён", сам вызов подменён
+    service.cache = ExplanationCache(str(tmp_path / "cache.db"), ttl_sec=60, max_rows=10)
+    summaries = []
+
+    async def contributions(req):
+        summaries.append(req)
+        return "вклады"
+
+    monkeypatch.setattr(service, "_build_contributions_summary", contributions)
+
+    async def scenario():
+        return [await service.explain(_request()) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == ["объяснение", "объяснение"]
+    assert len(summaries) == 1 and len(prompts) == 1
+    assert prompts[0].endswith("\n\nвклады")
+    assert (service.cache.hits, service.cache.misses) == (1, 1)
+    service.cache.close()
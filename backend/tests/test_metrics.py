@@ -0,0 +1,63 @@
+# backend/tests/test_metrics.py
+from __future__ import annotations
+
+import threading
+
+from backend.app.core.metrics import Callback, Counter, Histogram, MetricsRegistry
+
+
+def _samples(text: str) -> dict:
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            out[name] = float(value)
+    return out
+
+
+def test_sharded_histogram_is_exact_across_threads():
+    hist = Histogram("t_seconds", "test", labelnames=("stage",), buckets=(0.01, 0.1))
+    child = hist.labels("inference")
+
+    def work():
+        for i in range(10_000):
+            child.observe(0.005 if i % 2 else 0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    cumulative, total = child.snapshot()
+    assert cumulative == [40_000, 80_000, 80_000]
+    assert abs(total - 40_000 * 0.055) < 1e-6
+
+
+def test_render_text_exposition():
+    registry = MetricsRegistry()
+    hist = registry.register(Histogram("t_seconds", "Stage latency", ("stage",), (0.1, 1.0)))
+    counter = registry.register(Counter("t_total", "Scored", ("risk_level", "model_version")))
+    registry.register(Callback("t_depth", "Queue depth", lambda: 3))
+    registry.register(Callback("t_broken", "Fails", lambda: 1 / 0))
+
+    hist.labels("enrich").observe(0.5)
+    counter.labels("high", 'v"1').inc(2)
+    text = registry.render()
+    samples = _samples(text)
+
+    assert "# TYPE t_seconds histogram" in text
+    assert samples['t_seconds_bucket{stage="enrich",le="0.1"}'] == 0
+    assert samples['t_seconds_bucket{stage="enrich",le="1"}'] == 1
+    assert samples['t_seconds_bucket{stage="enrich",le="+Inf"}'] == 1
+    assert samples['t_seconds_count{stage="enrich"}'] == 1
+    assert samples['t_total{risk_level="high",model_version="v\\"1"}'] == 2
+    assert samples["t_depth"] == 3
+    # сломанный колбэк не ломает остальной вывод
+    assert "# t_broken unavailable" in text
+
+
+def test_metrics_route_registered():
+    from backend.app.main import create_app
+
+    assert "/metrics" in {getattr(route, "path", None) for route in create_app().routes}
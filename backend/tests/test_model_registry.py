@@ -0,0 +1,71 @@
+# backend/tests/test_model_registry.py
+from __future__ import annotations
+
+import json
+import shutil
+
+import pytest
+
+from backend.app.core.config import get_settings
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.fraud_model import FraudModelService
+from backend.app.services.model_registry import ModelRegistry
+
+GOLDEN = [
+    TransactionScoringRequest(client_id="1", amount=100.0),
+    TransactionScoringRequest(client_id="2", amount=250_000.0, login_sessions_7d=40),
+]
+
+
+def _registry(tmp_path, *versions: str) -> ModelRegistry:
+    pytest.importorskip("xgboost")
+    registry = ModelRegistry(str(tmp_path))
+    for version in versions:
+        path = tmp_path / f"{version}.pkl"
+        shutil.copyfile(get_settings().MODEL_PATH, path)
+        registry.register(str(path), version=version, golden_requests=GOLDEN)
+    return registry
+
+
+def _pointer(tmp_path):
+    return json.loads((tmp_path / "ACTIVE.json").read_text(encoding="utf-8"))
+
+
+def test_activate_and_rollback_switch_active_pointer(tmp_path):
+    registry = _registry(tmp_path, "v1", "v2")
+    service = FraudModelService(str(tmp_path / "v1.pkl"), "booster", registry=registry)
+    assert service.model_version == "v1"
+
+    assert service.activate("v2") == {"active": "v2", "previous": "v1"}
+    assert service.model_version == "v2"
+    assert (_pointer(tmp_path)["active"], _pointer(tmp_path)["history"]) == ("v2", ["v1"])
+    # новый процесс поднимается на активной версии
+    assert registry.startup_path("unused.pkl") == str(tmp_path / "v2.pkl")
+
+    assert service.rollback() == {"active": "v1", "previous": "v2"}
+    assert service.model_version == "v1"
+    assert (_pointer(tmp_path)["active"], _pointer(tmp_path)["history"]) == ("v1", [])
+    with pytest.raises(LookupError):
+        service.rollback()
+
+
+def test_golden_sample_mismatch_blocks_activation(tmp_path):
+    registry = _registry(tmp_path, "v1", "v2")
+    golden = registry.get("v2")["golden_sample"]
+    golden[0]["fraud_probability"] += 0.01
+    registry.update_metadata("v2", golden_sample=golden)
+
+    service = FraudModelService(str(tmp_path / "v1.pkl"), "booster", registry=registry)
+    with pytest.raises(ValueError, match="golden sample mismatch"):
+        service.activate("v2")
+    assert service.model_version == "v1"
+    assert not (tmp_path / "ACTIVE.json").exists()
+
+
+def test_model_file_without_manifest_is_not_a_version(tmp_path):
+    registry = _registry(tmp_path, "v1")
+    shutil.copyfile(tmp_path / "v1.pkl", tmp_path / "v1 copy.pkl")
+
+    assert [meta["version"] for meta in registry.list_versions()] == ["v1"]
+    with pytest.raises(KeyError):
+        registry.get("v1 copy")
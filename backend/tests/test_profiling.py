@@ -0,0 +1,75 @@
+# backend/tests/test_profiling.py
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.app.core.config import get_settings
+from backend.app.core.profiling import AllocationProfiler, ProfilerBusy, SamplingProfiler
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampling_profiler_sees_busy_thread_and_skips_idle():
+    stop = threading.Event()
+    busy = threading.Thread(target=_spin, args=(stop,))
+    idle = threading.Thread(target=stop.wait)
+    busy.start()
+    idle.start()
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    with pytest.raises(ProfilerBusy):
+        SamplingProfiler().start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+    busy.join()
+    idle.join()
+
+    text = profiler.collapsed()
+    assert profiler.samples > 10
+    assert f"{__name__}:_spin" in text
+    # ждущий поток не попадает в профиль
+    assert "Event.wait" not in text
+    spin = [line for line in text.splitlines() if f"{__name__}:_spin" in line]
+    # стек от корня потока к листу, в конце — число сэмплов
+    assert all(line.startswith("threading:Thread._bootstrap;") for line in spin)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in spin) > 10
+    assert profiler.summary()["top_total"]
+
+
+def test_allocation_profiler_reports_growing_lines():
+    profiler = AllocationProfiler()
+    profiler.start()
+    kept = [bytes(1024) for _ in range(2000)]
+    profiler.stop()
+
+    top = profiler.summary(top=5)["top"]
+    assert kept and top
+    assert top[0]["where"][0].startswith(__file__)
+    assert top[0]["size_diff_kb"] > 1500
+
+
+def test_profile_endpoint_is_off_by_default(monkeypatch):
+    testclient = pytest.importorskip("fastapi.testclient")
+    from backend.app.main import create_app
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = testclient.TestClient(create_app())
+    url = f"{settings.API_V1_PREFIX}/admin/profile?seconds=0.05"
+
+    assert client.post(url).status_code == 401
+    resp = client.post(url, headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 403
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    resp = client.post(url, headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 200
+    assert int(resp.headers["X-Profile-Samples"]) > 0
@@ -0,0 +1,69 @@
+# backend/tests/test_score_cache.py
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pytest
+
+from backend.app.services.score_cache import ScoreCache
+
+ROW = np.array([1.5, np.nan, 0.0, 3.0], dtype=np.float32)
+
+
+def test_entry_expires_after_ttl():
+    cache = ScoreCache(max_size=10, ttl_sec=0.01)
+    key = ScoreCache.make_key("v1", ROW)
+    cache.put(key, 0.7)
+    assert cache.get(key) == 0.7
+
+    time.sleep(0.02)
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = ScoreCache(max_size=2, ttl_sec=60)
+    a, b, c = (ScoreCache.make_key("v1", ROW + i) for i in range(3))
+    cache.put(a, 0.1)
+    cache.put(b, 0.2)
+    cache.get(a)  # a свежее b
+    cache.put(c, 0.3)
+
+    assert cache.get(b) is None
+    assert (cache.get(a), cache.get(c)) == (0.1, 0.3)
+    assert cache.evictions == 1
+
+
+def test_key_depends_on_model_version_and_canonical_row():
+    assert ScoreCache.make_key("v1", ROW) != ScoreCache.make_key("v2", ROW)
+    # -0.0 и 0.0, float64 и float32 — один ключ
+    same = ROW.astype(np.float64)
+    same[2] = -0.0
+    assert ScoreCache.make_key("v1", same) == ScoreCache.make_key("v1", ROW)
+
+    cache = ScoreCache(max_size=10, ttl_sec=60)
+    cache.put(ScoreCache.make_key("v1", ROW), 0.9)
+    assert cache.get(ScoreCache.make_key("v2", ROW)) is None
+
+
+def test_batch_uses_cache_only_up_to_max_batch():
+    pytest.importorskip("xgboost")
+    from backend.app.core.config import get_settings
+    from backend.app.schemas.transactions import TransactionScoringRequest
+    from backend.app.services.fraud_model import FraudModelService
+
+    cache = ScoreCache(max_size=100, ttl_sec=60, max_batch=2)
+    service = FraudModelService(get_settings().MODEL_PATH, cache=cache)
+    plain = FraudModelService(get_settings().MODEL_PATH)
+    reqs = [TransactionScoringRequest(client_id=str(i), amount=1000.0 * (i + 1)) for i in range(3)]
+
+    first = service.score_many(reqs[:2])
+    again = service.score_many(reqs[:2])
+    assert (cache.hits, cache.misses, cache.stats()["size"]) == (2, 2, 2)
+    assert first == again == plain.score_many(reqs[:2])
+
+    # батч длиннее max_batch идёт мимо кэша
+    assert service.score_many(reqs) == plain.score_many(reqs)
+    assert (cache.hits, cache.misses, cache.stats()["size"]) == (2, 2, 2)
@@ -0,0 +1,95 @@
+# backend/tests/test_shadow.py
+from __future__ import annotations
+
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from backend.app.schemas.transactions import (
+    TransactionScoringRequest,
+    TransactionScoringResponse,
+)
+from backend.app.services.shadow import ShadowScoringService
+
+
+def _challenger(proba: float, gate: Optional[threading.Event] = None):
+    """
+    Бандл-challenger без модели: константный скор, predict ждёт gate.
+    """
+    def predict(X):
+        if gate is not None:
+            gate.wait(5)
+        return np.full(len(X), proba)
+
+    return SimpleNamespace(
+        plan=SimpleNamespace(build_matrix=lambda reqs: np.zeros((len(reqs), 1))),
+        backend=SimpleNamespace(predict=predict),
+        thresholds=np.array([0.3, 0.7]),
+    )
+
+
+def _shadow(tmp_path, challenger, **kwargs) -> ShadowScoringService:
+    shadow = ShadowScoringService(
+        registry=None,
+        backend_name="numpy",
+        db_path=str(tmp_path / "logs.db"),
+        **kwargs,
+    )
+    shadow.challengers = {"challenger": challenger}
+    return shadow
+
+
+def _scored(n: int):
+    reqs = [TransactionScoringRequest(client_id=str(i), amount=100.0) for i in range(n)]
+    responses = [
+        TransactionScoringResponse(fraud_probability=0.9, risk_level="high", model_version="champion")
+        for _ in range(n)
+    ]
+    return reqs, responses
+
+
+def test_fraction_of_traffic_is_shadowed(tmp_path):
+    shadow = _shadow(tmp_path, _challenger(0.2), fraction=0.3)
+    random.seed(7)
+    shadow.submit(*_scored(1_000))
+    shadow.stop()
+
+    random.seed(7)
+    expected = sum(random.random() < 0.3 for _ in range(1_000))
+    assert 200 < expected < 400
+    assert shadow.submitted == shadow.scored == expected
+
+
+def test_submits_beyond_max_pending_are_skipped(tmp_path):
+    gate = threading.Event()
+    shadow = _shadow(tmp_path, _challenger(0.2, gate), fraction=1.0, max_pending=1)
+    for _ in range(3):
+        shadow.submit(*_scored(2))
+    assert (shadow.submitted, shadow.skipped) == (2, 4)
+
+    gate.set()
+    shadow.stop()
+    assert shadow.scored == 2 and shadow.stats()["pending"] == 0
+
+
+def test_champion_is_not_delayed_and_is_recorded_next_to_challenger(tmp_path):
+    gate = threading.Event()
+    shadow = _shadow(tmp_path, _challenger(0.5, gate), fraction=1.0)
+    t0 = time.perf_counter()
+    shadow.submit(*_scored(3))
+    # challenger ещё считает, а ответ champion уже можно отдавать
+    assert time.perf_counter() - t0 < 0.5
+    assert shadow.scored == 0
+
+    gate.set()
+    shadow.stop()
+    [model] = shadow.report()["models"]
+    assert (model["model_version"], model["champion_version"]) == ("challenger", "champion")
+    assert model["count"] == 3
+    assert model["champion_mean_probability"] == 0.9
+    assert model["mean_probability"] == 0.5
+    assert model["risk_level_matrix"] == {"high": {"medium": 3}}
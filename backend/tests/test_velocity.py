@@ -0,0 +1,102 @@
+# backend/tests/test_velocity.py
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.velocity import VELOCITY_FEATURES, VelocityEngine, build_velocity_engine
+
+NOW = time.time() - 7 * 24 * 3600
+
+
+def test_late_event_older_than_window_is_ignored():
+    engine = VelocityEngine()
+    engine.observe("c", "d1", 100.0, NOW)
+    engine.observe("c", "d1", 5000.0, NOW - 20 * 24 * 3600)
+    # опоздавшее в пределах суток попадает в своё окно, но не в часовое
+    engine.observe("c", "d1", 7.0, NOW - 2 * 3600)
+
+    features = engine.observe("c", "d1", 1.0, NOW + 60)
+    assert features["client_amount_sum_1h"] == 100.0
+    assert features["client_amount_sum_24h"] == 107.0
+    assert features["client_txn_cnt_24h"] == 2.0
+
+
+def test_future_timestamp_does_not_wipe_state():
+    engine = VelocityEngine(new_destination_days=1)
+    engine.observe("c", "d1", 100.0, time.time())
+    engine.observe("other", "d2", 1.0, time.time() + 10 * 24 * 3600)
+
+    features = engine.peek("c", "d1", time.time() + 1)
+    assert features["client_txn_cnt_1h"] == 1.0
+    assert features["client_new_destination"] == 0.0
+
+
+def test_retried_transaction_is_counted_once():
+    engine = VelocityEngine()
+    first = engine.observe("c", "d1", 100.0, NOW, "t1")
+    assert engine.observe("c", "d1", 100.0, NOW, "t1") == first
+    assert engine.observe("c", "d1", 5.0, NOW + 1, "t2")["client_txn_cnt_1h"] == 1.0
+
+
+def test_online_matches_backfill_with_retries():
+    pd = pytest.importorskip("pandas")
+    from backend.app.services.velocity import velocity_backfill
+
+    rng = np.random.default_rng(3)
+    n = 400
+    ts = np.sort(NOW + rng.uniform(0, 3 * 24 * 3600, n))
+    frame = pd.DataFrame(
+        {
+            "transaction_id": [f"t{i}" for i in range(n)],
+            "client_id": [f"c{c}" for c in rng.integers(0, 15, n)],
+            "destination_id": [f"d{d}" for d in rng.integers(0, 25, n)],
+            "amount": rng.lognormal(3, 1, n).round(2),
+            "transdatetime": [
+                datetime.fromtimestamp(t, tz=timezone.utc).replace(tzinfo=None).isoformat()
+                for t in ts
+            ],
+        }
+    )
+    offline = velocity_backfill(frame)
+
+    engine = build_velocity_engine()
+    online = []
+    for row in frame.itertuples(index=False):
+        req = TransactionScoringRequest(
+            transaction_id=row.transaction_id,
+            client_id=row.client_id,
+            destination_id=row.destination_id,
+            amount=row.amount,
+            transdatetime=row.transdatetime,
+        )
+        [enriched] = engine.enrich([req])
+        # ретрай клиента и повтор через batch не меняют счётчики
+        engine.enrich([req, req])
+        online.append([getattr(enriched, f) for f in VELOCITY_FEATURES])
+
+    expected = offline[list(VELOCITY_FEATURES)].to_numpy(dtype=float)
+    np.testing.assert_allclose(np.array(online, dtype=float), expected)
+
+
+def test_online_engine_is_opt_in(monkeypatch):
+    from backend.app.core.config import get_settings
+    from backend.app.services.velocity import get_velocity_engine
+
+    req = TransactionScoringRequest(client_id="c", destination_id="d", amount=10.0)
+    monkeypatch.setattr(get_velocity_engine, "_instance", None)
+    monkeypatch.setattr(get_settings(), "VELOCITY_ENABLED", False)
+    engine = get_velocity_engine()
+    assert engine.enrich([req]) == [req]
+    assert engine.stats()["clients"] == 0
+    # офлайн-движок (backfill) флаг не выключает
+    assert build_velocity_engine().enabled
+
+    monkeypatch.setattr(get_velocity_engine, "_instance", None)
+    monkeypatch.setattr(get_settings(), "VELOCITY_ENABLED", True)
+    [enriched] = get_velocity_engine().enrich([req])
+    assert enriched.client_txn_cnt_1h == 0.0
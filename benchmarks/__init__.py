@@ -0,0 +1,8 @@
+# benchmarks/__init__.py
+"""
+Бенчмарки скоринга: задержки (p50/p95/p99) и пропускная способность
+сервиса модели, API и аудита на синтетических запросах.
+
+    python -m benchmarks run --output bench.json
+    python -m benchmarks compare baseline.json bench.json --tolerance 0.2
+"""
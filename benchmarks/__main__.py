@@ -0,0 +1,127 @@
+# benchmarks/__main__.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+SUITES = ("model", "api", "audit")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    # аудит и кэш объяснений бенчмарка не должны писать в рабочие logs/
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ.setdefault("LOG_DB_PATH", os.path.join(tmp, "scoring_logs.db"))
+    os.environ.setdefault("EXPLAIN_CACHE_PATH", os.path.join(tmp, "explanations_cache.db"))
+
+    # импорт после настройки окружения: settings читаются один раз
+    from benchmarks import bench_api, bench_audit, bench_model
+
+    modules = {"model": bench_model, "api": bench_api, "audit": bench_audit}
+    suites = args.suite or list(SUITES)
+    scale = args.scale
+    iterations = {"model": 2_000, "api": 1_000, "audit": 20_000}
+
+    results: Dict[str, Any] = {}
+    for suite in suites:
+        t0 = time.perf_counter()
+        results.update(modules[suite].run(iterations=max(50, int(iterations[suite] * scale))))
+        print(f"{suite}: done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    from backend.app.services.fraud_model import get_fraud_model_service
+
+    service = get_fraud_model_service.peek()
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "model_version": service.model_version if service is not None else None,
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    for name, r in results.items():
+        if "p50_ms" in r:
+            print(
+                f"{name:<28} p50={r['p50_ms']:.3f}ms p95={r['p95_ms']:.3f}ms "
+                f"p99={r['p99_ms']:.3f}ms {r['throughput_per_sec']:.0f}/s",
+                file=sys.stderr,
+            )
+        else:
+            print(f"{name:<28} {r['throughput_per_sec']:.0f}/s", file=sys.stderr)
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    from benchmarks.compare import compare, format_table
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.tolerance)
+    print(format_table(rows))
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(
+            f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="прогнать бенчмарки и записать JSON")
+    run.add_argument("--output", default=None, help="файл результата (по умолчанию stdout)")
+    run.add_argument("--suite", action="append", choices=SUITES, help="только этот набор")
+    run.add_argument(
+        "--scale", type=float, default=1.0, help="множитель числа замеров (0.1 — быстрый прогон)"
+    )
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="сравнить два JSON, код 1 при регрессии")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument(
+        "--tolerance", type=float, default=0.2, help="допустимое ухудшение (0.2 = 20%%)"
+    )
+    cmp.set_defaults(func=cmd_compare)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
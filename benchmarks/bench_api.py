@@ -0,0 +1,54 @@
+# benchmarks/bench_api.py
+"""
+Сквозной путь через ASGI: валидация, обогащение фичами, скоринг, аудит.
+Тестовый клиент FastAPI работает в том же процессе, без сети.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Sequence
+
+from fastapi.testclient import TestClient
+
+from backend.app.core.config import get_settings
+from backend.app.main import create_app
+from benchmarks.common import chunked, measure, synthetic_requests
+
+settings = get_settings()
+
+WARMUP = 20
+
+
+def _poster(client: TestClient, path: str):
+    url = settings.API_V1_PREFIX + path
+    headers = {"X-API-Key": settings.API_TOKEN} if settings.API_TOKEN else {}
+
+    def post(payload: Any) -> None:
+        response = client.post(url, json=payload, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path}: HTTP {response.status_code} {response.text[:200]}")
+
+    return post
+
+
+def run(iterations: int = 1_000, batch_sizes: Sequence[int] = (64,)) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    with TestClient(create_app()) as client:
+        single = [
+            r.model_dump(mode="json", exclude_none=True)
+            for r in synthetic_requests(iterations + WARMUP, seed=2)
+        ]
+        results["api.score_transaction"] = measure(
+            _poster(client, "/score_transaction"), single, warmup=WARMUP
+        )
+
+        for size in batch_sizes:
+            calls = max(20, iterations // 20) + WARMUP
+            items = [
+                r.model_dump(mode="json", exclude_none=True)
+                for r in synthetic_requests(size * calls, seed=100 + size)
+            ]
+            batches = [{"items": list(chunk)} for chunk in chunked(items, size)]
+            results[f"api.score_batch[{size}]"] = measure(
+                _poster(client, "/score_batch"), batches, items_per_call=size, warmup=WARMUP
+            )
+    return results
@@ -0,0 +1,140 @@
+# benchmarks/bench_audit.py
+"""
+Цена аудита на запрос: постановка строки в очередь фонового писателя,
+скорость, с которой писатель сбрасывает очередь в SQLite, для сравнения —
+синхронная вставка с commit на каждую строку (как было до write-behind),
+и запросы к суточным таблицам аудита за год истории.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+from backend.app.services.audit_logger import AuditWriter
+from backend.app.services.audit_store import (
+    DAY_MS,
+    create_partition,
+    ensure_schema,
+    insert_sql,
+    now_ms,
+    open_connection,
+    partition_name,
+    query_scoring_logs,
+)
+from benchmarks.common import measure
+
+WARMUP = 100
+
+# история для запросов: дней, клиентов, доля high
+HISTORY_DAYS = 365
+HISTORY_CLIENTS = 10_000
+HIGH_RATE = 0.02
+
+
+def _rows(n: int):
+    ts = now_ms()
+    return [(ts, str(i % 1000), float(i), 0.01, "low", "bench") for i in range(n)]
+
+
+def _fill_history(db_path: str, rows_per_day: int, seed: int = 0) -> int:
+    """
+    Год суточных таблиц с равномерно размазанными по суткам решениями.
+    """
+    rng = np.random.default_rng(seed)
+    conn = open_connection(db_path)
+    ensure_schema(conn)
+    today = now_ms() // DAY_MS * DAY_MS
+    for d in range(HISTORY_DAYS):
+        day = today - d * DAY_MS
+        table = partition_name(day)
+        create_partition(conn, table)
+        ts = np.sort(rng.integers(day, day + DAY_MS, rows_per_day)).tolist()
+        clients = rng.integers(0, HISTORY_CLIENTS, rows_per_day).tolist()
+        high = (rng.random(rows_per_day) < HIGH_RATE).tolist()
+        conn.executemany(
+            insert_sql(table),
+            (
+                (t, str(c), 100.0, 0.9 if h else 0.01, "high" if h else "low", "bench")
+                for t, c, h in zip(ts, clients, high)
+            ),
+        )
+        conn.commit()
+    conn.close()
+    return HISTORY_DAYS * rows_per_day
+
+
+def run(iterations: int = 20_000) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # очередь с запасом: меряем постановку, а не ожидание места
+        writer = AuditWriter(
+            os.path.join(tmp, "queue.db"), queue_size=iterations + WARMUP + 1
+        )
+        writer.start()
+        rows = _rows(iterations + WARMUP)
+        results["audit.enqueue"] = measure(writer.enqueue, rows, warmup=WARMUP)
+
+        t0 = time.perf_counter()
+        writer.flush()
+        drain_sec = time.perf_counter() - t0
+        writer.stop()
+        results["audit.enqueue"]["drain_after_enqueue_ms"] = round(drain_sec * 1000, 2)
+
+        # пропускная способность писателя: n строк от постановки до записи на диск
+        writer = AuditWriter(os.path.join(tmp, "drain.db"), queue_size=iterations + 1)
+        writer.start()
+        batch = _rows(iterations)
+        t0 = time.perf_counter_ns()
+        writer.enqueue_many(batch)
+        writer.flush()
+        elapsed = time.perf_counter_ns() - t0
+        writer.stop()
+        results["audit.write_behind"] = {
+            "calls": 1,
+            "items_per_call": iterations,
+            "mean_ms": round(elapsed / 1e6, 3),
+            "throughput_per_sec": round(iterations / (elapsed / 1e9), 1),
+        }
+
+        conn = open_connection(os.path.join(tmp, "sync.db"))
+        ensure_schema(conn)
+        table = partition_name(now_ms())
+        create_partition(conn, table)
+        sql = insert_sql(table)
+
+        def insert(row) -> None:
+            conn.execute(sql, row)
+            conn.commit()
+
+        sync_calls = max(WARMUP + 100, iterations // 20)
+        results["audit.sync_insert"] = measure(insert, _rows(sync_calls), warmup=WARMUP)
+        conn.close()
+
+        # "все high-решения клиента X за 30 дней" и "последние high за сутки"
+        # поверх года истории (~1.1M строк при scale=1)
+        db_path = os.path.join(tmp, "history.db")
+        total = _fill_history(db_path, rows_per_day=max(100, iterations // 6))
+        rng = np.random.default_rng(1)
+        clients = [str(c) for c in rng.integers(0, HISTORY_CLIENTS, 300)]
+        month_ago = now_ms() - 30 * DAY_MS
+        results["audit.query_client_30d"] = measure(
+            lambda c: query_scoring_logs(
+                client_id=c, risk_levels=["high"], since=month_ago, db_path=db_path
+            ),
+            clients,
+            warmup=WARMUP,
+        )
+        day_ago = now_ms() - DAY_MS
+        results["audit.query_high_1d"] = measure(
+            lambda _: query_scoring_logs(
+                risk_levels=["high"], since=day_ago, limit=100, db_path=db_path
+            ),
+            range(300),
+            warmup=WARMUP,
+        )
+        results["audit.query_client_30d"]["history_rows"] = total
+    return results
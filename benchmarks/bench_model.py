@@ -0,0 +1,32 @@
+# benchmarks/bench_model.py
+"""
+FraudModelService без HTTP: одиночный score и батчевый score_many.
+"""
+from __future__ import annotations
+
+from typing import Dict, Sequence
+
+from backend.app.services.fraud_model import get_fraud_model_service
+from benchmarks.common import chunked, measure, synthetic_requests
+
+WARMUP = 20
+
+
+def run(iterations: int = 2_000, batch_sizes: Sequence[int] = (64, 1024)) -> Dict[str, dict]:
+    service = get_fraud_model_service()
+    categories = service.plan.categories
+    results: Dict[str, dict] = {}
+
+    reqs = synthetic_requests(iterations + WARMUP, seed=1, categories=categories)
+    results["model.score"] = measure(service.score, reqs, warmup=WARMUP)
+
+    for size in batch_sizes:
+        # батчей меньше, чем одиночных вызовов, но не меньше 20 замеров
+        calls = max(20, iterations // 20) + WARMUP
+        batches = chunked(
+            synthetic_requests(size * calls, seed=size, categories=categories), size
+        )
+        results[f"model.score_many[{size}]"] = measure(
+            service.score_many, batches, items_per_call=size, warmup=WARMUP
+        )
+    return results
@@ -0,0 +1,103 @@
+# benchmarks/common.py
+from __future__ import annotations
+
+import time
+import typing
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from backend.app.schemas.transactions import TransactionScoringRequest
+
+# доля пропусков в опциональных фичах синтетических запросов
+MISSING_RATE = 0.05
+DEVICE_VALUES = {
+    "phone_model_last": ["iPhone16,1", "SM-A515F", "Redmi Note 8 Pro", "Pixel 7"],
+    "os_version_last": ["iOS/17.5.1", "Android/13", "Android/14"],
+}
+
+
+def _is_float_field(annotation: Any) -> bool:
+    return float in (annotation, *typing.get_args(annotation))
+
+
+def synthetic_requests(
+    n: int,
+    seed: int = 0,
+    n_clients: int = 1_000,
+    categories: Optional[Mapping[str, Sequence[str]]] = None,
+) -> List[TransactionScoringRequest]:
+    """
+    n различных запросов по схеме TransactionScoringRequest: числовые поля —
+    случайные положительные значения (часть пропущена), категории — из словаря
+    модели, client_id/destination_id — из ограниченных пулов, как в проде.
+    Все запросы разные, поэтому кэш скоринга не подменяет модель.
+    """
+    rng = np.random.default_rng(seed)
+    categories = {**DEVICE_VALUES, **(categories or {})}
+    fields = TransactionScoringRequest.model_fields
+
+    columns: Dict[str, List[Any]] = {}
+    for name, info in fields.items():
+        if name == "client_id":
+            columns[name] = [str(c) for c in rng.integers(0, n_clients, n)]
+        elif name == "destination_id":
+            columns[name] = [f"dest{d}" for d in rng.integers(0, n_clients * 5, n)]
+        elif name in categories:
+            columns[name] = list(rng.choice(list(categories[name]), n))
+        elif _is_float_field(info.annotation):
+            values = rng.lognormal(mean=3.0, sigma=2.0, size=n)
+            missing = rng.random(n) < MISSING_RATE
+            columns[name] = [
+                None if m and not info.is_required() else float(v)
+                for v, m in zip(values, missing)
+            ]
+
+    return [
+        TransactionScoringRequest(
+            **{k: col[i] for k, col in columns.items() if col[i] is not None}
+        )
+        for i in range(n)
+    ]
+
+
+def summarize(durations_ns: Sequence[int], items_per_call: int = 1) -> Dict[str, float]:
+    """
+    Перцентили задержки одного вызова (мс) и пропускная способность (элементов/с).
+    """
+    d = np.asarray(durations_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(d, [50, 95, 99])
+    total_sec = d.sum() / 1000
+    return {
+        "calls": int(len(d)),
+        "items_per_call": items_per_call,
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(d.mean()), 4),
+        "throughput_per_sec": round(len(d) * items_per_call / total_sec, 1),
+    }
+
+
+def measure(
+    fn: Callable[[Any], Any],
+    payloads: Sequence[Any],
+    items_per_call: int = 1,
+    warmup: int = 20,
+) -> Dict[str, float]:
+    """
+    Вызывает fn по разу на каждый payload и меряет каждый вызов отдельно.
+    Первые warmup вызовов (прогрев кэшей, аллокаций) в статистику не входят.
+    """
+    for payload in payloads[:warmup]:
+        fn(payload)
+    durations = []
+    for payload in payloads[warmup:]:
+        t0 = time.perf_counter_ns()
+        fn(payload)
+        durations.append(time.perf_counter_ns() - t0)
+    return summarize(durations, items_per_call)
+
+
+def chunked(items: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    return [items[i : i + size] for i in range(0, len(items) - size + 1, size)]
@@ -0,0 +1,60 @@
+# benchmarks/compare.py
+"""
+Сравнение двух прогонов бенчмарков: регрессия — рост задержки или падение
+пропускной способности больше чем на tolerance (доля, 0.2 = 20%).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping
+
+# метрика -> направление: +1 — чем больше, тем хуже; -1 — чем меньше, тем хуже
+METRICS: Dict[str, int] = {
+    "p50_ms": +1,
+    "p95_ms": +1,
+    "p99_ms": +1,
+    "throughput_per_sec": -1,
+}
+
+
+def compare(
+    baseline: Mapping[str, Any],
+    current: Mapping[str, Any],
+    tolerance: float = 0.2,
+) -> List[Dict[str, Any]]:
+    """
+    Строка на каждую метрику, которая есть в обоих прогонах:
+    {bench, metric, baseline, current, change, regression}.
+    change — относительное изменение (current / baseline - 1).
+    """
+    rows: List[Dict[str, Any]] = []
+    base_results = baseline.get("results", {})
+    for bench, cur in current.get("results", {}).items():
+        base = base_results.get(bench)
+        if base is None:
+            continue
+        for metric, direction in METRICS.items():
+            if metric not in base or metric not in cur or not base[metric]:
+                continue
+            change = cur[metric] / base[metric] - 1.0
+            rows.append(
+                {
+                    "bench": bench,
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": cur[metric],
+                    "change": round(change, 4),
+                    "regression": change * direction > tolerance,
+                }
+            )
+    return rows
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'bench':<28} {'metric':<19} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['bench']:<28} {r['metric']:<19} {r['baseline']:>12} "
+            f"{r['current']:>12} {r['change']:>+8.1%}{flag}"
+        )
+    return "\n".join(lines)
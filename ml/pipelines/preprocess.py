@@ -0,0 +1,314 @@
+# ml/pipelines/preprocess.py
+"""
+Подготовка обучающей выборки: data.csv (транзакции) + data2.csv (поведенческие
+фичи по клиенто-дням) -> один датасет для обучения.
+
+    python -m ml.pipelines.preprocess --transactions temp/data.csv \\
+        --behavior temp/data2.csv [--cache-dir ml/cache] [--velocity]
+
+Выгрузки читаются чанками с явными типами колонок; даты разбираются
+векторно по фиксированному формату, числа с запятой чистятся без
+построчного Python. Каждая стадия (транзакции, поведенческие фичи,
+датасет) кэшируется в Parquet под ключом из sha256 входов, параметров
+и версии стадии: с теми же файлами повторный запуск ничего не пересчитывает,
+а при смене одной выгрузки пересчитываются только зависящие от неё стадии.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from backend.app.core.config import get_settings
+from backend.app.services.csv_io import detect_header_row
+from backend.app.services.feature_plan import RAW_COLUMN_ALIASES, to_float
+from backend.app.services.model_registry import file_checksum
+from backend.app.services.velocity import VELOCITY_FEATURES, velocity_backfill
+
+logger = logging.getLogger(__name__)
+
+# меняется при любой правке логики стадий — старый кэш перестаёт совпадать
+PIPELINE_VERSION = 1
+
+DEFAULT_CACHE_DIR = "ml/cache"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+KEY_COLUMNS = ["client_id", "trans_date"]
+
+# типы сырых колонок (имена как во второй строке выгрузок).
+# Числа читаем строками: в выгрузках встречаются "4,23E+11" и испорченные
+# Excel'ем значения ("01.фев"), их разбирает to_float
+TRANSACTION_DTYPES: Dict[str, str] = {
+    "cst_dim_id": "string",
+    "transdate": "string",
+    "transdatetime": "string",
+    "amount": "string",
+    "docno": "string",
+    "direction": "string",
+    "target": "Int8",
+}
+
+BEHAVIOR_NUMERIC = [
+    "os_ver_cnt_30d",
+    "phone_model_cnt_30d",
+    "login_sessions_7d",
+    "login_sessions_30d",
+    "logins_per_day_7d",
+    "logins_per_day_30d",
+    "login_freq_change_7d_vs_30d",
+    "logins_7d_share_of_30d",
+    "avg_session_interval_30d",
+    "std_session_interval_30d",
+    "var_session_interval_30d",
+    "ewm_session_interval_7d",
+    "burstiness_sessions",
+    "fano_factor_sessions",
+    "zscore_interval_7d_vs_30d",
+]
+BEHAVIOR_CATEGORICAL = ["phone_model_last", "os_version_last"]
+
+_RAW_NAMES = {alias: raw for raw, alias in RAW_COLUMN_ALIASES.items()}
+BEHAVIOR_DTYPES: Dict[str, str] = {
+    "transdate": "string",
+    "cst_dim_id": "string",
+    **{_RAW_NAMES[c]: "string" for c in BEHAVIOR_NUMERIC + BEHAVIOR_CATEGORICAL},
+}
+
+
+# --- разбор типов ---
+
+
+def parse_datetime(series: pd.Series) -> pd.Series:
+    """
+    "'2025-01-05 16:32:02.000'" -> datetime64; нераспознанное -> NaT.
+    """
+    return pd.to_datetime(
+        series.str.strip().str.strip("'"), format=DATETIME_FORMAT, errors="coerce"
+    )
+
+
+def read_typed(
+    path: str,
+    dtypes: Dict[str, str],
+    chunk_size: int,
+    sep: str = ";",
+    encoding: str = "cp1251",
+) -> Iterator[pd.DataFrame]:
+    """
+    Чанки выгрузки: только известные колонки, сразу в заданных типах.
+    """
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        encoding=encoding,
+        header=detect_header_row(path, sep, encoding),
+        usecols=lambda c: c in dtypes,
+        dtype=dtypes,
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        yield chunk.rename(columns=RAW_COLUMN_ALIASES)
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# --- стадии ---
+
+
+def ingest_transactions(path: str, chunk_size: int = 200_000, **csv) -> pd.DataFrame:
+    frames = []
+    for chunk in read_typed(path, TRANSACTION_DTYPES, chunk_size, **csv):
+        frame = pd.DataFrame(
+            {
+                "transaction_id": chunk["transaction_id"],
+                "client_id": chunk["client_id"],
+                "destination_id": chunk["destination_id"],
+                "transdatetime": parse_datetime(chunk["transdatetime"]),
+                "trans_date": parse_datetime(chunk["transdate"]).dt.normalize(),
+                "amount": to_float(chunk["amount"]),
+                "is_fraud": chunk["is_fraud"],
+            }
+        )
+        frames.append(
+            frame.dropna(subset=["client_id", "transdatetime", "trans_date", "is_fraud"])
+        )
+    tx = _concat(frames)
+    tx["is_fraud"] = tx["is_fraud"].astype("int8")
+    return tx
+
+
+def ingest_behavior(path: str, chunk_size: int = 200_000, **csv) -> pd.DataFrame:
+    frames = []
+    for chunk in read_typed(path, BEHAVIOR_DTYPES, chunk_size, **csv):
+        frame = pd.DataFrame(
+            {
+                "client_id": chunk["client_id"],
+                "trans_date": parse_datetime(chunk["transdate"]).dt.normalize(),
+                **{c: to_float(chunk[c]) for c in BEHAVIOR_NUMERIC},
+                **{c: chunk[c] for c in BEHAVIOR_CATEGORICAL},
+            }
+        )
+        frames.append(frame.dropna(subset=KEY_COLUMNS))
+    # один клиенто-день — одна строка фич, как при онлайн-подклейке в cli score
+    return _concat(frames).drop_duplicates(KEY_COLUMNS, keep="last")
+
+
+def build_dataset(
+    transactions: pd.DataFrame, behavior: pd.DataFrame, velocity: bool = False
+) -> pd.DataFrame:
+    df = transactions.merge(behavior, on=KEY_COLUMNS, how="left")
+    if velocity:
+        # тот же VelocityEngine, что и в API: значения совпадают с онлайном
+        features = velocity_backfill(
+            transactions[["transaction_id", "client_id", "destination_id", "amount", "transdatetime"]]
+        )
+        df = df.merge(
+            features[["transaction_id", *VELOCITY_FEATURES]], on="transaction_id", how="left"
+        )
+    return df
+
+
+def velocity_key(velocity: bool) -> object:
+    """
+    Часть ключа датасета про скорость переводов: параметры движка
+    и список признаков. Их смена пересчитывает датасет, а не берёт старый из кэша.
+    """
+    if not velocity:
+        return False
+    settings = get_settings()
+    return {
+        "new_destination_days": settings.VELOCITY_NEW_DESTINATION_DAYS,
+        "max_keys": settings.VELOCITY_MAX_KEYS,
+        "dedup_ids": settings.VELOCITY_DEDUP_IDS,
+        "features": list(VELOCITY_FEATURES),
+    }
+
+
+# --- кэш стадий ---
+
+
+class StageCache:
+    """
+    Parquet-артефакты стадий в cache_dir, имя файла — <стадия>-<ключ>.parquet.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+
+    @staticmethod
+    def key(stage: str, **parts: object) -> str:
+        payload = json.dumps(
+            {"stage": stage, "version": PIPELINE_VERSION, **parts}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key}.parquet")
+
+    def load_or_build(
+        self, stage: str, key: str, build: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        path = self.path(stage, key)
+        if os.path.exists(path):
+            logger.info("%s: cached %s", stage, path)
+            self.hits.append(stage)
+            return pd.read_parquet(path)
+
+        frame = build()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # пишем во временный файл: прерванный запуск не оставит битый кэш
+        tmp = f"{path}.tmp{os.getpid()}"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        logger.info("%s: built %d rows -> %s", stage, len(frame), path)
+        self.misses.append(stage)
+        return frame
+
+
+def prepare_dataset(
+    transactions_path: str,
+    behavior_path: str,
+    cache: Optional[StageCache] = None,
+    velocity: bool = False,
+    chunk_size: int = 200_000,
+    sep: str = ";",
+    encoding: str = "cp1251",
+) -> tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Датасет для обучения + ключи входов/стадий (пишутся в манифест модели).
+    """
+    cache = cache or StageCache()
+    csv = {"sep": sep, "encoding": encoding}
+    inputs = {
+        "transactions": file_checksum(transactions_path),
+        "behavior": file_checksum(behavior_path),
+    }
+    tx_key = cache.key("transactions", input=inputs["transactions"], **csv)
+    beh_key = cache.key("behavior", input=inputs["behavior"], **csv)
+    ds_key = cache.key(
+        "dataset", transactions=tx_key, behavior=beh_key, velocity=velocity_key(velocity)
+    )
+
+    def dataset() -> pd.DataFrame:
+        tx = cache.load_or_build(
+            "transactions",
+            tx_key,
+            lambda: ingest_transactions(transactions_path, chunk_size, **csv),
+        )
+        beh = cache.load_or_build(
+            "behavior",
+            beh_key,
+            lambda: ingest_behavior(behavior_path, chunk_size, **csv),
+        )
+        return build_dataset(tx, beh, velocity=velocity)
+
+    df = cache.load_or_build("dataset", ds_key, dataset)
+    return df, {**{f"{k}_sha256": v for k, v in inputs.items()}, "dataset_key": ds_key}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ml.pipelines.preprocess")
+    parser.add_argument("--transactions", required=True, help="CSV транзакций (data.csv)")
+    parser.add_argument("--behavior", required=True, help="CSV поведенческих фич (data2.csv)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument(
+        "--velocity", action="store_true", help="добавить признаки скорости переводов"
+    )
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--encoding", default="cp1251")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = build_parser().parse_args(argv)
+    cache = StageCache(args.cache_dir)
+    df, keys = prepare_dataset(
+        args.transactions,
+        args.behavior,
+        cache=cache,
+        velocity=args.velocity,
+        chunk_size=args.chunk_size,
+        sep=args.sep,
+        encoding=args.encoding,
+    )
+    print(
+        f"dataset: {len(df)} rows, {df['is_fraud'].sum()} fraud -> "
+        f"{cache.path('dataset', keys['dataset_key'])}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
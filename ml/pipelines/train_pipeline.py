@@ -0,0 +1,230 @@
+# ml/pipelines/train_pipeline.py
+"""
+Обучение модели антифрода: preprocess -> фичи -> XGBoost -> версия в реестре.
+
+    python -m ml.pipelines.train_pipeline --transactions temp/data.csv \\
+        --behavior temp/data2.csv [--version xgb_v2] [--velocity]
+
+Датасет берётся из кэша стадий preprocess (пересобирается только при
+изменении входов). Результат — <version>.ubj и манифест <version>.json
+в каталоге реестра: список фич, словари категорий, метрики, пороги
+(калибруются на valid, см. ml/pipelines/calibrate.py), golden sample и ключи входов. Дальше версия включается как обычно:
+POST /api/v1/admin/models/<version>/activate.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.app.core.config import get_settings
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.feature_plan import FeaturePlan, frame_to_requests
+from backend.app.services.model_registry import ModelRegistry
+from backend.app.services.velocity import VELOCITY_FEATURES
+from ml.pipelines.calibrate import DEFAULT_OPERATING_POINTS, calibrate
+from ml.pipelines.preprocess import (
+    BEHAVIOR_CATEGORICAL,
+    BEHAVIOR_NUMERIC,
+    DEFAULT_CACHE_DIR,
+    StageCache,
+    prepare_dataset,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TARGET = "is_fraud"
+GOLDEN_SIZE = 20
+
+# параметры из ноутбука baseline (ml/README.md, раздел 6)
+XGB_PARAMS: Dict[str, Any] = {
+    "n_estimators": 400,
+    "max_depth": 5,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "auc",
+    "tree_method": "hist",
+    "n_jobs": -1,
+    "random_state": 42,
+}
+
+
+def feature_columns(velocity: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    (входы модели в порядке колонок baseline, категориальные из них).
+    """
+    columns = [
+        "amount",
+        *BEHAVIOR_NUMERIC[:2],
+        *BEHAVIOR_CATEGORICAL,
+        *BEHAVIOR_NUMERIC[2:],
+    ]
+    if velocity:
+        columns += list(VELOCITY_FEATURES)
+    return columns, list(BEHAVIOR_CATEGORICAL)
+
+
+def build_features(plan: FeaturePlan, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Матрица фич тем же планом, что и при скоринге (колонки названы для XGBoost).
+    """
+    return pd.DataFrame(
+        plan.build_matrix_from_frame(df), columns=plan.feature_names, index=df.index
+    )
+
+
+def _golden_requests(df: pd.DataFrame) -> List[TransactionScoringRequest]:
+    return frame_to_requests(df.head(GOLDEN_SIZE))
+
+
+def split_dataset(
+    df: pd.DataFrame, valid_size: float = 0.2
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (train, valid) как в ноутбуке; той же частью valid калибруются пороги.
+    """
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(df, test_size=valid_size, stratify=df[TARGET], random_state=42)
+
+
+def _thresholds(y_valid: Any, proba: Any) -> Dict[str, Any]:
+    try:
+        return calibrate(y_valid, proba, DEFAULT_OPERATING_POINTS)
+    except ValueError as exc:
+        logger.warning("Calibration failed (%s), using default thresholds", exc)
+        return {
+            "thresholds": {
+                "medium": settings.RISK_THRESHOLD_MEDIUM,
+                "high": settings.RISK_THRESHOLD_HIGH,
+            },
+            "calibration": None,
+        }
+
+
+def train(
+    df: pd.DataFrame,
+    velocity: bool = False,
+    valid_size: float = 0.2,
+) -> Dict[str, Any]:
+    import xgboost as xgb
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    columns, _ = feature_columns(velocity)
+    train_df, valid_df = split_dataset(df, valid_size)
+    # словари категорий — только по обучающей части
+    plan = FeaturePlan.fit(train_df, columns)
+    X_train = build_features(plan, train_df)
+    X_valid = build_features(plan, valid_df)
+    y_train = train_df[TARGET].astype(int)
+    y_valid = valid_df[TARGET].astype(int)
+
+    neg, pos = np.bincount(y_train, minlength=2)
+    model = xgb.XGBClassifier(**XGB_PARAMS, scale_pos_weight=neg / max(pos, 1))
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+    fit_sec = time.perf_counter() - t0
+
+    proba = model.predict_proba(X_valid)[:, 1]
+    metrics = {
+        "roc_auc": round(float(roc_auc_score(y_valid, proba)), 4),
+        "pr_auc": round(float(average_precision_score(y_valid, proba)), 4),
+        "n_train": int(len(X_train)),
+        "n_valid": int(len(X_valid)),
+        "fit_sec": round(fit_sec, 2),
+    }
+    return {
+        "model": model,
+        "metrics": metrics,
+        **_thresholds(y_valid.to_numpy(), proba),
+        "plan": plan,
+        "golden": _golden_requests(valid_df),
+    }
+
+
+def run(
+    transactions_path: str,
+    behavior_path: str,
+    models_dir: str,
+    version: Optional[str] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    velocity: bool = False,
+    **csv: Any,
+) -> Dict[str, Any]:
+    cache = StageCache(cache_dir)
+    df, keys = prepare_dataset(
+        transactions_path, behavior_path, cache=cache, velocity=velocity, **csv
+    )
+    result = train(df, velocity=velocity)
+
+    version = version or time.strftime("xgb_%Y%m%d_%H%M%S")
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, f"{version}.ubj")
+    if os.path.exists(model_path):
+        raise SystemExit(f"{model_path} already exists")
+    result["model"].save_model(model_path)
+
+    return ModelRegistry(models_dir).register(
+        model_path,
+        version=version,
+        thresholds=result["thresholds"],
+        metrics=result["metrics"],
+        golden_requests=result["golden"],
+        extra={
+            "categories": result["plan"].categories,
+            "calibration": result["calibration"],
+            "training": {
+                **keys,
+                "velocity": velocity,
+                "params": XGB_PARAMS,
+                "cache": {"hits": cache.hits, "misses": cache.misses},
+            },
+        },
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ml.pipelines.train_pipeline")
+    parser.add_argument("--transactions", required=True, help="CSV транзакций (data.csv)")
+    parser.add_argument("--behavior", required=True, help="CSV поведенческих фич (data2.csv)")
+    parser.add_argument("--models-dir", default=settings.MODEL_REGISTRY_DIR)
+    parser.add_argument("--version", default=None, help="имя версии (по умолчанию xgb_<время>)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument(
+        "--velocity", action="store_true", help="обучать с признаками скорости переводов"
+    )
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--encoding", default="cp1251")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = build_parser().parse_args(argv)
+    meta = run(
+        args.transactions,
+        args.behavior,
+        args.models_dir,
+        version=args.version,
+        cache_dir=args.cache_dir,
+        velocity=args.velocity,
+        sep=args.sep,
+        encoding=args.encoding,
+    )
+    print(
+        f"registered {meta['version']} ({meta['checksum'][:12]}): {meta['metrics']}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
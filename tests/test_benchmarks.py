@@ -0,0 +1,51 @@
+# tests/test_benchmarks.py
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.common import measure, summarize, synthetic_requests
+from benchmarks.compare import compare
+
+
+def _report(**results):
+    return {"meta": {}, "results": results}
+
+
+def test_synthetic_requests_follow_schema():
+    reqs = synthetic_requests(200, seed=7)
+    assert len({r.model_dump_json() for r in reqs}) == 200
+    assert all(r.amount >= 0 and r.client_id for r in reqs)
+    assert {r.phone_model_last for r in reqs} - {None}
+    assert any(r.login_sessions_7d is None for r in reqs)
+
+
+def test_summarize_percentiles_and_throughput():
+    # 100 вызовов по 1..100 мс, по 10 элементов
+    stats = summarize([i * 1_000_000 for i in range(1, 101)], items_per_call=10)
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p99_ms"] == pytest.approx(99.01)
+    assert stats["throughput_per_sec"] == pytest.approx(1000 / 5.05, rel=1e-3)
+
+    calls = []
+    stats = measure(calls.append, list(range(30)), warmup=10)
+    assert stats["calls"] == 20 and len(calls) == 30
+
+
+def test_compare_flags_regressions_by_direction():
+    base = _report(
+        a={"p50_ms": 1.0, "p95_ms": 2.0, "throughput_per_sec": 1000.0},
+        gone={"p50_ms": 1.0},
+    )
+    current = _report(
+        a={"p50_ms": 1.1, "p95_ms": 3.0, "throughput_per_sec": 700.0},
+        new={"p50_ms": 9.0},
+    )
+    rows = {r["metric"]: r for r in compare(base, current, tolerance=0.2)}
+
+    assert set(rows) == {"p50_ms", "p95_ms", "throughput_per_sec"}
+    assert not rows["p50_ms"]["regression"]
+    assert rows["p95_ms"]["regression"]
+    assert rows["throughput_per_sec"]["regression"]
+    # ускорение — не регрессия
+    faster = _report(a={"p50_ms": 0.1, "p95_ms": 0.2, "throughput_per_sec": 9000.0})
+    assert not any(r["regression"] for r in compare(base, faster, tolerance=0.2))
@@ -0,0 +1,80 @@
+# tests/test_calibrate.py
+from __future__ import annotations
+
+import shutil
+
+import numpy as np
+import pytest
+
+from ml.pipelines.calibrate import ThresholdSweep, calibrate
+
+
+@pytest.fixture()
+def scored():
+    rng = np.random.default_rng(3)
+    y = rng.random(5_000) < 0.05
+    # округление даёт много одинаковых скоров
+    scores = np.round(np.clip(rng.normal(0.2 + 0.5 * y, 0.15), 0, 1), 2)
+    return y, scores
+
+
+def test_sweep_matches_confusion_matrix(scored):
+    # эталон — цикл из ноутбука (ml/README.md, раздел 7.1)
+    metrics = pytest.importorskip("sklearn.metrics")
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+
+    assert np.all(np.diff(sweep.thresholds) < 0)
+    for thr in [*np.linspace(0.0, 1.0, 21), *sweep.thresholds[::17]]:
+        pred = scores >= thr
+        tn, fp, fn, tp = metrics.confusion_matrix(y, pred, labels=[False, True]).ravel()
+        row = sweep.at(thr)
+        assert (row["tp"], row["fp"], row["fn"], row["tn"]) == (tp, fp, fn, tn)
+        assert row["precision"] == pytest.approx(
+            metrics.precision_score(y, pred, zero_division=0)
+        )
+        assert row["recall"] == pytest.approx(metrics.recall_score(y, pred))
+
+
+def test_operating_points_respect_constraints(scored):
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+
+    point = sweep.operating_point(max_fpr=0.01)
+    assert point["fpr"] <= 0.01
+    # чуть ниже порога бюджет FPR уже превышен
+    below = sweep.thresholds[sweep.thresholds < point["threshold"]][0]
+    assert sweep.at(below)["fpr"] > 0.01
+
+    point = sweep.operating_point(min_recall=0.9)
+    assert point["recall"] >= 0.9
+    above = sweep.thresholds[sweep.thresholds > point["threshold"]][-1]
+    assert sweep.at(above)["recall"] < 0.9
+
+    assert sweep.operating_point(max_fpr=0.0, min_recall=1.0) is None
+
+
+def test_calibrate_orders_levels(scored):
+    y, scores = scored
+    result = calibrate(y, scores)
+    assert result["thresholds"]["medium"] < result["thresholds"]["high"]
+    assert result["calibration"]["positives"] == int(y.sum())
+
+    with pytest.raises(ValueError):
+        calibrate(y, scores, {"medium": {"max_fpr": 0.01}, "high": {"max_fpr": 0.05}})
+
+
+def test_thresholds_written_to_version_metadata(tmp_path):
+    pytest.importorskip("xgboost")
+    from backend.app.services.model_registry import ModelBundle, ModelRegistry
+
+    for name in ("model_xgb_baseline.pkl", "model_xgb_baseline.json"):
+        shutil.copy(f"ml/models/{name}", tmp_path / name)
+    registry = ModelRegistry(str(tmp_path))
+    registry.update_metadata("xgb_baseline_v1", thresholds={"medium": 0.1, "high": 0.5})
+
+    entry = registry.get("xgb_baseline_v1")
+    bundle = ModelBundle.load(entry["path"], "booster", entry)
+    bundle.validate()
+    assert (bundle.threshold_medium, bundle.threshold_high) == (0.1, 0.5)
+    assert entry["golden_sample"]
@@ -0,0 +1,153 @@
+# tests/test_preprocess.py
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.schemas.transactions import TransactionScoringRequest
+from backend.app.services.feature_plan import (
+    UNSEEN_CODE,
+    FeaturePlan,
+    frame_to_requests,
+    to_float,
+)
+
+COLUMNS = [
+    "amount",
+    "os_ver_cnt_30d",
+    "phone_model_cnt_30d",
+    "phone_model_last",
+    "os_version_last",
+    "login_sessions_7d",
+    "var_session_interval_30d",
+]
+
+
+@pytest.fixture()
+def frame():
+    rng = np.random.default_rng(1)
+    n = 200
+    df = pd.DataFrame(
+        {
+            "amount": rng.integers(1, 100_000, n).astype("float64"),
+            "os_ver_cnt_30d": rng.integers(0, 4, n).astype("float64"),
+            "phone_model_cnt_30d": rng.integers(0, 3, n).astype("float64"),
+            "phone_model_last": rng.choice(["Pixel 7", "iPhone16,1", "SM-A515F"], n),
+            "os_version_last": rng.choice(["Android/14", "iOS/17.5.1"], n),
+            "login_sessions_7d": rng.integers(0, 30, n).astype("float64"),
+            "var_session_interval_30d": rng.normal(1e10, 1e9, n),
+        }
+    )
+    # пропуски в числах и категориях
+    df.loc[::7, "os_ver_cnt_30d"] = np.nan
+    df.loc[::5, "phone_model_last"] = None
+    df.loc[::11, "os_version_last"] = None
+    return df
+
+
+def test_frame_row_and_batch_paths_match(frame):
+    plan = FeaturePlan.fit(frame, COLUMNS)
+    reqs = frame_to_requests(frame)
+
+    X_frame = plan.build_matrix_from_frame(frame)
+    X_batch = plan.build_matrix(reqs)
+    X_rows = np.empty_like(X_batch)
+    for i, req in enumerate(reqs):
+        plan.fill_row(req, X_rows[i])
+
+    assert X_frame.shape == (len(frame), plan.n_features)
+    np.testing.assert_array_equal(X_frame, X_batch)
+    np.testing.assert_array_equal(X_batch, X_rows)
+
+
+def test_fit_matches_notebook_encoding(frame):
+    # ноутбук baseline: fillna("unknown") + LabelEncoder, числа -> 0.0 + флаг пропуска
+    preprocessing = pytest.importorskip("sklearn.preprocessing")
+    plan = FeaturePlan.fit(frame, COLUMNS)
+    X = pd.DataFrame(plan.build_matrix_from_frame(frame), columns=plan.feature_names)
+
+    for col in ("phone_model_last", "os_version_last"):
+        expected = preprocessing.LabelEncoder().fit_transform(
+            frame[col].fillna("unknown").astype(str)
+        )
+        np.testing.assert_array_equal(X[col], expected.astype("float32"))
+
+    numeric = frame["os_ver_cnt_30d"]
+    np.testing.assert_array_equal(X["os_ver_cnt_30d"], numeric.fillna(0.0).astype("float32"))
+    np.testing.assert_array_equal(
+        X["os_ver_cnt_30d_was_missing"], numeric.isna().astype("float32")
+    )
+    assert "phone_model_last_was_missing" not in plan.feature_names
+
+
+def test_plan_roundtrip_through_manifest(frame):
+    plan = FeaturePlan.fit(frame, COLUMNS)
+    restored = FeaturePlan.from_dict(json.loads(json.dumps(plan.to_dict())))
+
+    assert restored.feature_names == plan.feature_names
+    assert restored.categories == plan.categories
+    np.testing.assert_array_equal(
+        restored.build_matrix_from_frame(frame), plan.build_matrix_from_frame(frame)
+    )
+
+
+def test_unseen_and_missing_categories(frame):
+    plan = FeaturePlan.fit(frame, COLUMNS)
+    j = plan.feature_names.index("phone_model_last")
+    unknown = plan.categories["phone_model_last"].index("unknown")
+
+    reqs = [
+        TransactionScoringRequest(amount=1.0, phone_model_last="Nokia 3310"),
+        TransactionScoringRequest(amount=1.0),
+    ]
+    X = plan.build_matrix(reqs)
+    X_frame = plan.build_matrix_from_frame(
+        pd.DataFrame({"amount": [1.0, 1.0], "phone_model_last": ["Nokia 3310", None]})
+    )
+    assert X[:, j].tolist() == [UNSEEN_CODE, unknown]
+    np.testing.assert_array_equal(X, X_frame)
+
+
+def test_to_float_parses_raw_exports():
+    raw = pd.Series(["4,23E+11", "01.фев", "1 200,5", None, "7"], dtype="string")
+    values = to_float(raw)
+    assert values.dtype == np.float64
+    assert values[0] == 4.23e11 and values[2] == 1200.5 and values[4] == 7.0
+    assert values[[1, 3]].isna().all()
+
+
+def test_baseline_model_serves_device_categories():
+    pytest.importorskip("xgboost")
+    from backend.app.services.model_registry import ModelBundle, ModelRegistry
+
+    entry = ModelRegistry("ml/models").get("xgb_baseline_v1")
+    bundle = ModelBundle.load(entry["path"], "booster", entry)
+    bundle.validate()
+
+    assert bundle.plan.categorical_fields == ("phone_model_last", "os_version_last")
+    req = TransactionScoringRequest(
+        amount=100.0, phone_model_last="iPhone16,1", os_version_last="iOS/17.5.1"
+    )
+    row = bundle.plan.build_matrix([req])[0]
+    for col in bundle.plan.categorical_fields:
+        code = row[bundle.feature_names.index(col)]
+        assert code == bundle.plan.categories[col].index(getattr(req, col)) > 0
+
+
+def test_dataset_key_tracks_velocity_settings(monkeypatch):
+    from backend.app.core.config import get_settings
+    from ml.pipelines.preprocess import StageCache, velocity_key
+
+    def ds_key(velocity: bool) -> str:
+        return StageCache.key(
+            "dataset", transactions="t", behavior="b", velocity=velocity_key(velocity)
+        )
+
+    plain, with_velocity = ds_key(False), ds_key(True)
+    assert plain != with_velocity
+    monkeypatch.setattr(get_settings(), "VELOCITY_NEW_DESTINATION_DAYS", 7)
+    assert ds_key(True) != with_velocity
+    assert ds_key(False) == plain
@@ -0,0 +1,126 @@
+# tests/test_train_pipeline.py
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from ml.pipelines.preprocess import StageCache, prepare_dataset  # noqa: E402
+
+TX_HEADER = "cst_dim_id;transdate;transdatetime;amount;docno;direction;target"
+BEH_HEADER = (
+    "transdate;cst_dim_id;monthly_os_changes;monthly_phone_model_changes;"
+    "last_phone_model_categorical;last_os_categorical;logins_last_7_days;"
+    "logins_last_30_days;login_frequency_7d;login_frequency_30d;freq_change_7d_vs_mean;"
+    "logins_7d_over_30d_ratio;avg_login_interval_30d;std_login_interval_30d;"
+    "var_login_interval_30d;ewm_login_interval_7d;burstiness_login_interval;"
+    "fano_factor_login_interval;zscore_avg_login_interval_7d"
+)
+
+
+def _write(path, header, rows):
+    # как в сырых выгрузках: строка русских описаний, затем английские имена
+    lines = ["описание;" * header.count(";") + "описание", header, *rows]
+    path.write_text("\n".join(lines) + "\n", encoding="cp1251")
+    return str(path)
+
+
+@pytest.fixture()
+def raw_files(tmp_path):
+    rng = np.random.default_rng(0)
+    tx, beh = [], []
+    for i in range(400):
+        client = 1000 + i % 40
+        day = f"2025-03-{1 + i % 20:02d}"
+        amount = f"{rng.integers(100, 50_000)},5"  # запятая вместо точки
+        tx.append(
+            f"{client};'{day} 00:00:00.000';'{day} 1{i % 10}:00:00.000';"
+            f"{amount};{i};dest{i % 7};{int(i % 25 == 0)}"
+        )
+    for client in range(1000, 1040):
+        for d in range(1, 21, 2):
+            beh.append(
+                f"'2025-03-{d:02d} 00:00:00.000';{client};1;2;Pixel {client % 3};"
+                f"Android/1{client % 4};5;20;0.71;0.66;01.фев;0.25;3600.0;1200.5;"
+                f"4,23E+11;3000.0;-0.5;400.2;0.1"
+            )
+    return (
+        _write(tmp_path / "data.csv", TX_HEADER, tx),
+        _write(tmp_path / "data2.csv", BEH_HEADER, beh),
+    )
+
+
+def test_preprocess_types_and_merge(raw_files, tmp_path):
+    df, keys = prepare_dataset(*raw_files, cache=StageCache(str(tmp_path / "cache")))
+
+    assert len(df) == 400
+    assert df["amount"].dtype == np.float64
+    assert (df["amount"] % 1 == 0.5).all()
+    assert str(df["transdatetime"].dtype).startswith("datetime64")
+    # половина клиенто-дней без поведенческих фич
+    assert df["os_ver_cnt_30d"].isna().any() and df["os_ver_cnt_30d"].notna().any()
+    assert df["var_session_interval_30d"].dropna().eq(4.23e11).all()
+    # испорченное Excel'ем значение -> NaN
+    assert df["login_freq_change_7d_vs_30d"].isna().all()
+    assert set(keys) == {"transactions_sha256", "behavior_sha256", "dataset_key"}
+
+
+def test_preprocess_cache_skips_unchanged_stages(raw_files, tmp_path):
+    tx_path, beh_path = raw_files
+    cache_dir = str(tmp_path / "cache")
+
+    first = StageCache(cache_dir)
+    df1, keys1 = prepare_dataset(tx_path, beh_path, cache=first)
+    assert first.misses == ["transactions", "behavior", "dataset"]
+
+    second = StageCache(cache_dir)
+    df2, keys2 = prepare_dataset(tx_path, beh_path, cache=second)
+    assert second.hits == ["dataset"] and second.misses == []
+    assert keys1 == keys2
+    assert df1.equals(df2)
+
+    # изменились только транзакции: поведенческие фичи берутся из кэша
+    with open(tx_path, "a", encoding="cp1251") as f:
+        f.write("1000;'2025-03-02 00:00:00.000';'2025-03-02 12:00:00.000';10;999;dest1;0\n")
+    third = StageCache(cache_dir)
+    df3, keys3 = prepare_dataset(tx_path, beh_path, cache=third)
+    assert third.hits == ["behavior"]
+    assert third.misses == ["transactions", "dataset"]
+    assert len(df3) == 401
+    assert keys3["behavior_sha256"] == keys1["behavior_sha256"]
+
+
+def test_train_writes_model_and_manifest(raw_files, tmp_path):
+    pytest.importorskip("xgboost")
+    pytest.importorskip("sklearn")
+    from backend.app.services.model_registry import ModelBundle, ModelRegistry
+    from ml.pipelines.train_pipeline import run
+
+    models_dir = tmp_path / "models"
+    meta = run(
+        *raw_files,
+        models_dir=str(models_dir),
+        version="xgb_test",
+        cache_dir=str(tmp_path / "cache"),
+    )
+
+    manifest = json.loads((models_dir / "xgb_test.json").read_text(encoding="utf-8"))
+    assert manifest["version"] == "xgb_test"
+    assert "amount_was_missing" in manifest["features"]
+    assert manifest["categories"]["phone_model_last"] == [
+        "Pixel 0", "Pixel 1", "Pixel 2", "unknown"
+    ]
+    assert manifest["training"]["dataset_key"]
+    # на случайных метках ограничения рабочих точек недостижимы -> пороги из настроек
+    assert manifest["thresholds"]["medium"] < manifest["thresholds"]["high"]
+    assert "calibration" in manifest
+    assert manifest["golden_sample"]
+
+    # версия грузится реестром и воспроизводит свой golden sample
+    registry = ModelRegistry(str(models_dir))
+    entry = registry.get("xgb_test")
+    ModelBundle.load(entry["path"], "booster", entry).validate()
+    assert meta["checksum"] == entry["checksum"]